@@ -1,3 +1,4 @@
 from .research_agent import ResearchAgent
+from .router import CommandRouter, RouteResult
 
-__all__ = ['ResearchAgent']
\ No newline at end of file
+__all__ = ['ResearchAgent', 'CommandRouter', 'RouteResult']
\ No newline at end of file
@@ -0,0 +1,164 @@
+"""
+Parallel Agent Executor - runs the tool calls of one agent step concurrently
+"""
+
+import asyncio
+import contextvars
+import logging
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from typing import Any, Dict, Optional
+
+from langchain.agents import AgentExecutor
+from langchain_core.agents import AgentAction, AgentStep
+
+from utils.thread_pools import shared_pool
+
+logger = logging.getLogger(__name__)
+
+
+class ParallelAgentExecutor(AgentExecutor):
+    """AgentExecutor that dispatches all tool calls of a step at the same time.
+
+    ``AgentExecutor`` runs the actions of a multi-tool step one after another
+    on the sync path. Here each action is submitted to a shared thread pool
+    and the step waits for all of them, so a web search and a document lookup
+    cost the slower of the two rather than their sum. Each call is bounded by
+    ``tool_timeouts[name]`` or ``tool_timeout`` seconds; a call that overruns
+    becomes a timeout observation for the LLM. The async path already gathers
+    tool calls and gets the same timeouts.
+
+    Timing for each step (planning time, per-tool time, wall-clock tool time
+    and the time saved over running the tools serially) is kept in
+    ``step_timings`` for the most recent ``max_step_timings`` steps.
+    """
+
+    tool_timeout: Optional[float] = 60.0
+    tool_timeouts: Dict[str, float] = {}
+    max_step_timings: int = 1000
+    step_timings: Optional[Any] = None
+    timings_lock: Optional[Any] = None
+    async_elapsed: Optional[Any] = None
+
+    def __init__(self, **kwargs: Any):
+        super().__init__(**kwargs)
+        self.step_timings = deque(maxlen=self.max_step_timings)
+        self.timings_lock = threading.Lock()
+        # Seconds per async step, keyed by id(step) until the step is yielded
+        self.async_elapsed = {}
+
+    def _timeout_for(self, tool_name: str) -> Optional[float]:
+        return self.tool_timeouts.get(tool_name, self.tool_timeout)
+
+    def _timeout_step(self, agent_action: AgentAction, timeout: float) -> AgentStep:
+        logger.warning("Tool '%s' timed out after %.1fs", agent_action.tool, timeout)
+        return AgentStep(action=agent_action,
+                         observation=f"Tool '{agent_action.tool}' timed out after {timeout:.1f} seconds")
+
+    def _record_step(self, plan_seconds: float, tool_seconds: list, wall_seconds: float):
+        serial_seconds = sum(seconds for _, seconds in tool_seconds)
+        timing = {
+            "time": time.time(),
+            "plan_ms": plan_seconds * 1000,
+            "tools": [{"tool": name, "ms": seconds * 1000} for name, seconds in tool_seconds],
+            "tools_wall_ms": wall_seconds * 1000,
+            "tools_serial_ms": serial_seconds * 1000,
+            "saved_ms": max(0.0, serial_seconds - wall_seconds) * 1000,
+        }
+        with self.timings_lock:
+            self.step_timings.append(timing)
+        if len(tool_seconds) > 1:
+            logger.info("Ran %d tools in %.0fms (serial %.0fms)",
+                        len(tool_seconds), timing["tools_wall_ms"], timing["tools_serial_ms"])
+
+    def get_step_timings(self) -> list:
+        """Return the recorded step timings, oldest first"""
+        with self.timings_lock:
+            return list(self.step_timings)
+
+    def _timed_action(self, *args: Any) -> tuple:
+        start = time.perf_counter()
+        step = super()._perform_agent_action(*args)
+        return step, time.perf_counter() - start
+
+    def _perform_agent_action(self, name_to_tool_map, color_mapping, agent_action, run_manager=None) -> Future:
+        # Returns a future; _iter_next_step resolves it once every action is submitted. The tool runs
+        # in a copy of this context so it sees the run's state, e.g. a speculative retrieval
+        pool = shared_pool("agent-tool", "DOCUMIND_TOOL_WORKERS", 32)
+        return pool.submit(contextvars.copy_context().run, self._timed_action, name_to_tool_map,
+                           color_mapping, agent_action, run_manager)
+
+    def _iter_next_step(self, name_to_tool_map, color_mapping, inputs, intermediate_steps, run_manager=None):
+        start = time.perf_counter()
+        plan_seconds = None
+        pending = []
+        for item in super()._iter_next_step(
+            name_to_tool_map, color_mapping, inputs, intermediate_steps, run_manager
+        ):
+            if isinstance(item, Future):
+                # The base loop only performs actions after yielding all of them
+                pending.append(item)
+                continue
+            if plan_seconds is None:
+                plan_seconds = time.perf_counter() - start
+            if isinstance(item, AgentAction):
+                pending.append(item)
+            else:
+                yield item
+
+        actions = [item for item in pending if isinstance(item, AgentAction)]
+        futures = [item for item in pending if isinstance(item, Future)]
+        for agent_action in actions:
+            yield agent_action
+        if not futures:
+            return
+
+        tools_start = time.perf_counter()
+        tool_seconds = []
+        for agent_action, future in zip(actions, futures):
+            timeout = self._timeout_for(agent_action.tool)
+            remaining = None
+            if timeout is not None:
+                remaining = max(0.0, tools_start + timeout - time.perf_counter())
+            try:
+                step, seconds = future.result(timeout=remaining)
+            except FutureTimeoutError:
+                # The worker thread cannot be interrupted; its result is discarded
+                step, seconds = self._timeout_step(agent_action, timeout), timeout
+            tool_seconds.append((agent_action.tool, seconds))
+            yield step
+        self._record_step(plan_seconds or 0.0, tool_seconds, time.perf_counter() - tools_start)
+
+    async def _aperform_agent_action(self, name_to_tool_map, color_mapping, agent_action, run_manager=None):
+        timeout = self._timeout_for(agent_action.tool)
+        start = time.perf_counter()
+        try:
+            step = await asyncio.wait_for(
+                super()._aperform_agent_action(name_to_tool_map, color_mapping, agent_action, run_manager),
+                timeout
+            )
+        except asyncio.TimeoutError:
+            step = self._timeout_step(agent_action, timeout)
+        self.async_elapsed[id(step)] = time.perf_counter() - start
+        return step
+
+    async def _aiter_next_step(self, name_to_tool_map, color_mapping, inputs, intermediate_steps, run_manager=None):
+        start = time.perf_counter()
+        plan_seconds = None
+        tools_start = None
+        tool_seconds = []
+        async for item in super()._aiter_next_step(
+            name_to_tool_map, color_mapping, inputs, intermediate_steps, run_manager
+        ):
+            if plan_seconds is None:
+                plan_seconds = time.perf_counter() - start
+            if isinstance(item, AgentAction):
+                tools_start = time.perf_counter()
+            elif isinstance(item, AgentStep) and tools_start is not None:
+                tool_seconds.append((item.action.tool, self.async_elapsed.pop(id(item), 0.0)))
+            yield item
+        if tool_seconds:
+            self._record_step(plan_seconds or 0.0, tool_seconds, time.perf_counter() - tools_start)
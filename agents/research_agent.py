@@ -2,39 +2,179 @@
 Research Agent - Core agent with multiple tools
 """
 import os
+import asyncio
+import logging
+import queue
+import threading
+import time
+from collections import OrderedDict
+from typing import TYPE_CHECKING, Any, Iterator, Optional
 from dotenv import load_dotenv
 
 # Load environment variables from .env file
 load_dotenv()
 
-from langchain.agents import create_openai_tools_agent, AgentExecutor
-from langchain_core.prompts import ChatPromptTemplate
-from langchain_openai import ChatOpenAI
-from langchain.memory import ConversationBufferWindowMemory
-from langchain_core.messages import SystemMessage, HumanMessage
-from tools.web_search import WebSearchTool
-from tools.document_processor import DocumentProcessor
-from utils.memory_manager import MemoryManager
+# Heavy imports (langchain, OpenAI clients, tools) are deferred to first use
+# so the CLI and web app can show a prompt before they finish loading
+from agents.router import CommandRouter
+from utils.settings import env_flag
+
+if TYPE_CHECKING:
+    from langchain.memory import ConversationBufferWindowMemory
+
+logger = logging.getLogger(__name__)
 
 class ResearchAgent:
-    def __init__(self):
-        """Initialize the research agent with tools and memory"""
-        self.llm = ChatOpenAI(
-            model="gpt-3.5-turbo",
-            temperature=0.7,
-            streaming=True
-        )
+    def __init__(
+        self,
+        llm: Optional[Any] = None,
+        web_search: Optional[Any] = None,
+        doc_processor: Optional[Any] = None,
+        max_concurrency: Optional[int] = None,
+        max_sessions: int = 1000,
+        memory_db: Optional[str] = None
+    ):
+        """Initialize the research agent with tools and memory.
+
+        The agent, tools and index are shared; conversation memory is kept per
+        session id so concurrent users never see each other's history. At most
+        ``max_concurrency`` queries run at once (DOCUMIND_MAX_CONCURRENCY).
+        Conversations are persisted in ``memory_db`` (DOCUMIND_MEMORY_DB).
+
+        The LLM client, tools and agent executor are built on first use (or
+        by ``start_warm_up``), so construction itself is instant.
+        """
+        self._llm = llm
+        self._web_search = web_search
+        self._doc_processor = doc_processor
+        self._memory_store = None
+        self._context_assembler = None
+        self._agent_executor = None
+        self._tracer = None
+        self.init_lock = threading.RLock()
+        self.init_timings = {}
+
+        # Concurrency limits: one for threads (CLI, Streamlit) and one per event loop
+        self.max_concurrency = max_concurrency or int(os.getenv("DOCUMIND_MAX_CONCURRENCY", "16"))
+        self.thread_limiter = threading.BoundedSemaphore(self.max_concurrency)
+        self.async_limiters = {}
+
+        # Document retrieval starts alongside the planning call (DOCUMIND_SPECULATIVE_RETRIEVAL)
+        self.speculative_retrieval = env_flag("DOCUMIND_SPECULATIVE_RETRIEVAL", True)
+
+        # Ingestion commands skip the LLM and go straight to the document processor
+        self.router = CommandRouter(self)
+
+        # Per-session memory managers over one shared store; only the least
+        # recently used handles are dropped, the history stays on disk
+        self.memory_db = memory_db or os.getenv("DOCUMIND_MEMORY_DB", "data/memory.sqlite")
+        self.max_sessions = max_sessions
+        self.sessions = OrderedDict()
+        self.sessions_lock = threading.Lock()
+
+    def _build(self, name: str, factory):
+        """Run a lazy constructor once under init_lock, recording how long it took"""
+        start = time.perf_counter()
+        value = factory()
+        self.init_timings[name] = time.perf_counter() - start
+        return value
+
+    @property
+    def llm(self):
+        if self._llm is None:
+            with self.init_lock:
+                if self._llm is None:
+                    def create():
+                        from langchain_openai import ChatOpenAI
+                        return ChatOpenAI(model="gpt-3.5-turbo", temperature=0.7, streaming=True)
+                    self._llm = self._build("llm", create)
+        return self._llm
+
+    @property
+    def web_search(self):
+        if self._web_search is None:
+            with self.init_lock:
+                if self._web_search is None:
+                    def create():
+                        from tools.web_search import WebSearchTool
+                        return WebSearchTool()
+                    self._web_search = self._build("web_search", create)
+        return self._web_search
 
-        # Initialize tools
-        self.web_search = WebSearchTool()
-        self.doc_processor = DocumentProcessor()
-        self.memory_manager = MemoryManager()
+    @property
+    def doc_processor(self):
+        if self._doc_processor is None:
+            with self.init_lock:
+                if self._doc_processor is None:
+                    def create():
+                        from tools.document_processor import DocumentProcessor
+                        return DocumentProcessor(context_assembler=self.context_assembler)
+                    self._doc_processor = self._build("doc_processor", create)
+        return self._doc_processor
+
+    @property
+    def memory_store(self):
+        if self._memory_store is None:
+            with self.init_lock:
+                if self._memory_store is None:
+                    from utils.memory_manager import ConversationStore
+                    self._memory_store = ConversationStore(self.memory_db)
+        return self._memory_store
+
+    @property
+    def context_assembler(self):
+        if self._context_assembler is None:
+            with self.init_lock:
+                if self._context_assembler is None:
+                    from utils.context_assembler import ContextAssembler
+                    summarizer = None
+                    if env_flag("DOCUMIND_LLM_SUMMARIES", False):
+                        summarizer = self._summarize_with_llm
+                    # Budgets in tokens for history, its rolling summary and retrieved chunks
+                    self._context_assembler = ContextAssembler(
+                        history_budget=int(os.getenv("DOCUMIND_HISTORY_TOKEN_BUDGET", "1500")),
+                        summary_budget=int(os.getenv("DOCUMIND_SUMMARY_TOKEN_BUDGET", "300")),
+                        chunk_budget=int(os.getenv("DOCUMIND_CHUNK_TOKEN_BUDGET", "1500")),
+                        summarizer=summarizer
+                    )
+        return self._context_assembler
+
+    def _summarize_with_llm(self, summary: str, transcript: str) -> str:
+        prompt = ("Update the running summary of a conversation with the new turns below. "
+                  "Keep names, numbers and open questions; answer with the summary only.\n\n"
+                  f"Current summary:\n{summary or '(none)'}\n\nNew turns:\n{transcript}")
+        return self.llm.invoke(prompt).content
+
+    @property
+    def memory_manager(self):
+        return self.get_memory_manager()
+
+    @property
+    def memory(self) -> "ConversationBufferWindowMemory":
+        return self.get_memory()
+
+    @property
+    def tools(self) -> list:
+        return self.agent_executor.tools
+
+    @property
+    def agent_executor(self):
+        if self._agent_executor is None:
+            with self.init_lock:
+                if self._agent_executor is None:
+                    self._agent_executor = self._build("agent_executor", self._create_agent_executor)
+        return self._agent_executor
+
+    def _create_agent_executor(self):
+        from langchain.agents import create_openai_tools_agent
+        from langchain_core.prompts import ChatPromptTemplate
+        from agents.parallel_executor import ParallelAgentExecutor
 
         # Create tools list
-        self.tools = [
+        tools = [
             self.web_search.get_tool(),
             self.doc_processor.get_tool()
-        ]        
+        ]
 
         # Create agent prompt
         self.prompt = ChatPromptTemplate.from_messages([
@@ -49,59 +189,195 @@ class ResearchAgent:
             - Maintain conversation context
             - Be helpful and professional
             
-            Current conversation context: {chat_history}
+            Summary of earlier conversation: {conversation_summary}
             """),
+            ("placeholder", "{chat_history}"),
             ("human", "{input}"),
             ("placeholder", "{agent_scratchpad}")
         ])
 
         # Create agent
-        self.agent = create_openai_tools_agent(self.llm, self.tools, self.prompt)
-        self.agent_executor = AgentExecutor(
+        self.agent = create_openai_tools_agent(self.llm, tools, self.prompt)
+        # Tool calls from one step run concurrently, each bounded by DOCUMIND_TOOL_TIMEOUT
+        return ParallelAgentExecutor(
             agent=self.agent,
-            tools=self.tools,
-            verbose=True,
+            tools=tools,
+            verbose=logger.isEnabledFor(logging.DEBUG),
             handle_parsing_errors=True,
-            max_iterations=3
+            max_iterations=3,
+            tool_timeout=float(os.getenv("DOCUMIND_TOOL_TIMEOUT", "60"))
         )
 
-        # Initialize memory
-        self.memory = ConversationBufferWindowMemory(
-            k=10,
-            return_messages=True,
-            memory_key="chat_history"
-        )
+    def start_warm_up(self) -> threading.Thread:
+        """Build the LLM client, tools and executor on a background thread"""
+        thread = threading.Thread(target=lambda: self.agent_executor, name="agent-warm-up", daemon=True)
+        thread.start()
+        return thread
+
+    def get_memory_manager(self, session_id: str = "default"):
+        """Return the MemoryManager for a session, creating it on first use"""
+        from utils.memory_manager import MemoryManager
+
+        store = self.memory_store
+        with self.sessions_lock:
+            manager = self.sessions.get(session_id)
+            if manager is None:
+                manager = MemoryManager(session_id, store=store, k=10)
+                self.sessions[session_id] = manager
+                while len(self.sessions) > self.max_sessions:
+                    self.sessions.popitem(last=False)
+            self.sessions.move_to_end(session_id)
+            return manager
+
+    def get_memory(self, session_id: str = "default") -> "ConversationBufferWindowMemory":
+        """Return the windowed conversation memory for a session"""
+        return self.get_memory_manager(session_id).memory
 
-    def process_query(self, query: str) -> str:
+    def _get_async_limiter(self) -> asyncio.Semaphore:
+        # asyncio semaphores belong to one event loop, so keep one per loop
+        loop = asyncio.get_running_loop()
+        limiter = self.async_limiters.get(loop)
+        if limiter is None:
+            limiter = asyncio.Semaphore(self.max_concurrency)
+            self.async_limiters = {l: s for l, s in self.async_limiters.items() if not l.is_closed()}
+            self.async_limiters[loop] = limiter
+        return limiter
+
+    def _run_config(self, *handlers) -> dict:
+        """Invoke config with the shared tracing handler plus any per-call handlers"""
+        if self._tracer is None:
+            from agents.tracing import TracingCallbackHandler
+            self._tracer = TracingCallbackHandler()
+        return {"callbacks": [self._tracer, *handlers]}
+
+    def _prefetch_scope(self, query: str):
+        """Start retrieving documents for the query while the agent plans.
+
+        Most document questions end in a ``document_analysis`` call with
+        nearly the same query, so the tool can skip its own embedding and
+        search. Results the tool does not use are discarded when the run ends.
+        """
+        from utils.retrieval_prefetch import prefetch_scope
+
+        prefetch = None
+        start = getattr(self.doc_processor, "prefetch", None) if self.speculative_retrieval else None
+        if start is not None:
+            try:
+                prefetch = start(query)
+            except Exception as e:
+                logger.warning("Could not start speculative retrieval: %s", e)
+        return prefetch_scope(prefetch)
+
+    def _remember(self, memory, query: str, answer: str):
+        from langchain_core.messages import AIMessage, HumanMessage
+
+        # One append for the exchange
+        memory.chat_memory.add_messages([HumanMessage(content=query), AIMessage(content=answer)])
+
+    def _agent_inputs(self, query: str, session_id: str) -> dict:
+        """Build executor inputs with the session's history fitted to the token budget"""
+        history, summary = self.get_memory_manager(session_id).get_context(self.context_assembler)
+        return {"input": query, "chat_history": history, "conversation_summary": summary or "None"}
+
+    def get_context_stats(self) -> dict:
+        """Get token counts for the history and retrieved context sent to the LLM"""
+        return self.context_assembler.get_stats()
+
+    def record_exchange(self, query: str, answer: str, session_id: str = "default"):
+        """Add a question and answer handled outside the agent to a session's memory"""
+        self._remember(self.get_memory(session_id), query, answer)
+
+    def process_query(self, query: str, session_id: str = "default") -> str:
         """Process user query with the agent"""
+        memory = self.get_memory(session_id)
         try:
-            # Get conversation history
-            history = self.memory.chat_memory.messages
-            
-            # Execute agent
-            response = self.agent_executor.invoke({
-                "input": query,
-                "chat_history": history
-            })
+            with self.thread_limiter, self._prefetch_scope(query):
+                # Execute agent with this session's history
+                response = self.agent_executor.invoke(self._agent_inputs(query, session_id),
+                                                      config=self._run_config())
             
             # Save to memory
-            self.memory.chat_memory.add_user_message(query)
-            self.memory.chat_memory.add_ai_message(response["output"])
-            
+            self._remember(memory, query, response["output"])
             return response["output"]
             
         except Exception as e:
+            logger.exception("Query failed in session %s", session_id)
             return f"Error processing query: {str(e)}"
 
-    def get_conversation_history(self) -> list:
+    async def aprocess_query(self, query: str, session_id: str = "default") -> str:
+        """Process a query asynchronously; many sessions can be served from one event loop"""
+        # Memory is read and written through SQLite (and may be summarized by the LLM), the
+        # executor is built on first use and the prefetch may open the index, so all of that
+        # runs in threads rather than on the event loop
+        memory = await asyncio.to_thread(self.get_memory, session_id)
+        try:
+            async with self._get_async_limiter():
+                executor = await asyncio.to_thread(lambda: self.agent_executor)
+                scope = await asyncio.to_thread(self._prefetch_scope, query)
+                with scope:
+                    inputs = await asyncio.to_thread(self._agent_inputs, query, session_id)
+                    response = await executor.ainvoke(inputs, config=self._run_config())
+            await asyncio.to_thread(self._remember, memory, query, response["output"])
+            return response["output"]
+        except Exception as e:
+            logger.exception("Query failed in session %s", session_id)
+            return f"Error processing query: {str(e)}"
+
+    def stream_query(self, query: str, session_id: str = "default") -> Iterator[dict]:
+        """Process a query, yielding events as they happen.
+
+        Yields dicts with a ``type`` of ``token`` (``content``), ``tool_start``
+        (``tool``, ``input``), ``tool_end`` (``tool``, ``output``), and finally
+        ``final`` with the full answer or ``error`` with a message. ``final``
+        also carries ``streamed``: whether its text already arrived as tokens.
+        The run saves the turn itself, so it is kept even if the caller stops
+        reading early.
+        """
+        from agents.streaming import StreamingCallbackHandler
+
+        memory = self.get_memory(session_id)
+        events = queue.Queue()
+        handler = StreamingCallbackHandler(events)
+
+        def run():
+            try:
+                with self.thread_limiter, self._prefetch_scope(query):
+                    response = self.agent_executor.invoke(
+                        self._agent_inputs(query, session_id),
+                        config=self._run_config(handler)
+                    )
+                self._remember(memory, query, response["output"])
+                events.put({"type": "final", "content": response["output"]})
+            except Exception as e:
+                events.put({"type": "error", "content": f"Error processing query: {str(e)}"})
+
+        threading.Thread(target=run, daemon=True).start()
+        streamed = False
+        while True:
+            event = events.get()
+            if event["type"] == "token":
+                streamed = True
+            elif event["type"] == "tool_start":
+                streamed = False
+            elif event["type"] == "final":
+                event["streamed"] = streamed
+            yield event
+            if event["type"] in ("final", "error"):
+                return
+
+    def get_step_timings(self) -> list:
+        """Get planning and tool timings for recent agent steps"""
+        return self.agent_executor.get_step_timings()
+
+    def get_conversation_history(self, session_id: str = "default") -> list:
         """Get conversation history"""
         history = []
-        for message in self.memory.chat_memory.messages:
+        for message in self.get_memory(session_id).chat_memory.messages:
             if hasattr(message, 'content'):
                 role = "User" if message.type == "human" else "Assistant"
                 history.append(f"{role}: {message.content}")
         return history
     
-    def clear_memory(self):
+    def clear_memory(self, session_id: str = "default"):
         """Clear conversation memory"""
-        self.memory.clear()
\ No newline at end of file
+        self.get_memory(session_id).clear()
@@ -0,0 +1,69 @@
+"""
+Command Router - fast path that runs ingestion commands without the LLM
+"""
+
+import logging
+from dataclasses import dataclass
+from typing import Any, Iterator, Optional
+
+from utils.commands import Command, IngestionReport, parse_command, rebuild_command
+from utils.telemetry import get_telemetry
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class RouteResult:
+    """Result of routing one input; ``report`` is set for ingestion commands"""
+    command: Command
+    handled_by: str
+    message: str
+    report: Optional[IngestionReport] = None
+
+
+class CommandRouter:
+    """Send ingestion commands straight to the document processor.
+
+    Inputs that are exactly a processing or upload command are recognised by
+    ``parse_command`` and executed directly, which skips the LLM round trip
+    the agent would spend choosing the document tool. Everything else goes to
+    the agent. Rebuilding the index is only reachable through ``rebuild``,
+    called by explicit CLI and UI actions, never from free text. Routed
+    commands are still recorded in the session's conversation memory.
+    """
+
+    def __init__(self, agent: Any):
+        self.agent = agent
+
+    def route(self, text: str, session_id: str = "default") -> RouteResult:
+        """Run an input to completion and return a structured result"""
+        command = parse_command(text)
+        if command.is_ingestion:
+            return self._run_ingestion(command, session_id)
+        message = self.agent.process_query(text, session_id=session_id)
+        return RouteResult(command=command, handled_by="agent", message=message)
+
+    def stream(self, text: str, session_id: str = "default") -> Iterator[dict]:
+        """Like ResearchAgent.stream_query, but ingestion commands yield one ``final`` event"""
+        command = parse_command(text)
+        if not command.is_ingestion:
+            yield from self.agent.stream_query(text, session_id=session_id)
+            return
+        result = self._run_ingestion(command, session_id)
+        yield {"type": "final", "content": result.message, "streamed": False, "report": result.report}
+
+    def rebuild(self, session_id: str = "default") -> RouteResult:
+        """Drop the index and re-embed every document"""
+        return self._run_ingestion(rebuild_command(), session_id)
+
+    def _run_ingestion(self, command: Command, session_id: str) -> RouteResult:
+        logger.info("Routing %r directly to %s", command.text, command.type.value)
+        with get_telemetry().span("command", command=command.type.value) as span:
+            try:
+                report = self.agent.doc_processor.run_command(command)
+            except Exception as e:
+                logger.exception("Ingestion command %r failed", command.text)
+                report = IngestionReport(failed=[str(e)], message=f"Error processing documents: {str(e)}")
+            span.set(processed=len(report.processed), failed=len(report.failed), chunks=report.chunks)
+        self.agent.record_exchange(command.text, report.message, session_id=session_id)
+        return RouteResult(command=command, handled_by="router", message=report.message, report=report)
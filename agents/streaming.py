@@ -0,0 +1,25 @@
+"""
+Streaming - callback handler that turns agent callbacks into UI events
+"""
+
+import queue
+
+from langchain_core.callbacks import BaseCallbackHandler
+
+
+class StreamingCallbackHandler(BaseCallbackHandler):
+    """Forward LLM tokens and tool steps to a queue as event dicts"""
+
+    def __init__(self, events: queue.Queue):
+        self.events = events
+
+    def on_llm_new_token(self, token: str, **kwargs) -> None:
+        # Tool-call chunks arrive with empty content
+        if token:
+            self.events.put({"type": "token", "content": token})
+
+    def on_tool_start(self, serialized: dict, input_str: str, **kwargs) -> None:
+        self.events.put({"type": "tool_start", "tool": serialized.get("name", "tool"), "input": input_str})
+
+    def on_tool_end(self, output, **kwargs) -> None:
+        self.events.put({"type": "tool_end", "tool": kwargs.get("name", "tool"), "output": str(output)})
@@ -0,0 +1,151 @@
+"""
+Tracing - callback handler that records agent, LLM, tool and retriever spans
+"""
+
+import threading
+from typing import Any, Dict, List, Optional
+from uuid import UUID
+
+from langchain_core.callbacks import BaseCallbackHandler
+
+from utils.embedding_pipeline import count_tokens
+from utils.telemetry import Telemetry, current_span, get_telemetry, set_current_span
+
+
+class TracingCallbackHandler(BaseCallbackHandler):
+    """Turn LangChain callbacks into telemetry spans.
+
+    The outermost chain becomes a ``chain`` span and every LLM call, tool
+    run and retrieval nested in it a child span (``llm``, ``tool.<name>``,
+    ``retriever``) carrying token counts and payload sizes. Intermediate
+    chains are not timed but still link children to their ancestors.
+    Spans opened in application code while a run is active (e.g. in a tool)
+    join the same trace.
+    """
+
+    def __init__(self, telemetry: Optional[Telemetry] = None):
+        self.telemetry = telemetry or get_telemetry()
+        self.lock = threading.Lock()
+        self.spans: Dict[UUID, Any] = {}
+        self.parents: Dict[UUID, Optional[UUID]] = {}
+        self.enclosing: Dict[UUID, Any] = {}
+        self.prompts: Dict[UUID, str] = {}
+
+    def _parent_span(self, parent_run_id: Optional[UUID]):
+        ancestor = None
+        with self.lock:
+            run_id = parent_run_id
+            while run_id is not None and ancestor is None:
+                ancestor = self.spans.get(run_id)
+                run_id = self.parents.get(run_id)
+        active = current_span()
+        # An open application span inside the ancestor's run (e.g. "qa" in a tool) is the closer parent
+        if ancestor is None or (active is not None and active.trace_id == ancestor.trace_id
+                                and active.duration is None):
+            return active
+        return ancestor
+
+    def _start(self, run_id: UUID, parent_run_id: Optional[UUID], name: str, **attributes):
+        if not self.telemetry.enabled:
+            return
+        enclosing = current_span()
+        span = self.telemetry.start_span(name, parent=self._parent_span(parent_run_id), **attributes)
+        with self.lock:
+            self.spans[run_id] = span
+            self.parents[run_id] = parent_run_id
+            self.enclosing[run_id] = enclosing
+        set_current_span(span)
+
+    def _end(self, run_id: UUID, error: Optional[BaseException] = None, **attributes):
+        with self.lock:
+            span = self.spans.pop(run_id, None)
+            self.parents.pop(run_id, None)
+            enclosing = self.enclosing.pop(run_id, None)
+            self.prompts.pop(run_id, None)
+        if span is None:
+            return
+        span.set(**attributes)
+        self.telemetry.end_span(span, error=None if error is None else f"{type(error).__name__}: {error}")
+        if current_span() is span:
+            set_current_span(enclosing)
+
+    # Chains: only the outermost one is timed
+    def on_chain_start(self, serialized: Dict[str, Any], inputs: Dict[str, Any], *, run_id: UUID,
+                       parent_run_id: Optional[UUID] = None, **kwargs: Any) -> None:
+        if parent_run_id is None:
+            name = kwargs.get("name") or (serialized or {}).get("name") or "chain"
+            self._start(run_id, None, "chain", chain=name)
+        else:
+            with self.lock:
+                self.parents[run_id] = parent_run_id
+
+    def on_chain_end(self, outputs: Dict[str, Any], *, run_id: UUID, **kwargs: Any) -> None:
+        self._end(run_id)
+        with self.lock:
+            self.parents.pop(run_id, None)
+
+    def on_chain_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any) -> None:
+        self._end(run_id, error)
+        with self.lock:
+            self.parents.pop(run_id, None)
+
+    # LLM calls, with token usage when the provider reports it
+    def on_llm_start(self, serialized: Dict[str, Any], prompts: List[str], *, run_id: UUID,
+                     parent_run_id: Optional[UUID] = None, **kwargs: Any) -> None:
+        text = "\n".join(prompts)
+        self._start(run_id, parent_run_id, "llm", input_bytes=len(text.encode("utf-8")))
+        with self.lock:
+            self.prompts[run_id] = text
+
+    def on_chat_model_start(self, serialized: Dict[str, Any], messages: List[List[Any]], *, run_id: UUID,
+                            parent_run_id: Optional[UUID] = None, **kwargs: Any) -> None:
+        text = "\n".join(str(message.content) for batch in messages for message in batch)
+        self._start(run_id, parent_run_id, "llm", input_bytes=len(text.encode("utf-8")))
+        with self.lock:
+            self.prompts[run_id] = text
+
+    def on_llm_end(self, response: Any, *, run_id: UUID, **kwargs: Any) -> None:
+        with self.lock:
+            if run_id not in self.spans:
+                return
+            prompt_text = self.prompts.get(run_id, "")
+        output = "".join(generation.text for generations in response.generations for generation in generations)
+        usage = (response.llm_output or {}).get("token_usage") or {}
+        model = (response.llm_output or {}).get("model_name")
+        if usage:
+            tokens = {"prompt_tokens": usage.get("prompt_tokens", 0),
+                      "completion_tokens": usage.get("completion_tokens", 0)}
+        else:
+            # Streaming responses carry no usage, so estimate it
+            tokens = {"prompt_tokens": count_tokens(prompt_text), "completion_tokens": count_tokens(output),
+                      "tokens_estimated": True}
+        if model:
+            tokens["model"] = model
+        self._end(run_id, output_bytes=len(output.encode("utf-8")), **tokens)
+
+    def on_llm_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any) -> None:
+        self._end(run_id, error)
+
+    # Tools
+    def on_tool_start(self, serialized: Dict[str, Any], input_str: str, *, run_id: UUID,
+                      parent_run_id: Optional[UUID] = None, **kwargs: Any) -> None:
+        name = (serialized or {}).get("name") or kwargs.get("name") or "tool"
+        self._start(run_id, parent_run_id, f"tool.{name}", input_bytes=len(str(input_str).encode("utf-8")))
+
+    def on_tool_end(self, output: Any, *, run_id: UUID, **kwargs: Any) -> None:
+        self._end(run_id, output_bytes=len(str(output).encode("utf-8")))
+
+    def on_tool_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any) -> None:
+        self._end(run_id, error)
+
+    # Retrieval
+    def on_retriever_start(self, serialized: Dict[str, Any], query: str, *, run_id: UUID,
+                           parent_run_id: Optional[UUID] = None, **kwargs: Any) -> None:
+        self._start(run_id, parent_run_id, "retriever", input_bytes=len(query.encode("utf-8")))
+
+    def on_retriever_end(self, documents: Any, *, run_id: UUID, **kwargs: Any) -> None:
+        self._end(run_id, documents=len(documents),
+                  output_bytes=sum(len(document.page_content.encode("utf-8")) for document in documents))
+
+    def on_retriever_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any) -> None:
+        self._end(run_id, error)
@@ -0,0 +1,5 @@
+"""
+Offline benchmarks for DocuMindAI components
+
+Run a benchmark as a module, e.g. ``python -m benchmarks.embedding_throughput``.
+"""
@@ -0,0 +1,96 @@
+"""
+Agent load test
+
+Serves many concurrent sessions from one ResearchAgent on one event loop,
+using fake chat and embedding models so only the agent's own overhead and
+the simulated model latency are measured.
+"""
+
+import asyncio
+import os
+import tempfile
+import time
+
+import click
+
+from benchmarks.fakes import FakeChatModel, FakeEmbeddings
+
+
+def make_documents(directory: str, num_docs: int):
+    """Write small text documents to index"""
+    os.makedirs(directory, exist_ok=True)
+    for i in range(num_docs):
+        with open(os.path.join(directory, f"doc_{i}.txt"), "w") as f:
+            f.write(f"Document {i} describes part XJ-{i:03d} and its maintenance schedule. " * 20)
+
+
+def percentile(values, pct: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+@click.command()
+@click.option('--sessions', default=50, help='Concurrent sessions')
+@click.option('--turns', default=2, help='Queries per session')
+@click.option('--latency', default=0.2, help='Fake LLM latency per call in seconds')
+@click.option('--concurrency', default=16, help='Maximum queries in flight')
+@click.option('--docs', default=20, help='Synthetic documents to index')
+def main(sessions, turns, latency, concurrency, docs):
+    """Measure throughput and latency for concurrent agent sessions"""
+    from agents.research_agent import ResearchAgent
+    from tools.document_processor import DocumentProcessor
+    from tools.web_search import WebSearchTool
+
+    with tempfile.TemporaryDirectory() as tmp:
+        documents_path = os.path.join(tmp, "documents")
+        make_documents(documents_path, docs)
+        llm = FakeChatModel(latency=latency)
+        doc_processor = DocumentProcessor(
+            index_path=os.path.join(tmp, "index"),
+            documents_path=documents_path,
+            embeddings=FakeEmbeddings(),
+            llm=llm,
+            background_ingest=False
+        )
+        agent = ResearchAgent(
+            llm=llm,
+            web_search=WebSearchTool(search_url="http://127.0.0.1:9/search"),
+            doc_processor=doc_processor,
+            max_concurrency=concurrency,
+            memory_db=os.path.join(tmp, "memory.sqlite")
+        )
+        agent.agent_executor.verbose = False
+
+        latencies = []
+
+        async def session(session_id: str):
+            for turn in range(turns):
+                start = time.perf_counter()
+                await agent.aprocess_query(f"{session_id} turn {turn}: what is part XJ-00{turn}?", session_id)
+                latencies.append(time.perf_counter() - start)
+
+        async def run_all():
+            await asyncio.gather(*(session(f"s{i}") for i in range(sessions)))
+
+        start = time.perf_counter()
+        asyncio.run(run_all())
+        elapsed = time.perf_counter() - start
+
+        # Check every stored message, not just the memory window
+        leaked = [
+            f"s{i}" for i in range(sessions)
+            if any(message_type == "human" and f"s{i} turn" not in content
+                   for message_type, content in agent.memory_store.tail(f"s{i}"))
+            or agent.memory_store.count(f"s{i}") != 2 * turns
+        ]
+
+    queries = sessions * turns
+    print(f"{queries} queries from {sessions} sessions in {elapsed:.2f}s "
+          f"({queries / elapsed:.1f} queries/s, concurrency {concurrency})")
+    print(f"latency p50 {percentile(latencies, 50) * 1000:.0f}ms, "
+          f"p95 {percentile(latencies, 95) * 1000:.0f}ms, {llm.calls} LLM calls")
+    print(f"session isolation: {'ok' if not leaked else f'{len(leaked)} sessions leaked'}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,109 @@
+"""
+Chunking benchmark
+
+Splits a corpus with the old 1000/200 character splitter and with each
+chunking profile, and reports chunk counts, embedded tokens, estimated
+index size and the savings of each profile against the old splitter.
+"""
+
+import os
+import random
+import textwrap
+
+import click
+
+from utils.chunking import PROFILES, split_documents
+from utils.embedding_pipeline import count_tokens
+
+WORDS = ("invoice contract clause warranty engine pump valve error code part "
+         "manual section report revenue policy customer service network").split()
+
+
+def make_corpus(num_docs: int, seed: int = 0):
+    """Generate documents with headings, paragraphs and part numbers.
+
+    Every other document looks like PDF text extraction: lines wrapped at 90
+    characters, no blank lines between paragraphs and several pages.
+    """
+    from langchain_core.documents import Document
+
+    rng = random.Random(seed)
+    documents = []
+    for i in range(num_docs):
+        blocks = []
+        for s in range(rng.randint(3, 8)):
+            blocks.append(f"{s + 1}. {rng.choice(WORDS).capitalize()} {rng.choice(WORDS)}")
+            for _ in range(rng.randint(1, 5)):
+                blocks.append(" ".join(
+                    " ".join(rng.choice(WORDS) for _ in range(rng.randint(8, 20))).capitalize()
+                    + f" for part XJ-{rng.randint(0, 999):03d}."
+                    for _ in range(rng.randint(2, 8))
+                ))
+        if i % 2:
+            lines = [line for block in blocks for line in textwrap.wrap(block, 90)]
+            pages = ["\n".join(lines[start:start + 45]) for start in range(0, len(lines), 45)]
+            documents.append([Document(page_content=page, metadata={"source": f"doc_{i}.pdf", "page": p})
+                              for p, page in enumerate(pages)])
+        else:
+            documents.append([Document(page_content="\n\n".join(blocks), metadata={"source": f"doc_{i}.txt"})])
+    return documents
+
+
+def load_corpus(directory: str):
+    """Load every supported file in a directory as lists of page documents"""
+    from utils.document_loader import load_document
+
+    documents = []
+    for name in sorted(os.listdir(directory)):
+        if name.lower().endswith(('.pdf', '.txt')):
+            documents.append(load_document(os.path.join(directory, name)))
+    return documents
+
+
+def measure(name, splits, source_tokens, dimension):
+    tokens = sum(count_tokens(split.page_content) for split in splits)
+    text_bytes = sum(len(split.page_content.encode("utf-8")) for split in splits)
+    mid_sentence = sum(not split.page_content.rstrip().endswith(('.', '!', '?', ':')) for split in splits)
+    return {
+        "name": name,
+        "chunks": len(splits),
+        "tokens": tokens,
+        "overhead": tokens / source_tokens - 1 if source_tokens else 0.0,
+        "index_bytes": len(splits) * dimension * 4 + text_bytes,
+        "mid_sentence": mid_sentence / len(splits) if splits else 0.0,
+    }
+
+
+@click.command()
+@click.option('--documents', 'documents_path', default=None, help='Directory to chunk instead of a synthetic corpus')
+@click.option('--docs', default=200, help='Number of synthetic documents')
+@click.option('--profiles', default=','.join(PROFILES), help='Comma separated profiles to compare')
+@click.option('--dimension', default=1536, help='Embedding dimension used for the index size estimate')
+def main(documents_path, docs, profiles, dimension):
+    """Compare chunking profiles with the old character splitter"""
+    from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+    corpus = load_corpus(documents_path) if documents_path else make_corpus(docs)
+    source_tokens = sum(count_tokens(page.page_content) for pages in corpus for page in pages)
+    print(f"{len(corpus)} documents, {source_tokens} source tokens")
+
+    splitter = RecursiveCharacterTextSplitter(chunk_size=1000, chunk_overlap=200)
+    baseline = measure("chars-1000/200", [split for pages in corpus for split in splitter.split_documents(pages)],
+                       source_tokens, dimension)
+    results = [baseline]
+    for name in profiles.split(','):
+        profile = PROFILES[name.strip()]
+        splits = [split for pages in corpus for split in split_documents(pages, profile)]
+        results.append(measure(profile.signature, splits, source_tokens, dimension))
+
+    for result in results:
+        token_savings = 1 - result["tokens"] / baseline["tokens"]
+        size_savings = 1 - result["index_bytes"] / baseline["index_bytes"]
+        print(f"{result['name']:<22} chunks={result['chunks']:<7} tokens={result['tokens']:<9} "
+              f"overlap={result['overhead']:6.1%}  index={result['index_bytes'] / 2 ** 20:7.1f}MB  "
+              f"mid-sentence={result['mid_sentence']:6.1%}  "
+              f"saves {token_savings:6.1%} tokens, {size_savings:6.1%} index")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,64 @@
+"""
+Embedding throughput benchmark
+
+Compares serial per-document embedding with the batched, concurrent
+BatchedEmbeddings pipeline against a fake embeddings backend with latency.
+"""
+
+import random
+import time
+
+import click
+
+from benchmarks.fakes import FakeEmbeddings
+from utils.embedding_pipeline import BatchedEmbeddings, count_tokens
+
+WORDS = ("invoice contract clause warranty engine pump valve error code part "
+         "manual section report revenue policy customer service network").split()
+
+
+def make_documents(num_docs: int, chunks_per_doc: int, seed: int = 0):
+    """Generate documents as lists of chunk texts"""
+    rng = random.Random(seed)
+    return [
+        [" ".join(rng.choice(WORDS) for _ in range(rng.randint(60, 180)))
+         for _ in range(rng.randint(1, chunks_per_doc))]
+        for _ in range(num_docs)
+    ]
+
+
+@click.command()
+@click.option('--docs', default=200, help='Number of synthetic documents')
+@click.option('--chunks-per-doc', default=8, help='Maximum chunks per document')
+@click.option('--latency', default=0.05, help='Fake per-call latency in seconds')
+@click.option('--workers', default=4, help='Concurrent batches in flight')
+@click.option('--batch-tokens', default=8000, help='Token budget per batch')
+@click.option('--rate-limit-every', default=0, help='Raise a 429 on every n-th call')
+def main(docs, chunks_per_doc, latency, workers, batch_tokens, rate_limit_every):
+    """Benchmark serial vs batched embedding throughput"""
+    documents = make_documents(docs, chunks_per_doc)
+    texts = [chunk for doc in documents for chunk in doc]
+    tokens = sum(count_tokens(text) for text in texts)
+    print(f"{len(documents)} documents, {len(texts)} chunks, {tokens} tokens")
+
+    serial = FakeEmbeddings(latency=latency)
+    start = time.perf_counter()
+    for doc in documents:
+        serial.embed_documents(doc)
+    elapsed = time.perf_counter() - start
+    print(f"serial:  {elapsed:.2f}s, {serial.calls} calls, "
+          f"{len(texts) / elapsed:.1f} chunks/s, {tokens / elapsed:.0f} tokens/s")
+
+    fake = FakeEmbeddings(latency=latency, rate_limit_every=rate_limit_every)
+    batched = BatchedEmbeddings(fake, max_batch_tokens=batch_tokens, max_workers=workers, base_delay=0.05)
+    start = time.perf_counter()
+    batched.embed_documents(texts)
+    elapsed = time.perf_counter() - start
+    stats = batched.get_stats()
+    print(f"batched: {elapsed:.2f}s, {fake.calls} calls, {stats['batches']} batches, "
+          f"{stats['rate_limits']} rate limits, {stats['chunks_per_sec']:.1f} chunks/s, "
+          f"{stats['tokens_per_sec']:.0f} tokens/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+"""
+Fake model stand-ins for offline benchmarks
+"""
+
+import asyncio
+import hashlib
+import json
+import math
+import re
+import threading
+import time
+import uuid
+from typing import Any, List, Optional
+
+from langchain_core.embeddings import Embeddings
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage, ToolMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+
+
+class RateLimitError(Exception):
+    """Mimics the 429 error raised by the OpenAI client"""
+    status_code = 429
+
+
+class FakeEmbeddings(Embeddings):
+    """Deterministic embeddings that sleep to simulate API latency.
+
+    Each call costs ``latency`` seconds plus ``per_text_latency`` per text.
+    Set ``rate_limit_every`` to raise a 429 on every n-th call. By default a
+    vector is a hash of the whole text, so similarity carries no meaning;
+    with ``lexical`` words are hashed into buckets, so texts sharing words
+    (such as a part number) are close and retrieval quality can be measured.
+    """
+
+    def __init__(self, size: int = 64, latency: float = 0.0, per_text_latency: float = 0.0,
+                 rate_limit_every: int = 0, lexical: bool = False):
+        self.size = size
+        self.lexical = lexical
+        self.latency = latency
+        self.per_text_latency = per_text_latency
+        self.rate_limit_every = rate_limit_every
+        self.calls = 0
+        self.texts_embedded = 0
+        self.lock = threading.Lock()
+
+    def _vector(self, text: str) -> List[float]:
+        if self.lexical:
+            vector = [0.0] * self.size
+            for word in re.findall(r"[a-z0-9]+(?:-[a-z0-9]+)*", text.lower()):
+                bucket = int.from_bytes(hashlib.md5(word.encode("utf-8")).digest()[:4], "little")
+                vector[bucket % self.size] += 1.0
+            norm = math.sqrt(sum(value * value for value in vector)) or 1.0
+            return [value / norm for value in vector]
+        digest = hashlib.sha256(text.encode("utf-8")).digest()
+        while len(digest) < self.size:
+            digest += hashlib.sha256(digest).digest()
+        return [b / 255.0 - 0.5 for b in digest[:self.size]]
+
+    def _call(self, count: int):
+        with self.lock:
+            self.calls += 1
+            call = self.calls
+        time.sleep(self.latency + self.per_text_latency * count)
+        if self.rate_limit_every and call % self.rate_limit_every == 0:
+            raise RateLimitError("Error code: 429 - rate limit reached")
+        with self.lock:
+            self.texts_embedded += count
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        self._call(len(texts))
+        return [self._vector(text) for text in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        self._call(1)
+        return self._vector(text)
+
+
+class FakeChatModel(BaseChatModel):
+    """Chat model that sleeps ``latency`` seconds and answers deterministically.
+
+    When tools are bound (as in the agent) and no tool has run yet, it calls
+    each of ``tool_names`` in one step with the latest user message; otherwise it answers by
+    echoing the question and any tool output, so replies can be traced back
+    to the session that asked.
+    """
+
+    latency: float = 0.0
+    tool_names: List[str] = ["document_analysis"]
+    calls: int = 0
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-chat"
+
+    def _respond(self, messages: List[BaseMessage], tools: Optional[list]) -> ChatResult:
+        self.calls += 1
+        question = next((m.content for m in reversed(messages) if isinstance(m, HumanMessage)), "")
+        observations = [m.content for m in messages if isinstance(m, ToolMessage)]
+        if tools and not observations:
+            message = AIMessage(content="", additional_kwargs={"tool_calls": [{
+                "id": f"call_{uuid.uuid4().hex[:12]}",
+                "type": "function",
+                "function": {"name": name, "arguments": json.dumps({"query": question})},
+            } for name in self.tool_names]})
+        else:
+            answer = f"Answer to '{question}'"
+            if observations:
+                answer += f" based on: {observations[-1][:200]}"
+            message = AIMessage(content=answer)
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                  run_manager: Any = None, **kwargs: Any) -> ChatResult:
+        time.sleep(self.latency)
+        return self._respond(messages, kwargs.get("tools"))
+
+    async def _agenerate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                         run_manager: Any = None, **kwargs: Any) -> ChatResult:
+        await asyncio.sleep(self.latency)
+        return self._respond(messages, kwargs.get("tools"))
@@ -0,0 +1,67 @@
+"""
+Parallel tool benchmark
+
+Runs a step that calls several slow tools at once through the stock
+AgentExecutor and through ParallelAgentExecutor, and compares wall-clock time.
+"""
+
+import asyncio
+import time
+
+import click
+from langchain.agents import AgentExecutor, create_openai_tools_agent
+from langchain_core.prompts import ChatPromptTemplate
+from langchain_core.tools import Tool
+
+from agents.parallel_executor import ParallelAgentExecutor
+from benchmarks.fakes import FakeChatModel
+
+
+def make_tools(count: int, latency: float):
+    """Tools that sleep for ``latency`` seconds, like a remote search"""
+    def slow(query: str, name: str) -> str:
+        time.sleep(latency)
+        return f"{name} result for {query}"
+
+    return [Tool(name=f"tool_{i}", description=f"Slow tool {i}",
+                 func=lambda query, name=f"tool_{i}": slow(query, name))
+            for i in range(count)]
+
+
+@click.command()
+@click.option('--tools', 'num_tools', default=3, help='Tool calls per step')
+@click.option('--tool-latency', default=0.5, help='Seconds per tool call')
+@click.option('--llm-latency', default=0.1, help='Fake LLM latency per call in seconds')
+@click.option('--timeout', default=None, type=float, help='Per-tool timeout in seconds')
+def main(num_tools, tool_latency, llm_latency, timeout):
+    """Compare serial and parallel tool execution for a multi-tool step"""
+    tools = make_tools(num_tools, tool_latency)
+    llm = FakeChatModel(latency=llm_latency, tool_names=[tool.name for tool in tools])
+    prompt = ChatPromptTemplate.from_messages([
+        ("system", "You are a benchmark agent."),
+        ("human", "{input}"),
+        ("placeholder", "{agent_scratchpad}")
+    ])
+    agent = create_openai_tools_agent(llm, tools, prompt)
+
+    serial = AgentExecutor(agent=agent, tools=tools, max_iterations=3)
+    start = time.perf_counter()
+    serial.invoke({"input": "compare the tools"})
+    print(f"AgentExecutor:           {time.perf_counter() - start:.2f}s")
+
+    parallel = ParallelAgentExecutor(agent=agent, tools=tools, max_iterations=3, tool_timeout=timeout)
+    start = time.perf_counter()
+    parallel.invoke({"input": "compare the tools"})
+    print(f"ParallelAgentExecutor:   {time.perf_counter() - start:.2f}s")
+
+    start = time.perf_counter()
+    asyncio.run(parallel.ainvoke({"input": "compare the tools"}))
+    print(f"ParallelAgentExecutor (async): {time.perf_counter() - start:.2f}s")
+
+    for timing in parallel.get_step_timings():
+        print(f"step: plan {timing['plan_ms']:.0f}ms, tools {timing['tools_wall_ms']:.0f}ms wall / "
+              f"{timing['tools_serial_ms']:.0f}ms serial, saved {timing['saved_ms']:.0f}ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,276 @@
+"""
+RAG pipeline benchmark
+
+Ingests a corpus through DocumentProcessor and answers a question set with
+deterministic fake (or local hashed n-gram) embeddings and a fake chat
+model, reporting ingestion throughput, peak memory, index size, query
+latency percentiles and retrieval quality (recall@k and MRR). Results are written as JSON so two
+runs, e.g. before and after a change to chunking, k or the vector backend,
+can be compared with ``--compare``.
+
+A real corpus can be used with ``--documents`` and ``--questions``, a JSON
+list of {"question": ..., "relevant": [...]} where a retrieved chunk counts
+as relevant when its text contains one of the ``relevant`` strings.
+"""
+
+import json
+import os
+import random
+import resource
+import subprocess
+import tempfile
+import time
+from typing import Optional
+
+import click
+import numpy as np
+
+from benchmarks.fakes import FakeChatModel, FakeEmbeddings
+
+WORDS = ("invoice contract clause warranty engine pump valve error code part "
+         "manual section report revenue policy customer service network").split()
+
+# Metrics where a lower value is better; everything else is higher-is-better
+LOWER_IS_BETTER = {"ingest_seconds", "peak_rss_mb", "peak_rss_growth_mb", "index_mb", "embedded_tokens", "chunks",
+                   "retrieval_p50_ms", "retrieval_p95_ms", "retrieval_p99_ms",
+                   "answer_p50_ms", "answer_p95_ms", "answer_p99_ms"}
+
+
+def make_corpus(directory: str, num_docs: int, facts_per_doc: int, seed: int = 0):
+    """Write documents that each state facts about unique part numbers.
+
+    Returns questions as {"question", "relevant"} dicts, one per fact, whose
+    only relevant text is the sentence naming that part number.
+    """
+    rng = random.Random(seed)
+    os.makedirs(directory, exist_ok=True)
+    questions = []
+    for i in range(num_docs):
+        blocks = []
+        for f in range(facts_per_doc):
+            part = f"XJ-{i:04d}-{f:02d}"
+            torque = rng.randint(10, 90)
+            months = rng.randint(1, 24)
+            blocks.append(f"{f + 1}. {rng.choice(WORDS).capitalize()} {rng.choice(WORDS)}")
+            for _ in range(rng.randint(1, 3)):
+                blocks.append(" ".join(
+                    " ".join(rng.choice(WORDS) for _ in range(rng.randint(8, 20))).capitalize() + "."
+                    for _ in range(rng.randint(2, 6))
+                ))
+            blocks.append(f"Part {part} is fastened to {torque} Nm and inspected every {months} months.")
+            questions.append({"question": f"What torque is part {part} fastened to?", "relevant": [part]})
+        with open(os.path.join(directory, f"doc_{i:04d}.txt"), "w") as f:
+            f.write("\n\n".join(blocks))
+    return questions
+
+
+def first_relevant(results, relevant) -> Optional[int]:
+    """1-based rank of the first result containing a relevant string, or None"""
+    relevant = [text.lower() for text in relevant]
+    for position, result in enumerate(results):
+        text = result if isinstance(result, str) else result.page_content
+        if any(needle in text.lower() for needle in relevant):
+            return position + 1
+    return None
+
+
+def percentiles(values):
+    if not values:
+        return 0.0, 0.0, 0.0
+    return tuple(float(value) for value in np.percentile(np.array(values) * 1000, [50, 95, 99]))
+
+
+def directory_size(path: str) -> int:
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            total += os.path.getsize(os.path.join(root, name))
+    return total
+
+
+def peak_rss_mb() -> float:
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if os.uname().sysname == "Darwin" else peak / 1024
+
+
+def git_revision() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                              text=True, timeout=5).stdout.strip()
+    except Exception:
+        return ""
+
+
+def compare(previous: dict, current: dict, tolerance: float) -> int:
+    """Print metric deltas between two result files and return the number of regressions"""
+    regressions = 0
+    print(f"\n{'metric':<20} {'before':>12} {'after':>12} {'change':>9}")
+    for name, after in current["metrics"].items():
+        before = previous.get("metrics", {}).get(name)
+        if not isinstance(before, (int, float)) or not isinstance(after, (int, float)):
+            continue
+        change = (after - before) / before if before else 0.0
+        worse = change > tolerance if name in LOWER_IS_BETTER else change < -tolerance
+        regressions += worse
+        print(f"{name:<20} {before:>12.4g} {after:>12.4g} {change:>+9.1%}{'  worse' if worse else ''}")
+    return regressions
+
+
+@click.command()
+@click.option('--docs', default=100, help='Synthetic documents')
+@click.option('--facts-per-doc', default=5, help='Facts (and questions) per synthetic document')
+@click.option('--documents', 'documents_path', default=None, help='Directory to ingest instead of a synthetic corpus')
+@click.option('--questions', 'questions_file', default=None, help='Questions JSON for --documents')
+@click.option('--queries', default=200, help='Questions to run (sampled from the question set)')
+@click.option('--k', default=3, help='Chunks returned per question')
+@click.option('--backend', default='faiss', type=click.Choice(['chroma', 'faiss', 'float16', 'int8']),
+              help='Vector backend')
+@click.option('--profile', default=None, help='Chunking profile (defaults to DOCUMIND_CHUNK_PROFILE)')
+@click.option('--embeddings', 'embeddings_backend', default='fake', type=click.Choice(['fake', 'hashing']),
+              help='Fake lexical embeddings or the local hashed n-gram backend')
+@click.option('--dimension', default=256, help='Embedding dimension')
+@click.option('--embed-latency', default=0.0, help='Fake embedding latency per call in seconds')
+@click.option('--llm-latency', default=0.0, help='Fake LLM latency per call in seconds')
+@click.option('--answers/--no-answers', default=True, help='Also time full answers through the QA chain')
+@click.option('--output', default=None, help='Write results to this JSON file')
+@click.option('--compare', 'compare_file', default=None, help='Compare with a previous results file')
+@click.option('--tolerance', default=0.1, help='Relative change that counts as a regression')
+@click.option('--seed', default=0, help='Random seed for the corpus and question sample')
+@click.option('--min-recall', default=None, type=float, help='Exit with an error if hybrid recall@k is below this')
+def main(docs, facts_per_doc, documents_path, questions_file, queries, k, backend, profile, embeddings_backend,
+         dimension, embed_latency, llm_latency, answers, output, compare_file, tolerance, seed,
+         min_recall):
+    """Benchmark ingestion, query latency and retrieval quality"""
+    # Measure the pipeline itself, not answers served from the semantic cache
+    os.environ["DOCUMIND_SEMANTIC_CACHE_THRESHOLD"] = ""
+    os.environ["DOCUMIND_ANSWER_CACHE_SIZE"] = "0"
+    os.environ["DOCUMIND_RETRIEVAL_K"] = str(k)
+    from tools.document_processor import DocumentProcessor
+
+    with tempfile.TemporaryDirectory() as tmp:
+        if documents_path:
+            if not questions_file:
+                raise click.UsageError("--documents needs --questions")
+            with open(questions_file) as f:
+                question_set = json.load(f)
+        else:
+            documents_path = os.path.join(tmp, "documents")
+            question_set = make_corpus(documents_path, docs, facts_per_doc, seed)
+        sample = random.Random(seed).sample(question_set, min(queries, len(question_set)))
+
+        if embeddings_backend == "hashing":
+            from utils.embedding_backends import HashingEmbeddings
+            embeddings = HashingEmbeddings(dimension=dimension)
+        else:
+            embeddings = FakeEmbeddings(size=dimension, latency=embed_latency, lexical=True)
+        index_path = os.path.join(tmp, "index")
+        rss_before = peak_rss_mb()
+        start = time.perf_counter()
+        processor = DocumentProcessor(
+            index_path=index_path,
+            vector_backend=backend,
+            documents_path=documents_path,
+            embeddings=embeddings,
+            llm=FakeChatModel(latency=llm_latency),
+            background_ingest=False,
+            chunk_profile=profile
+        )
+        ingest_seconds = time.perf_counter() - start
+        num_docs = len(processor.manifest.entries)
+        chunks = sum(len(entry["chunk_ids"]) for entry in processor.manifest.entries.values())
+        embedded_tokens = processor.embeddings.get_stats().get("tokens", 0)
+
+        retriever = processor._get_qa_chain().retriever
+        vectorstore = processor._get_vectorstore()
+        lexical_index = processor._get_lexical_index()
+        retrieval_latencies = []
+        ranks = {"hybrid": [], "bm25": [], "vector": []}
+        for item in sample:
+            question = item["question"]
+            start = time.perf_counter()
+            results = retriever.invoke(question)
+            retrieval_latencies.append(time.perf_counter() - start)
+            ranks["hybrid"].append(first_relevant(results[:k], item["relevant"]))
+            # Each search on its own shows which side of the fusion carries recall
+            ranks["bm25"].append(first_relevant(
+                [lexical_index.get(chunk_id)[0] for chunk_id, _ in lexical_index.search(question, k=k)],
+                item["relevant"]
+            ))
+            ranks["vector"].append(first_relevant(vectorstore.similarity_search(question, k=k), item["relevant"]))
+
+        answer_latencies = []
+        if answers:
+            for item in sample:
+                start = time.perf_counter()
+                processor._run(item["question"])
+                answer_latencies.append(time.perf_counter() - start)
+
+        retrieval_p50, retrieval_p95, retrieval_p99 = percentiles(retrieval_latencies)
+        answer_p50, answer_p95, answer_p99 = percentiles(answer_latencies)
+        metrics = {
+            "chunks": chunks,
+            "embedded_tokens": embedded_tokens,
+            "ingest_seconds": ingest_seconds,
+            "ingest_docs_per_s": num_docs / ingest_seconds if ingest_seconds else 0.0,
+            "ingest_chunks_per_s": chunks / ingest_seconds if ingest_seconds else 0.0,
+            "peak_rss_mb": peak_rss_mb(),
+            "peak_rss_growth_mb": peak_rss_mb() - rss_before,
+            "index_mb": directory_size(index_path) / 2 ** 20,
+            "retrieval_p50_ms": retrieval_p50,
+            "retrieval_p95_ms": retrieval_p95,
+            "retrieval_p99_ms": retrieval_p99,
+            "answer_p50_ms": answer_p50,
+            "answer_p95_ms": answer_p95,
+            "answer_p99_ms": answer_p99,
+        }
+        for name, branch_ranks in ranks.items():
+            suffix = "" if name == "hybrid" else f"_{name}"
+            metrics[f"recall_at_k{suffix}"] = float(np.mean([rank is not None for rank in branch_ranks]))
+            metrics[f"mrr_at_k{suffix}"] = float(np.mean([1.0 / rank if rank else 0.0 for rank in branch_ranks]))
+        config = {
+            "documents_path": None if documents_path.startswith(tmp) else documents_path,
+            "docs": num_docs,
+            "queries": len(sample),
+            "k": k,
+            "backend": backend,
+            "chunking": processor.chunk_profile.signature,
+            "neighbor_window": processor.neighbor_window,
+            "embeddings": embeddings_backend,
+            "dimension": dimension,
+            "embed_latency": embed_latency,
+            "llm_latency": llm_latency,
+            "seed": seed,
+        }
+
+    print(f"ingest: {num_docs} documents, {chunks} chunks, {embedded_tokens} tokens in {ingest_seconds:.2f}s "
+          f"({metrics['ingest_docs_per_s']:.1f} docs/s, {metrics['ingest_chunks_per_s']:.0f} chunks/s)")
+    print(f"memory: peak RSS {metrics['peak_rss_mb']:.0f}MB (+{metrics['peak_rss_growth_mb']:.0f}MB), "
+          f"index {metrics['index_mb']:.1f}MB")
+    print(f"retrieval: p50 {retrieval_p50:.1f}ms, p95 {retrieval_p95:.1f}ms, p99 {retrieval_p99:.1f}ms")
+    if answers:
+        print(f"answers: p50 {answer_p50:.1f}ms, p95 {answer_p95:.1f}ms, p99 {answer_p99:.1f}ms")
+    print(f"quality over {len(sample)} questions: recall@{k} {metrics['recall_at_k']:.3f}, "
+          f"MRR@{k} {metrics['mrr_at_k']:.3f} (BM25 alone {metrics['recall_at_k_bm25']:.3f}/"
+          f"{metrics['mrr_at_k_bm25']:.3f}, vector alone {metrics['recall_at_k_vector']:.3f}/"
+          f"{metrics['mrr_at_k_vector']:.3f})")
+
+    result = {"benchmark": "rag_pipeline", "revision": git_revision(), "created": time.time(),
+              "config": config, "metrics": metrics}
+    if output:
+        with open(output, "w") as f:
+            json.dump(result, f, indent=2)
+        print(f"Results written to {output}")
+    if compare_file:
+        with open(compare_file) as f:
+            previous = json.load(f)
+        if previous.get("config") != config:
+            print("Note: configurations differ")
+        regressions = compare(previous, result, tolerance)
+        print(f"{regressions} metrics regressed by more than {tolerance:.0%}")
+    if min_recall is not None and metrics["recall_at_k"] < min_recall:
+        raise click.ClickException(f"recall@{k} {metrics['recall_at_k']:.3f} is below {min_recall:.3f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,148 @@
+"""
+Vector backend benchmark
+
+Measures recall@k against exact search and p50/p99 query latency for the
+FAISS backend (flat and IVF), the float16 and int8 quantized stores (with
+and without float32 re-scoring) and Chroma on synthetic clustered vectors.
+Quantized stores also report their index size against float32, counting the
+float32 copy kept for re-scoring, and how much of it each query scans.
+"""
+
+import tempfile
+import time
+
+import click
+import numpy as np
+
+from utils.vector_backends import FaissVectorStore, QuantizedVectorStore
+
+
+def make_vectors(num_vectors: int, dimension: int, num_queries: int, seed: int = 0):
+    """Clustered unit vectors plus held-out queries drawn from the same clusters"""
+    rng = np.random.default_rng(seed)
+    num_clusters = max(8, int(np.sqrt(num_vectors) / 4))
+    centers = rng.standard_normal((num_clusters, dimension)).astype("float32")
+
+    def sample(count):
+        labels = rng.integers(0, num_clusters, count)
+        vectors = centers[labels] + 0.5 * rng.standard_normal((count, dimension)).astype("float32")
+        return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+    return sample(num_vectors), sample(num_queries)
+
+
+def exact_top_k(vectors, queries, k: int, block: int = 65536):
+    """Brute-force ground truth, computed in blocks to bound memory"""
+    best_scores = np.full((len(queries), k), -np.inf, dtype="float32")
+    best_ids = np.zeros((len(queries), k), dtype="int64")
+    for start in range(0, len(vectors), block):
+        scores = queries @ vectors[start:start + block].T
+        ids = np.arange(start, start + scores.shape[1])[None, :].repeat(len(queries), axis=0)
+        scores = np.concatenate([best_scores, scores], axis=1)
+        ids = np.concatenate([best_ids, ids], axis=1)
+        top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        best_scores = np.take_along_axis(scores, top, axis=1)
+        best_ids = np.take_along_axis(ids, top, axis=1)
+    return [set(row) for row in best_ids]
+
+
+def summarize(name, num_vectors, truth, results, latencies, build_seconds, memory: str = ""):
+    recall = np.mean([len(truth[i] & set(result)) / len(truth[i]) for i, result in enumerate(results)])
+    p50, p99 = np.percentile(np.array(latencies) * 1000, [50, 99])
+    print(f"{name:<16} n={num_vectors:<8} build={build_seconds:7.1f}s  "
+          f"recall@k={recall:.3f}  p50={p50:.2f}ms  p99={p99:.2f}ms{memory}")
+    return {"backend": name, "n": num_vectors, "recall": float(recall), "p50_ms": float(p50),
+            "p99_ms": float(p99), "build_s": build_seconds}
+
+
+def bench_faiss(name, vectors, queries, truth, k, ivf_threshold, nprobe, batch=50000):
+    store = FaissVectorStore(embedding=None, persist_directory=None,
+                             ivf_threshold=ivf_threshold, nprobe=nprobe)
+    start = time.perf_counter()
+    if ivf_threshold <= len(vectors):
+        # Train IVF on the full set instead of converting at the threshold
+        store.ivf_threshold = len(vectors)
+    for offset in range(0, len(vectors), batch):
+        chunk = vectors[offset:offset + batch]
+        ids = [str(i) for i in range(offset, offset + len(chunk))]
+        store.add_vectors(chunk, [""] * len(chunk), [{} for _ in chunk], ids)
+    build_seconds = time.perf_counter() - start
+
+    results, latencies = [], []
+    for query in queries:
+        start = time.perf_counter()
+        hits = store.similarity_search_with_score_by_vector(query, k)
+        latencies.append(time.perf_counter() - start)
+        results.append([int(doc.metadata["chunk_id"]) for doc, _ in hits])
+    return summarize(name, len(vectors), truth, results, latencies, build_seconds)
+
+
+def bench_quantized(dtype, rescore, vectors, queries, truth, k, batch=50000):
+    store = QuantizedVectorStore(embedding=None, persist_directory=None, dtype=dtype, rescore=rescore)
+    start = time.perf_counter()
+    for offset in range(0, len(vectors), batch):
+        chunk = vectors[offset:offset + batch]
+        ids = [str(i) for i in range(offset, offset + len(chunk))]
+        store.add_vectors(chunk, [""] * len(chunk), [{} for _ in chunk], ids)
+    build_seconds = time.perf_counter() - start
+
+    results, latencies = [], []
+    for query in queries:
+        start = time.perf_counter()
+        hits = store.similarity_search_with_score_by_vector(query, k)
+        latencies.append(time.perf_counter() - start)
+        results.append([int(doc.metadata["chunk_id"]) for doc, _ in hits])
+    stats = store.get_stats()
+    memory = (f"  index {stats['index_bytes'] / 2 ** 20:.1f}MB (scans {stats['scan_bytes'] / 2 ** 20:.1f}MB) "
+              f"vs {stats['float32_bytes'] / 2 ** 20:.1f}MB float32, {stats['size_ratio']:.2f}x, "
+              f"resident {stats['resident_bytes'] / 2 ** 20:.1f}MB")
+    name = f"{dtype}{'+rescore' if rescore else ''}"
+    return summarize(name, len(vectors), truth, results, latencies, build_seconds, memory)
+
+
+def bench_chroma(vectors, queries, truth, k, batch=5000):
+    import chromadb
+    with tempfile.TemporaryDirectory() as directory:
+        client = chromadb.PersistentClient(path=directory)
+        collection = client.create_collection("bench", metadata={"hnsw:space": "cosine"})
+        start = time.perf_counter()
+        for offset in range(0, len(vectors), batch):
+            chunk = vectors[offset:offset + batch]
+            collection.add(ids=[str(i) for i in range(offset, offset + len(chunk))],
+                           embeddings=chunk.tolist())
+        build_seconds = time.perf_counter() - start
+
+        results, latencies = [], []
+        for query in queries:
+            start = time.perf_counter()
+            hits = collection.query(query_embeddings=[query.tolist()], n_results=k)
+            latencies.append(time.perf_counter() - start)
+            results.append([int(i) for i in hits["ids"][0]])
+        return summarize("chroma", len(vectors), truth, results, latencies, build_seconds)
+
+
+@click.command()
+@click.option('--sizes', default="10000,100000,1000000", help='Comma separated collection sizes')
+@click.option('--dimension', default=256, help='Vector dimension')
+@click.option('--queries', default=200, help='Number of queries per size')
+@click.option('-k', '--top-k', default=10, help='Results per query')
+@click.option('--nprobe', default=16, help='IVF clusters searched per query')
+@click.option('--chroma-max', default=100000, help='Skip Chroma above this size (inserts are slow)')
+def main(sizes, dimension, queries, top_k, nprobe, chroma_max):
+    """Compare FAISS flat, FAISS IVF, quantized stores and Chroma on synthetic vectors"""
+    for size in [int(s) for s in sizes.split(",")]:
+        vectors, query_vectors = make_vectors(size, dimension, queries)
+        truth = exact_top_k(vectors, query_vectors, top_k)
+        bench_faiss("faiss-flat", vectors, query_vectors, truth, top_k, ivf_threshold=size + 1, nprobe=nprobe)
+        bench_faiss("faiss-ivf", vectors, query_vectors, truth, top_k, ivf_threshold=1, nprobe=nprobe)
+        for dtype in ("float16", "int8"):
+            for rescore in (False, True):
+                bench_quantized(dtype, rescore, vectors, query_vectors, truth, top_k)
+        if size <= chroma_max:
+            bench_chroma(vectors, query_vectors, truth, top_k)
+        else:
+            print(f"{'chroma':<16} n={size:<8} skipped (raise --chroma-max to include)")
+
+
+if __name__ == "__main__":
+    main()
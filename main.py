@@ -1,13 +1,19 @@
 #!/usr/bin/env python3
 
+import time
+
+# Taken before any other import so --profile-startup can report import time
+STARTED_AT = time.perf_counter()
+
 import os
 import click
 from dotenv import load_dotenv
 from rich.console import Console
 from rich.panel import Panel
-from rich.spinner import spinner
-from rich.live import live
 from agents.research_agent import ResearchAgent
+from utils.telemetry import configure_logging, get_telemetry, start_metrics_server
+
+IMPORTED_AT = time.perf_counter()
 
 #Load environment variables
 
@@ -16,10 +22,33 @@ load_dotenv()
 console = Console()
 
 class DocuMindAI:
-    def __init__(self):
-        """Initialize the DocuMindAI instance."""
+    def __init__(self, profile_startup: bool = False):
+        """Initialize the DocuMindAI instance.
+
+        The agent's LLM client, tools and index load on a background thread
+        while the welcome screen and prompt are shown.
+        """
+        init_start = time.perf_counter()
         self.agent = ResearchAgent()
+        self.warm_up = self.agent.start_warm_up()
         self.session_active = True
+        self.profile_startup = profile_startup
+        self.startup_timings = {
+            "imports": IMPORTED_AT - STARTED_AT,
+            "agent init": time.perf_counter() - init_start,
+        }
+
+    def display_startup_profile(self):
+        """Print startup timings, waiting for the background warm-up to finish"""
+        self.startup_timings["first prompt"] = time.perf_counter() - STARTED_AT
+        warm_start = time.perf_counter()
+        self.warm_up.join()
+        console.print("\n⏱  Startup profile:")
+        for name, seconds in self.startup_timings.items():
+            console.print(f"  {name:<24}{seconds * 1000:8.0f} ms")
+        console.print(f"  {'warm-up (background)':<24}{(time.perf_counter() - warm_start) * 1000:8.0f} ms after prompt")
+        for name, seconds in self.agent.init_timings.items():
+            console.print(f"    {name:<22}{seconds * 1000:8.0f} ms")
 
     def display_welcome(self):
         """Display the welcome message."""
@@ -38,6 +67,8 @@ class DocuMindAI:
         - 'search <query>' - Web search
         - 'ask <question>' - General questions
         - 'history' - Show conversation history
+        - 'metrics' - Show latency per traced operation
+        - 'rebuild' - Drop the document index and re-embed everything
         - 'clear' - Clear memory
         - 'quit' - Exit
         """
@@ -45,9 +76,10 @@ class DocuMindAI:
 
     def process_command(self, user_input: str):
         "Process user command"""
-        if user_input.lower() in ['quit', 'exist']:
+        if user_input.lower() in ['quit', 'exit']:
             self.session_active = False
             console.print("\n👋 Thank you for using DocuMindAI!")
+            return
 
         if user_input.lower() == 'history':
             history = self.agent.get_conversation_history()
@@ -56,45 +88,139 @@ class DocuMindAI:
                 console.print(f"{i}. {msg}")
             return
 
+        if user_input.lower() == 'metrics':
+            summary = get_telemetry().summary()
+            console.print("\n📊 Latency by operation:")
+            if not summary:
+                console.print("  Nothing traced yet")
+            for name, stats in sorted(summary.items()):
+                console.print(f"  {name:<24}{stats['count']:>6} calls {stats['mean_ms']:10.1f} ms mean "
+                              f"{stats['total_seconds']:9.2f} s total")
+            return
+
+        if user_input.lower() == 'rebuild':
+            with console.status("[bold green]Rebuilding document index..."):
+                result = self.agent.router.rebuild()
+            console.print(f"\n🔁 {result.message}")
+            return
+
         if user_input.lower() == 'clear':
             self.agent.clear_memory()
             console.print("\n🧹 Memory cleared!")
             return
 
-        #Process with agent
-        with console.status("[bold green]Processing...", spinner="dots"):
+        #Ingestion commands run directly; questions go to the agent, rendering tokens as they arrive
+        status = console.status("[bold green]Processing...", spinner="dots")
+        status.start()
+        answering = False
+        try:
+            for event in self.agent.router.stream(user_input):
+                if event["type"] == "tool_start":
+                    status.update(f"[bold green]Using {event['tool']}...")
+                    continue
+                if event["type"] == "tool_end":
+                    status.update("[bold green]Processing...")
+                    continue
+                if not answering:
+                    status.stop()
+                    console.print("\n🤖 Assistant: ", end="")
+                    answering = True
+                if event["type"] == "token":
+                    console.out(event["content"], end="", highlight=False)
+                elif event["type"] == "final" and not event["streamed"]:
+                    console.out(event["content"], highlight=False)
+                elif event["type"] == "error":
+                    console.print(f"\n❌ {event['content']}")
+            console.print()
+        except Exception as e:
+            console.print(f"\n❌ Error: {str(e)}")
+        finally:
+            status.stop()
+
+    def run(self):
+        """Main Application loop"""
+        self.display_welcome()
+        if self.profile_startup:
+            self.display_startup_profile()
+
+        while self.session_active:
             try:
-                response = self.agent.process_query(user_input)
-                console.print(f"\n🤖 Assistant: {response}")
+                user_input = console.input("\n💬 You: ")
+                if user_input.strip():
+                    self.process_command(user_input)
+            except KeyboardInterrupt:
+                console.print("\n\n👋 Goodbye!")
+                break
             except Exception as e:
                 console.print(f"\n❌ Error: {str(e)}")
 
-        def run(self):
-            """Main Application loop"""
-            self.display_welcome()
-
-            while self.session_active:
-                try:
-                    user_input = console.input("\n💬 You: ")
-                    if user_input.strip():
-                        self.process_command(user_input)
-                except KeyboardInterrupt:
-                    console.print("\n\n👋 Goodbye!")
-                    break
-                except Exception as e:
-                    console.print(f"\n❌ Error: {str(e)}")
-
-        @click.command()
-        @click.option('--mode', default='cli', help='Run mode: cli or web')
-        def main(mode):
-            """DocuMindAI - Document Intelligence Platform"""
-            if mode == 'web':
-                #Run Streamlit version
-                os.system("streamlit run web_app.py")
-            else:
-                #Run CLI version
-                app = DocuMindAI()
-                app.run()
-
-        if __name__ == "__main__":
-            main()
+@click.group(invoke_without_command=True)
+@click.option('--mode', default='cli', help='Run mode: cli or web')
+@click.option('--profile-startup', is_flag=True, help='Print import and initialization timings')
+@click.option('--log-level', default=None, help='Log level, e.g. INFO or DEBUG (defaults to DOCUMIND_LOG_LEVEL)')
+@click.option('--metrics-port', type=int, default=None,
+              help='Serve Prometheus metrics on this port (defaults to DOCUMIND_METRICS_PORT)')
+@click.option('--trace-file', default=None, help='Append finished spans to this JSONL file')
+@click.pass_context
+def main(ctx, mode, profile_startup, log_level, metrics_port, trace_file):
+    """DocuMindAI - Document Intelligence Platform"""
+    # Passed on through the environment so the web app sees them too
+    for name, value in (("DOCUMIND_LOG_LEVEL", log_level), ("DOCUMIND_METRICS_PORT", metrics_port),
+                        ("DOCUMIND_TRACE_FILE", trace_file)):
+        if value is not None:
+            os.environ[name] = str(value)
+    configure_logging()
+    if ctx.invoked_subcommand is not None:
+        return
+    if mode == 'web':
+        #Run Streamlit version
+        os.system("streamlit run web_app.py")
+    else:
+        #Run CLI version
+        if os.getenv("DOCUMIND_METRICS_PORT"):
+            start_metrics_server(int(os.environ["DOCUMIND_METRICS_PORT"]))
+        app = DocuMindAI(profile_startup=profile_startup)
+        app.run()
+
+@main.command()
+@click.option('--debounce', default=2.0, help='Seconds without file events before a batch is indexed')
+@click.option('--max-delay', default=30.0, help='Index pending files at least this often during a long copy')
+@click.option('--poll-interval', default=2.0, help='Seconds between directory scans when polling')
+@click.option('--polling', is_flag=True, help='Poll the directory instead of using inotify')
+def watch(debounce, max_delay, poll_interval, polling):
+    """Index documents as they are added, changed or deleted"""
+    from tools.document_processor import DocumentProcessor, SUPPORTED_EXTENSIONS
+    from utils.document_watcher import DocumentWatcher
+    from utils.index_lock import IndexLockedError
+
+    if os.getenv("DOCUMIND_METRICS_PORT"):
+        start_metrics_server(int(os.environ["DOCUMIND_METRICS_PORT"]))
+    try:
+        with console.status("[bold green]Syncing documents..."):
+            # Catch up on changes made while nothing was watching, then follow events
+            processor = DocumentProcessor(background_ingest=False, watch=False)
+    except IndexLockedError as e:
+        console.print(f"❌ {e}")
+        raise SystemExit(1)
+
+    def report_sync(report):
+        console.print(f"[{time.strftime('%H:%M:%S')}] {report.message} "
+                      f"({report.chunks} chunks in {report.elapsed_seconds:.1f}s)")
+
+    watcher = DocumentWatcher(
+        processor,
+        SUPPORTED_EXTENSIONS,
+        debounce_seconds=debounce,
+        max_delay_seconds=max_delay,
+        poll_seconds=poll_interval,
+        use_inotify=False if polling else None,
+        on_sync=report_sync
+    )
+    console.print(f"👀 Watching {processor.documents_path} (Ctrl+C to stop)")
+    try:
+        watcher.run()
+    except KeyboardInterrupt:
+        console.print("\n👋 Stopped watching")
+
+if __name__ == "__main__":
+    main()
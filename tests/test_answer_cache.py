@@ -0,0 +1,82 @@
+"""
+Tests for the exact and semantic answer cache
+"""
+
+from utils.answer_cache import AnswerCache
+
+
+class _TopicEmbeddings:
+    """Embeds every query about the same topic identically, whatever identifiers it names"""
+
+    def embed_query(self, text):
+        return [1.0, 0.0] if "torque" in text.lower() else [0.0, 1.0]
+
+
+def test_exact_hits_ignore_case_and_punctuation():
+    cache = AnswerCache()
+    cache.put("What is the torque for PN-100?", "40 Nm", ["c1"])
+    assert cache.get("what is the torque for pn-100") == "40 Nm"
+    assert cache.get("What is the torque for PN-200?") is None
+
+
+def test_semantic_hits_require_the_same_identifiers():
+    cache = AnswerCache(embeddings=_TopicEmbeddings(), similarity_threshold=0.95)
+    cache.put("What is the torque for PN-100?", "40 Nm", ["c1"])
+
+    assert cache.get("Tell me the torque for PN-100") == "40 Nm"
+    assert cache.get("Tell me the torque for PN-200") is None
+    assert cache.get("Tell me the torque") is None
+    assert cache.get("Tell me the torque for M8 on PN-100") is None
+    stats = cache.get_stats()
+    assert (stats["semantic_hits"], stats["misses"]) == (1, 3)
+
+
+def test_answers_are_dropped_when_their_chunks_change():
+    cache = AnswerCache()
+    cache.put("first question", "a", ["c1", "c2"])
+    cache.put("second question", "b", ["c3"])
+    assert cache.invalidate(["c2"]) == 1
+    assert cache.get("first question") is None
+    assert cache.get("second question") == "b"
+
+
+def test_semantic_tier_is_off_by_default(tmp_path, monkeypatch):
+    from benchmarks.fakes import FakeChatModel, FakeEmbeddings
+    from tools.document_processor import DocumentProcessor
+
+    monkeypatch.delenv("DOCUMIND_SEMANTIC_CACHE_THRESHOLD", raising=False)
+    processor = DocumentProcessor(index_path=str(tmp_path / "index"), documents_path=str(tmp_path / "documents"),
+                                  vector_backend="faiss", embeddings=FakeEmbeddings(), llm=FakeChatModel(),
+                                  background_ingest=False, watch=False)
+    assert processor.answer_cache.embeddings is None
+
+
+def test_adding_chunks_drops_every_answer_and_answers_started_before_it():
+    cache = AnswerCache()
+    cache.put("where is PN-7 covered", "not found", [])
+    generation = cache.generation
+    assert cache.corpus_changed() == 1
+    assert cache.get("where is PN-7 covered") is None
+
+    cache.put("where is PN-7 covered", "not found", [], generation=generation)
+    assert cache.get("where is PN-7 covered") is None
+    cache.put("where is PN-7 covered", "in b.txt", ["c9"], generation=cache.generation)
+    assert cache.get("where is PN-7 covered") == "in b.txt"
+
+
+def test_indexing_a_new_document_clears_cached_answers(tmp_path):
+    from benchmarks.fakes import FakeChatModel, FakeEmbeddings
+    from tools.document_processor import DocumentProcessor
+
+    documents = tmp_path / "documents"
+    documents.mkdir()
+    (documents / "a.txt").write_text("Part PN-1 is torqued to 40 Nm.\n")
+    processor = DocumentProcessor(index_path=str(tmp_path / "index"), documents_path=str(documents),
+                                  vector_backend="faiss", embeddings=FakeEmbeddings(lexical=True),
+                                  llm=FakeChatModel(), background_ingest=False, watch=False)
+    processor._run("What is the torque for PN-7?")
+    assert processor.answer_cache.get_stats()["entries"] == 1
+
+    (documents / "b.txt").write_text("Part PN-7 is torqued to 12 Nm.\n")
+    processor.index_document(str(documents / "b.txt"))
+    assert processor.answer_cache.get_stats()["entries"] == 0
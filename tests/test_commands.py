@@ -0,0 +1,110 @@
+"""
+Tests for ingestion command parsing and routing
+"""
+
+import pytest
+
+from agents.router import CommandRouter
+from utils.commands import CommandType, IngestionReport, parse_command
+
+
+@pytest.mark.parametrize("text", [
+    "process all documents",
+    "Process all the documents.",
+    "  sync documents ",
+    "ingest documents",
+    "index the documents!",
+])
+def test_process_all(text):
+    assert parse_command(text).type == CommandType.PROCESS_ALL
+
+
+@pytest.mark.parametrize("text, path", [
+    ("upload report.pdf", "report.pdf"),
+    ("upload: data/documents/notes.txt", "data/documents/notes.txt"),
+    ("process: C:\\docs\\manual.pdf", "C:\\docs\\manual.pdf"),
+    ("ingest my file.txt", "my file.txt"),
+])
+def test_process_file(text, path):
+    command = parse_command(text)
+    assert command.type == CommandType.PROCESS_FILE
+    assert command.argument == path
+
+
+@pytest.mark.parametrize("text", [
+    "How do I rebuild the index for E-100?",
+    "rebuild index",
+    "rebuild the index",
+    "Explain how we index documents in Solr",
+    "Can you process all documents about pumps?",
+    "Summarize the upload policy: see section 2.3",
+    "process: see section 2.3",
+    "upload report.pdf and summarize it",
+    "What does section 4 of manual.pdf say?",
+])
+def test_questions_are_not_commands(text):
+    command = parse_command(text)
+    assert command.type == CommandType.QUESTION
+    assert not command.is_ingestion
+
+
+class _DocProcessor:
+    def __init__(self):
+        self.commands = []
+
+    def run_command(self, command):
+        self.commands.append(command.type)
+        return IngestionReport(message=f"ran {command.type.value}")
+
+
+class _Agent:
+    def __init__(self):
+        self.doc_processor = _DocProcessor()
+        self.questions = []
+        self.exchanges = []
+
+    def process_query(self, text, session_id="default"):
+        self.questions.append(text)
+        return "answer"
+
+    def record_exchange(self, query, answer, session_id="default"):
+        self.exchanges.append((query, answer))
+
+
+def test_router_sends_questions_about_rebuilding_to_the_agent():
+    agent = _Agent()
+    result = CommandRouter(agent).route("How do I rebuild the index for E-100?")
+    assert result.handled_by == "agent"
+    assert agent.doc_processor.commands == []
+
+
+def test_router_rebuild_is_explicit():
+    agent = _Agent()
+    router = CommandRouter(agent)
+    result = router.rebuild()
+    assert result.handled_by == "router"
+    assert agent.doc_processor.commands == [CommandType.REBUILD_INDEX]
+    assert agent.exchanges == [("rebuild index", "ran rebuild_index")]
+
+
+def test_router_runs_commands_without_the_agent():
+    agent = _Agent()
+    result = CommandRouter(agent).route("process all documents")
+    assert result.report.message == "ran process_all"
+    assert agent.questions == []
+
+
+def test_upload_of_a_bare_filename_finds_it_in_the_documents_directory(tmp_path, monkeypatch):
+    from benchmarks.fakes import FakeChatModel, FakeEmbeddings
+    from tools.document_processor import DocumentProcessor
+
+    documents = tmp_path / "documents"
+    processor = DocumentProcessor(index_path=str(tmp_path / "index"), documents_path=str(documents),
+                                  vector_backend="faiss", embeddings=FakeEmbeddings(lexical=True),
+                                  llm=FakeChatModel(), background_ingest=False, watch=False)
+    (documents / "manual.txt").write_text("Part PN-1 is torqued to 40 Nm.\n")
+    monkeypatch.chdir(tmp_path)
+
+    report = processor.run_command(parse_command("upload manual.txt"))
+    assert report.ok and report.processed == ["manual.txt"]
+    assert not processor.run_command(parse_command("upload missing.txt")).ok
@@ -0,0 +1,75 @@
+"""
+Tests for streaming PDF pages in windows
+"""
+
+import gc
+import os
+import tracemalloc
+
+from utils.document_loader import count_pdf_pages, iter_pdf_windows
+
+
+def _write_pdf(path, pages, image_bytes=0):
+    """Write a PDF with one line of text per page and an optional unpainted image of ``image_bytes``"""
+    objects = [b"<< /Type /Catalog /Pages 2 0 R >>", None,
+               b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+    kids = []
+    for page in range(pages):
+        stream = b"BT /F1 12 Tf 40 800 Td (Page %d covers part PN-%05d.) Tj ET" % (page, page)
+        objects.append(b"<< /Length %d >>\nstream\n%s\nendstream" % (len(stream), stream))
+        content = len(objects)
+        resources = b"/Font << /F1 3 0 R >>"
+        if image_bytes:
+            objects.append(b"<< /Type /XObject /Subtype /Image /Width %d /Height 1 /ColorSpace /DeviceGray "
+                           b"/BitsPerComponent 8 /Length %d >>\nstream\n%s\nendstream"
+                           % (image_bytes, image_bytes, b"\x80" * image_bytes))
+            resources += b" /XObject << /Im1 %d 0 R >>" % len(objects)
+        objects.append(b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 842] /Contents %d 0 R "
+                       b"/Resources << %s >> >>" % (content, resources))
+        kids.append(len(objects))
+    objects[1] = b"<< /Type /Pages /Kids [%s] /Count %d >>" % (b" ".join(b"%d 0 R" % kid for kid in kids), pages)
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, 1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n%s\nendobj\n" % (number, body)
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    out += b"".join(b"%010d 00000 n \n" % offset for offset in offsets)
+    out += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+    with open(path, "wb") as f:
+        f.write(out)
+
+
+def test_windows_cover_every_page_and_resume(tmp_path):
+    path = str(tmp_path / "doc.pdf")
+    _write_pdf(path, 7)
+    assert count_pdf_pages(path) == 7
+
+    windows = list(iter_pdf_windows(path, 3))
+    assert [pages_done for pages_done, _ in windows] == [3, 6, 7]
+    pages = [document.metadata["page"] for _, documents in windows for document in documents]
+    assert pages == list(range(7))
+    assert "PN-00004" in windows[1][1][1].page_content
+
+    resumed = list(iter_pdf_windows(path, 3, start_page=5))
+    assert [[document.metadata["page"] for document in documents] for _, documents in resumed] == [[5, 6]]
+
+
+def test_streaming_memory_stays_well_below_the_file_size(tmp_path):
+    # 60 pages of 100 KB each: reading the file whole, or caching every
+    # parsed page, would cost at least the 6 MB file
+    path = str(tmp_path / "large.pdf")
+    _write_pdf(path, 60, image_bytes=100_000)
+    file_size = os.path.getsize(path)
+
+    gc.collect()
+    tracemalloc.start()
+    try:
+        for _ in iter_pdf_windows(path, 5):
+            pass
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    assert peak < file_size / 3
@@ -0,0 +1,33 @@
+"""
+Tests for the embedding wrappers and their SQLite cache
+"""
+
+import pytest
+
+from benchmarks.fakes import FakeEmbeddings
+from utils.embedding_cache import CachedEmbeddings
+from utils.embedding_pipeline import BatchedEmbeddings
+
+
+def test_wrappers_expose_attributes_of_the_wrapped_embeddings(tmp_path):
+    inner = FakeEmbeddings()
+    inner.model = "fake-model"
+    cached = CachedEmbeddings(BatchedEmbeddings(inner), cache_file=str(tmp_path / "cache" / "embeddings.sqlite"))
+    assert cached.model == "fake-model"
+    assert cached.model_name == "fake-model"
+    assert cached.size == inner.size
+
+
+def test_cache_survives_reopening_and_skips_the_api(tmp_path):
+    cache_file = str(tmp_path / "cache" / "embeddings.sqlite")
+    inner = FakeEmbeddings()
+    first = CachedEmbeddings(inner, cache_file=cache_file, model_name="fake")
+    vectors = first.embed_documents(["alpha", "beta"])
+    assert inner.calls == 1
+    assert first.conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+
+    reopened = CachedEmbeddings(inner, cache_file=cache_file, model_name="fake")
+    # Vectors are stored as float32
+    assert reopened.embed_documents(["beta", "alpha"]) == [pytest.approx(vectors[1], abs=1e-6),
+                                                           pytest.approx(vectors[0], abs=1e-6)]
+    assert inner.calls == 1
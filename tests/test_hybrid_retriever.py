@@ -0,0 +1,120 @@
+"""
+Tests for hybrid BM25 + vector retrieval
+"""
+
+import time
+
+from langchain_core.documents import Document
+
+from utils.hybrid_retriever import HybridRetriever, reciprocal_rank_fusion
+
+
+class _VectorStore:
+    def __init__(self, keys, delay=0.0):
+        self.keys = keys
+        self.delay = delay
+
+    def similarity_search(self, query, k=4):
+        time.sleep(self.delay)
+        return [Document(page_content=f"text {key}", metadata={"chunk_id": key}) for key in self.keys[:k]]
+
+
+class _LexicalIndex:
+    def __init__(self, keys, delay=0.0, texts=None):
+        self.keys = keys
+        self.delay = delay
+        self.texts = texts or {}
+
+    def search(self, query, k=10, deadline=None):
+        time.sleep(self.delay)
+        return [(key, 1.0 / (rank + 1)) for rank, key in enumerate(self.keys[:k])]
+
+    def get(self, chunk_id):
+        return self.texts.get(chunk_id, f"text {chunk_id}"), {}
+
+
+def keys(documents):
+    return [document.metadata["chunk_id"] for document in documents]
+
+
+def test_slow_vector_search_is_not_dropped_by_the_budget():
+    retriever = HybridRetriever(vectorstore=_VectorStore(["v1"], delay=0.3), lexical_index=_LexicalIndex(["l1"]),
+                                k=2, latency_budget_ms=50)
+    assert set(keys(retriever.invoke("query"))) == {"v1", "l1"}
+
+
+def test_slow_bm25_is_left_out_after_the_budget():
+    retriever = HybridRetriever(vectorstore=_VectorStore(["v1"]), lexical_index=_LexicalIndex(["l1"], delay=0.5),
+                                k=2, latency_budget_ms=50)
+    start = time.perf_counter()
+    assert keys(retriever.invoke("query")) == ["v1"]
+    assert time.perf_counter() - start < 0.4
+
+
+def test_bm25_index_persists_only_flushed_changes(tmp_path):
+    from utils.lexical_index import BM25Index
+
+    index_file = str(tmp_path / "lexical.sqlite")
+    index = BM25Index(index_file)
+    index.add(["c1", "c2"], ["torque for PN-100 is 40 Nm", "PN-200 needs 12 Nm"],
+              [{"page": 1}, {"page": 2}])
+    index.flush()
+    index.remove(["c2"])
+    index.add(["c3"], ["unflushed chunk about PN-300"])
+
+    reopened = BM25Index(index_file)
+    assert reopened.chunk_ids() == {"c1", "c2"}
+    assert reopened.get("c2") == ("PN-200 needs 12 Nm", {"page": 2})
+    assert [chunk_id for chunk_id, _ in reopened.search("pn-100 torque")][0] == "c1"
+
+    index.flush()
+    reopened = BM25Index(index_file)
+    assert reopened.chunk_ids() == {"c1", "c3"} and reopened.get("c2") is None
+    assert reopened.postings == index.postings and reopened.total_length == index.total_length
+
+
+def test_rrf_orders_by_summed_reciprocal_rank():
+    fused = reciprocal_rank_fusion([["a", "b", "c"], ["c", "b", "d"]], rrf_k=60)
+    # b and c appear in both lists; b ranks 2nd twice, c 3rd and 1st (same total), then a, then d
+    assert fused[:2] in (["b", "c"], ["c", "b"])
+    assert fused[2:] == ["a", "d"]
+
+
+def test_rrf_ties_keep_first_seen_order():
+    assert reciprocal_rank_fusion([["a"], ["b"]]) == ["a", "b"]
+
+
+def test_rrf_weights_favour_the_heavier_list():
+    assert reciprocal_rank_fusion([["a"], ["b"]], weights=[1.0, 2.0]) == ["b", "a"]
+    fused = reciprocal_rank_fusion([["x", "a", "b"], ["id", "b", "a"]], weights=[1.0, 2.0])
+    assert fused.index("id") < fused.index("x")
+    assert fused.index("b") < fused.index("a")
+
+
+def test_identifier_matches_from_bm25_come_first():
+    texts = {"exact": "Part XJ-0001-03 is fastened to 40 Nm."}
+    retriever = HybridRetriever(
+        vectorstore=_VectorStore(["v1", "v2", "v3"]),
+        lexical_index=_LexicalIndex(["near", "exact"], texts=texts),
+        k=3
+    )
+    results = keys(retriever.invoke("What torque is part XJ-0001-03 fastened to?"))
+    assert results[0] == "exact"
+    assert len(results) == 3
+
+
+def test_hybrid_recall_on_synthetic_corpus(tmp_path, monkeypatch):
+    # The benchmark corpus asks about unique part numbers that only BM25 can tell apart
+    from benchmarks.fakes import FakeChatModel, FakeEmbeddings
+    from benchmarks.rag_pipeline import first_relevant, make_corpus
+    from tools.document_processor import DocumentProcessor
+
+    monkeypatch.setenv("DOCUMIND_SEMANTIC_CACHE_THRESHOLD", "")
+    documents_path = str(tmp_path / "documents")
+    questions = make_corpus(documents_path, num_docs=10, facts_per_doc=3)
+    processor = DocumentProcessor(index_path=str(tmp_path / "index"), documents_path=documents_path,
+                                  vector_backend="faiss", embeddings=FakeEmbeddings(lexical=True),
+                                  llm=FakeChatModel(), background_ingest=False, watch=False)
+    retriever = processor._get_qa_chain().retriever
+    hits = [first_relevant(retriever.invoke(item["question"])[:3], item["relevant"]) for item in questions]
+    assert sum(hit is not None for hit in hits) / len(hits) >= 0.95
@@ -0,0 +1,34 @@
+"""
+Tests for the per-process index directory lock
+"""
+
+import subprocess
+import sys
+
+import pytest
+
+from utils.index_lock import IndexLockedError, acquire_index_lock
+
+HOLD_LOCK = (
+    "import sys\n"
+    "from utils.index_lock import acquire_index_lock\n"
+    "acquire_index_lock(sys.argv[1])\n"
+    "print('locked', flush=True)\n"
+    "sys.stdin.read()\n"
+)
+
+
+def test_second_process_is_refused_until_the_holder_exits(tmp_path):
+    index_path = str(tmp_path / "index")
+    holder = subprocess.Popen([sys.executable, "-c", HOLD_LOCK, index_path], stdin=subprocess.PIPE,
+                              stdout=subprocess.PIPE, text=True)
+    try:
+        assert holder.stdout.readline().strip() == "locked"
+        with pytest.raises(IndexLockedError, match=str(holder.pid)):
+            acquire_index_lock(index_path)
+    finally:
+        holder.communicate()
+
+    acquire_index_lock(index_path)
+    # Every processor in the holding process shares the lock
+    acquire_index_lock(index_path)
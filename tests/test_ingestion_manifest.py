@@ -0,0 +1,124 @@
+"""
+Tests for manifest diffing and for what a restart re-ingests or purges
+"""
+
+import os
+
+import pytest
+
+from utils.ingestion_manifest import IngestionManifest
+
+EXTENSIONS = (".pdf", ".txt")
+
+
+def _write(path, text):
+    with open(path, "w") as f:
+        f.write(text)
+
+
+def _record(manifest, file_path, chunks=1):
+    content_hash, size, mtime = IngestionManifest.fingerprint(file_path)
+    manifest.record(file_path, content_hash,
+                    [IngestionManifest.make_chunk_id(file_path, content_hash, i) for i in range(chunks)], size, mtime)
+
+
+def test_scan_reports_new_changed_and_removed_files(tmp_path):
+    documents = tmp_path / "documents"
+    documents.mkdir()
+    for name in ("a.txt", "b.txt", "c.txt"):
+        _write(documents / name, f"contents of {name}")
+    _write(documents / "notes.md", "not a supported type")
+    manifest = IngestionManifest(str(tmp_path / "manifest.json"))
+
+    changed, removed = manifest.scan(str(documents), EXTENSIONS)
+    assert [os.path.basename(path) for path in changed] == ["a.txt", "b.txt", "c.txt"]
+    assert removed == []
+    for file_path in changed:
+        _record(manifest, file_path)
+    assert manifest.scan(str(documents), EXTENSIONS) == ([], [])
+
+    _write(documents / "a.txt", "new contents of a.txt")
+    os.remove(documents / "b.txt")
+    _write(documents / "d.txt", "contents of d.txt")
+    reloaded = IngestionManifest(str(tmp_path / "manifest.json"))
+    changed, removed = reloaded.scan(str(documents), EXTENSIONS)
+    assert [os.path.basename(path) for path in changed] == ["a.txt", "d.txt"]
+    assert [os.path.basename(path) for path in removed] == ["b.txt"]
+
+
+def test_touched_file_with_the_same_content_stays_current(tmp_path):
+    file_path = str(tmp_path / "a.txt")
+    _write(file_path, "same contents")
+    manifest = IngestionManifest(str(tmp_path / "manifest.json"))
+    _record(manifest, file_path)
+
+    stat = os.stat(file_path)
+    os.utime(file_path, (stat.st_atime, stat.st_mtime + 10))
+    assert manifest.is_current(file_path)
+    assert manifest.entries[os.path.normpath(file_path)]["mtime"] == stat.st_mtime + 10
+
+
+def test_file_changed_while_it_was_being_indexed_counts_as_changed(tmp_path):
+    file_path = str(tmp_path / "a.txt")
+    _write(file_path, "first version")
+    manifest = IngestionManifest(str(tmp_path / "manifest.json"))
+    content_hash, size, mtime = IngestionManifest.fingerprint(file_path)
+
+    # Rewritten between hashing and recording: the entry must describe the hashed version
+    _write(file_path, "other version")
+    os.utime(file_path, (mtime + 5, mtime + 5))
+    manifest.record(file_path, content_hash, ["c1"], size, mtime)
+    assert not manifest.is_current(file_path)
+
+
+def test_partial_entries_are_never_current_and_resume_only_for_the_same_content(tmp_path):
+    file_path = str(tmp_path / "big.pdf")
+    _write(file_path, "pretend pdf")
+    manifest = IngestionManifest(str(tmp_path / "manifest.json"))
+    content_hash, size, mtime = IngestionManifest.fingerprint(file_path)
+    manifest.record_progress(file_path, content_hash, ["c1", "c2"], 50, size, mtime)
+
+    assert not manifest.is_current(file_path)
+    assert manifest.get_resume_point(file_path, content_hash) == 50
+    assert manifest.get_resume_point(file_path, "other-hash") == 0
+    assert manifest.check([file_path], EXTENSIONS) == ([os.path.normpath(file_path)], [])
+
+
+@pytest.mark.parametrize("backend", ["faiss", "chroma"])
+def test_restart_skips_unchanged_files_and_purges_deleted_ones(tmp_path, backend):
+    from benchmarks.fakes import FakeChatModel, FakeEmbeddings
+    from tools.document_processor import DocumentProcessor
+
+    documents = tmp_path / "documents"
+    documents.mkdir()
+    for i in range(3):
+        _write(documents / f"doc{i}.txt", f"Document {i} covers part PN-{100 + i}.\n" * 5)
+
+    def open_processor(embeddings):
+        return DocumentProcessor(index_path=str(tmp_path / "index"), documents_path=str(documents),
+                                 vector_backend=backend, embeddings=embeddings, llm=FakeChatModel(),
+                                 background_ingest=False, watch=False)
+
+    first = open_processor(FakeEmbeddings())
+    deleted_ids = first.manifest.get_chunk_ids(str(documents / "doc0.txt"))
+    assert len(first.manifest.entries) == 3 and deleted_ids
+
+    # Restart with nothing changed: no file is even looked up in the embedding cache
+    embeddings = FakeEmbeddings()
+    second = open_processor(embeddings)
+    assert embeddings.texts_embedded == 0
+    assert (second.embeddings.hits, second.embeddings.misses) == (0, 0)
+
+    # Restart after deleting one file and editing another
+    os.remove(documents / "doc0.txt")
+    _write(documents / "doc1.txt", "Document 1 now covers part PN-999.\n")
+    embeddings = FakeEmbeddings()
+    restarted = open_processor(embeddings)
+    assert sorted(os.path.basename(path) for path in restarted.manifest.entries) == ["doc1.txt", "doc2.txt"]
+    assert embeddings.texts_embedded == len(restarted.manifest.get_chunk_ids(str(documents / "doc1.txt")))
+
+    indexed = set(restarted._get_vectorstore().get()["ids"])
+    expected = {chunk_id for path in restarted.manifest.entries for chunk_id in restarted.manifest.get_chunk_ids(path)}
+    assert indexed == expected
+    assert restarted._get_lexical_index().chunk_ids() == expected
+    assert not indexed & set(deleted_ids)
@@ -0,0 +1,114 @@
+"""
+Tests for the ingestion job queue and its background worker
+"""
+
+import os
+
+from utils.ingestion_queue import IngestionJobQueue
+
+
+def _write_documents(directory, count):
+    os.makedirs(directory, exist_ok=True)
+    paths = []
+    for i in range(count):
+        path = os.path.join(directory, f"doc{i}.txt")
+        with open(path, "w") as f:
+            f.write(f"Document {i} describes part PN-{1000 + i} and its maintenance schedule.\n" * 5)
+        paths.append(path)
+    return paths
+
+
+def _processor(tmp_path, embeddings, **options):
+    from benchmarks.fakes import FakeChatModel
+    from tools.document_processor import DocumentProcessor
+
+    return DocumentProcessor(index_path=str(tmp_path / "index"), documents_path=str(tmp_path / "documents"),
+                             vector_backend="faiss", embeddings=embeddings, llm=FakeChatModel(),
+                             watch=False, **options)
+
+
+def test_claim_batch_takes_oldest_jobs_and_only_stale_ones_are_requeued(tmp_path):
+    queue_file = str(tmp_path / "jobs.sqlite")
+    jobs = IngestionJobQueue(queue_file)
+    job_ids = jobs.enqueue(["a.txt", "b.txt", "c.txt"])
+    assert jobs.enqueue(["b.txt"]) == [job_ids[1]]
+
+    batch = jobs.claim_batch(2)
+    assert [job["id"] for job in batch] == job_ids[:2]
+    assert all(job["status"] == "running" and job["owner"] == jobs.owner for job in batch)
+    assert [job["id"] for job in jobs.claim_batch(5)] == job_ids[2:]
+    assert jobs.claim_batch(5) == []
+
+    # Opening the queue while its owner is alive, e.g. to show status, leaves the jobs running
+    viewer = IngestionJobQueue(queue_file)
+    assert [job["status"] for job in viewer.list_jobs()] == ["running"] * 3
+
+    # Once the heartbeat is stale they are queued again, and the old owner can no longer finish them
+    restarted = IngestionJobQueue(queue_file, stale_seconds=0)
+    assert [job["status"] for job in restarted.list_jobs()] == ["queued"] * 3
+    jobs.finish(job_ids[0], "done")
+    assert restarted.get(job_ids[0])["status"] == "queued"
+
+
+def test_concurrent_queues_never_claim_the_same_job(tmp_path):
+    from concurrent.futures import ThreadPoolExecutor
+
+    queue_file = str(tmp_path / "jobs.sqlite")
+    job_ids = IngestionJobQueue(queue_file).enqueue([f"doc{i}.txt" for i in range(200)])
+    queues = [IngestionJobQueue(queue_file) for _ in range(4)]
+
+    def drain(jobs):
+        claimed = []
+        while True:
+            batch = jobs.claim_batch(3)
+            if not batch:
+                return claimed
+            claimed += [job["id"] for job in batch]
+
+    with ThreadPoolExecutor(len(queues)) as pool:
+        claims = list(pool.map(drain, queues))
+    assert sorted(job_id for claimed in claims for job_id in claimed) == job_ids
+
+
+def test_worker_embeds_queued_files_in_one_batch(tmp_path, monkeypatch):
+    from benchmarks.fakes import FakeEmbeddings
+
+    monkeypatch.setenv("DOCUMIND_LOAD_WORKERS", "2")
+    _write_documents(str(tmp_path / "documents"), 5)
+    embeddings = FakeEmbeddings(lexical=True)
+    processor = _processor(tmp_path, embeddings, background_ingest=True)
+    assert processor.worker.wait_idle(timeout=30)
+
+    assert embeddings.calls == 1
+    jobs = processor.get_ingestion_status()
+    assert len(jobs) == 5
+    for job in jobs:
+        assert job["status"] == "done", job["message"]
+        assert job["chunks_total"] > 0 and job["chunks_done"] == job["chunks_total"]
+    assert len(processor.manifest.entries) == 5
+
+
+def test_worker_fails_only_the_broken_file(tmp_path):
+    from benchmarks.fakes import FakeEmbeddings
+
+    documents_path = str(tmp_path / "documents")
+    _write_documents(documents_path, 2)
+    with open(os.path.join(documents_path, "broken.pdf"), "w") as f:
+        f.write("not a pdf")
+    processor = _processor(tmp_path, FakeEmbeddings(lexical=True), background_ingest=True)
+    assert processor.worker.wait_idle(timeout=30)
+
+    statuses = {os.path.basename(job["file_path"]): job["status"] for job in processor.get_ingestion_status()}
+    assert statuses == {"doc0.txt": "done", "doc1.txt": "done", "broken.pdf": "failed"}
+
+
+def test_index_document_reports_unchanged_and_missing_files(tmp_path):
+    from benchmarks.fakes import FakeEmbeddings
+
+    paths = _write_documents(str(tmp_path / "documents"), 1)
+    processor = _processor(tmp_path, FakeEmbeddings(lexical=True), background_ingest=False)
+
+    report = processor.index_document(paths[0])
+    assert report.unchanged == 1 and report.ok
+    missing = processor.index_document(str(tmp_path / "documents" / "missing.txt"))
+    assert not missing.ok
@@ -0,0 +1,100 @@
+"""
+Tests for how the research agent runs queries: streaming, async and prefetching
+"""
+
+import asyncio
+import threading
+import time
+
+from agents.research_agent import ResearchAgent
+from agents.streaming import StreamingCallbackHandler
+
+
+class _Executor:
+    """Agent executor stand-in that streams one token, then answers once released"""
+
+    def __init__(self):
+        self.release = threading.Event()
+        self.release.set()
+
+    def invoke(self, inputs, config=None):
+        for handler in config["callbacks"]:
+            if isinstance(handler, StreamingCallbackHandler):
+                handler.on_llm_new_token("Hel")
+        self.release.wait(5)
+        return {"output": f"answer to {inputs['input']}"}
+
+    async def ainvoke(self, inputs, config=None):
+        return {"output": f"answer to {inputs['input']}"}
+
+
+class _DocProcessor:
+    def __init__(self):
+        self.prefetch_threads = []
+
+    def prefetch(self, question):
+        self.prefetch_threads.append(threading.current_thread())
+        return None
+
+
+def _agent(tmp_path):
+    agent = ResearchAgent(doc_processor=_DocProcessor(), memory_db=str(tmp_path / "memory.sqlite"))
+    agent._agent_executor = _Executor()
+    return agent
+
+
+def _wait_for_history(agent, session_id, timeout=5.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        history = agent.get_conversation_history(session_id)
+        if history:
+            return history
+        time.sleep(0.02)
+    return []
+
+
+def test_stream_query_yields_tokens_then_the_final_answer(tmp_path):
+    agent = _agent(tmp_path)
+    events = list(agent.stream_query("hello", "s1"))
+    assert [event["type"] for event in events] == ["token", "final"]
+    assert events[-1]["content"] == "answer to hello" and events[-1]["streamed"]
+    assert agent.get_conversation_history("s1") == ["User: hello", "Assistant: answer to hello"]
+
+
+def test_stream_query_saves_the_turn_when_the_reader_stops_early(tmp_path):
+    agent = _agent(tmp_path)
+    agent._agent_executor.release.clear()
+    stream = agent.stream_query("hello", "s2")
+    assert next(stream)["type"] == "token"
+    stream.close()
+    agent._agent_executor.release.set()
+    assert _wait_for_history(agent, "s2") == ["User: hello", "Assistant: answer to hello"]
+
+
+def test_aprocess_query_keeps_blocking_work_off_the_event_loop(tmp_path):
+    agent = _agent(tmp_path)
+    agent._agent_executor = None
+    blocking_threads = []
+
+    def create_agent_executor():
+        blocking_threads.append(threading.current_thread())
+        return _Executor()
+
+    def record_thread(method):
+        def wrapper(*args, **kwargs):
+            blocking_threads.append(threading.current_thread())
+            return method(*args, **kwargs)
+        return wrapper
+
+    agent._create_agent_executor = create_agent_executor
+    for name in ("get_memory", "_agent_inputs", "_remember"):
+        setattr(agent, name, record_thread(getattr(agent, name)))
+
+    async def run():
+        return await agent.aprocess_query("hello", "s3"), threading.current_thread()
+
+    answer, loop_thread = asyncio.run(run())
+    assert answer == "answer to hello"
+    assert agent.doc_processor.prefetch_threads and loop_thread not in agent.doc_processor.prefetch_threads
+    assert len(blocking_threads) == 4 and loop_thread not in blocking_threads
+    assert agent.get_conversation_history("s3") == ["User: hello", "Assistant: answer to hello"]
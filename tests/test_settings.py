@@ -0,0 +1,29 @@
+"""
+Tests for reading boolean settings from the environment
+"""
+
+import pytest
+
+from utils.settings import env_flag
+
+
+@pytest.mark.parametrize("value", ["1", "true", "TRUE", "yes", "on", " True "])
+def test_true_values(monkeypatch, value):
+    monkeypatch.setenv("DOCUMIND_TEST_FLAG", value)
+    assert env_flag("DOCUMIND_TEST_FLAG", False) is True
+
+
+@pytest.mark.parametrize("value", ["0", "false", "No", "off"])
+def test_false_values(monkeypatch, value):
+    monkeypatch.setenv("DOCUMIND_TEST_FLAG", value)
+    assert env_flag("DOCUMIND_TEST_FLAG", True) is False
+
+
+@pytest.mark.parametrize("value", [None, "", "maybe"])
+def test_unset_empty_or_unknown_values_give_the_default(monkeypatch, value):
+    if value is None:
+        monkeypatch.delenv("DOCUMIND_TEST_FLAG", raising=False)
+    else:
+        monkeypatch.setenv("DOCUMIND_TEST_FLAG", value)
+    assert env_flag("DOCUMIND_TEST_FLAG", True) is True
+    assert env_flag("DOCUMIND_TEST_FLAG", False) is False
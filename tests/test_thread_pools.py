@@ -0,0 +1,20 @@
+"""
+Tests for the shared thread pools
+"""
+
+from utils.thread_pools import shared_pool
+
+
+def test_pool_is_created_once_and_sized_from_the_environment(monkeypatch):
+    monkeypatch.setenv("DOCUMIND_TEST_POOL_WORKERS", "3")
+    pool = shared_pool("test-pool", "DOCUMIND_TEST_POOL_WORKERS", 8)
+    assert pool._max_workers == 3
+
+    monkeypatch.setenv("DOCUMIND_TEST_POOL_WORKERS", "5")
+    assert shared_pool("test-pool", "DOCUMIND_TEST_POOL_WORKERS", 8) is pool
+    assert pool.submit(sum, [1, 2]).result() == 3
+
+
+def test_pool_falls_back_to_the_default_size(monkeypatch):
+    monkeypatch.delenv("DOCUMIND_DEFAULT_POOL_WORKERS", raising=False)
+    assert shared_pool("default-pool", "DOCUMIND_DEFAULT_POOL_WORKERS", 2)._max_workers == 2
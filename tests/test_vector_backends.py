@@ -0,0 +1,135 @@
+"""
+Tests for the FAISS and quantized vector stores
+"""
+
+import numpy as np
+import pytest
+
+from utils.vector_backends import FaissVectorStore, QuantizedVectorStore
+
+
+def make_vectors(count, dimension=32, seed=0):
+    rng = np.random.default_rng(seed)
+    vectors = rng.standard_normal((count, dimension)).astype("float32")
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def add(store, vectors, start=0):
+    ids = [f"c{i}" for i in range(start, start + len(vectors))]
+    store.add_vectors(vectors, [f"text {chunk_id}" for chunk_id in ids], [{"n": i} for i in range(len(ids))], ids)
+    return ids
+
+
+def search_ids(store, query, k):
+    return [document.metadata["chunk_id"] for document, _ in store.similarity_search_with_score_by_vector(query, k)]
+
+
+@pytest.mark.parametrize("dtype", ["float16", "int8"])
+@pytest.mark.parametrize("rescore", [False, True])
+def test_quantized_search_finds_the_nearest_vectors(tmp_path, dtype, rescore):
+    vectors = make_vectors(500)
+    store = QuantizedVectorStore(None, str(tmp_path / "store"), dtype=dtype, rescore=rescore)
+    add(store, vectors)
+    exact = np.argsort(-(vectors @ vectors[7]))[:10]
+    found = search_ids(store, vectors[7], 10)
+    assert found[0] == "c7"
+    overlap = len(set(found) & {f"c{i}" for i in exact}) / 10
+    assert overlap >= (1.0 if rescore else 0.8)
+
+
+def test_rescored_scores_are_exact_cosines(tmp_path):
+    vectors = make_vectors(200)
+    store = QuantizedVectorStore(None, None, dtype="int8", rescore=True)
+    add(store, vectors)
+    for document, score in store.similarity_search_with_score_by_vector(vectors[3], 5):
+        row = int(document.metadata["chunk_id"][1:])
+        assert score == pytest.approx(float(vectors[row] @ vectors[3]), abs=1e-5)
+
+
+def test_quantized_delete_persist_and_reload(tmp_path):
+    directory = str(tmp_path / "store")
+    vectors = make_vectors(100)
+    store = QuantizedVectorStore(None, directory, dtype="int8")
+    add(store, vectors)
+    store.delete(["c5"])
+    store.persist()
+    # Freed rows are reused once persisted, without disturbing other chunks
+    add(store, make_vectors(1, seed=1), start=100)
+    store.persist()
+
+    reopened = QuantizedVectorStore(None, directory, dtype="int8")
+    assert "c5" not in search_ids(reopened, vectors[5], 3)
+    assert search_ids(reopened, vectors[6], 1) == ["c6"]
+    assert reopened.get(["c100", "c5"])["ids"] == ["c100"]
+    assert reopened.get_stats()["vectors"] == 100
+
+
+@pytest.mark.parametrize("dtype, rescore, ratio", [
+    ("int8", False, 0.25 + 1 / 32),
+    ("int8", True, 1.25 + 1 / 32),
+    ("float16", False, 0.5),
+    ("float16", True, 1.5),
+])
+def test_stats_count_every_copy_of_the_vectors(tmp_path, dtype, rescore, ratio):
+    store = QuantizedVectorStore(None, str(tmp_path / "store"), dtype=dtype, rescore=rescore)
+    add(store, make_vectors(64))
+    store.persist()
+    stats = store.get_stats()
+    assert stats["size_ratio"] == pytest.approx(ratio)
+    assert stats["memory_saved"] == pytest.approx(1 - ratio)
+    # The files hold at least every stored copy, including the float32 one
+    assert stats["disk_bytes"] >= stats["index_bytes"]
+
+
+def test_chunk_texts_stay_in_sqlite_and_out_of_memory(tmp_path):
+    directory = str(tmp_path / "store")
+    store = QuantizedVectorStore(None, directory, dtype="int8")
+    ids = [f"c{i}" for i in range(200)]
+    texts = [f"chunk {i} " + "x" * 2000 for i in range(200)]
+    store.add_vectors(make_vectors(200), texts, [{"page": i} for i in range(200)], ids)
+    store.persist()
+    store.add_vectors(make_vectors(1, seed=2), ["unpersisted"], [{}], ["c200"])
+
+    stats = store.get_stats()
+    assert 0 < stats["resident_bytes"] < sum(len(text) for text in texts) / 10
+    reopened = QuantizedVectorStore(None, directory, dtype="int8")
+    assert reopened.get(["c7", "c200"]) == {"ids": ["c7"], "documents": [texts[7]], "metadatas": [{"page": 7}]}
+    assert search_ids(reopened, make_vectors(200)[7], 1) == ["c7"]
+
+
+def test_table_pickled_by_older_versions_is_imported(tmp_path):
+    import os
+    import pickle
+
+    from utils.vector_backends import _ChunkTable
+
+    directory = str(tmp_path / "store")
+    vectors = make_vectors(20)
+    store = QuantizedVectorStore(None, directory, dtype="int8")
+    add(store, vectors)
+    store.persist()
+    legacy = _ChunkTable.__new__(_ChunkTable)
+    legacy.__dict__.update(ids=[f"c{i}" for i in range(20)], texts=[f"text c{i}" for i in range(20)],
+                           metadatas=[{"n": i} for i in range(20)], free=[])
+    with open(os.path.join(directory, "table.pkl"), "wb") as f:
+        pickle.dump({**store._meta(), "scales": store.scales, "live": store.live, "table": legacy}, f)
+    store.table.close()
+    os.remove(os.path.join(directory, "chunks.sqlite"))
+
+    reopened = QuantizedVectorStore(None, directory, dtype="int8")
+    assert not os.path.exists(os.path.join(directory, "table.pkl"))
+    assert search_ids(reopened, vectors[4], 1) == ["c4"]
+    assert reopened.get(["c4"])["metadatas"] == [{"n": 4}]
+
+
+def test_faiss_store_replaces_and_deletes_by_id(tmp_path):
+    vectors = make_vectors(50)
+    store = FaissVectorStore(None, str(tmp_path / "faiss"))
+    add(store, vectors)
+    add(store, vectors[:1] * -1)  # c0 now points the other way
+    assert search_ids(store, vectors[0], 1) != ["c0"]
+    store.delete(["c1"])
+    store.persist()
+    reopened = FaissVectorStore(None, str(tmp_path / "faiss"))
+    assert "c1" not in search_ids(reopened, vectors[1], 5)
+    assert len(reopened.get()["ids"]) == 49
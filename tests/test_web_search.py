@@ -0,0 +1,118 @@
+"""
+Tests for the web search tool against a local SerpAPI stub: retries, caching and deduplication
+"""
+
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import pytest
+
+from tools.web_search import WebSearchTool
+
+
+class _SerpApiStub:
+    """HTTP server that answers each query with scripted error statuses, then results"""
+
+    def __init__(self):
+        self.requests = []
+        self.failures = {}
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                query = parse_qs(urlparse(self.path).query)["q"][0]
+                stub.requests.append((query, time.monotonic()))
+                statuses = stub.failures.get(query)
+                if statuses:
+                    self.send_response(statuses.pop(0))
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                    return
+                body = json.dumps({"organic_results": [
+                    {"title": f"About {query}", "snippet": f"{query} explained", "link": "https://example.com"}
+                ]}).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_port}/search"
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+
+    def queries(self):
+        return [query for query, _ in self.requests]
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+@pytest.fixture
+def stub(monkeypatch):
+    monkeypatch.setenv("SERPAPI_API_KEY", "test-key")
+    monkeypatch.setenv("NO_PROXY", "127.0.0.1")
+    server = _SerpApiStub()
+    yield server
+    server.close()
+
+
+def test_transient_errors_are_retried_with_backoff(stub):
+    stub.failures["flaky"] = [503, 429]
+    tool = WebSearchTool(search_url=stub.url)
+
+    assert "About flaky" in tool._run("flaky")
+    assert stub.queries() == ["flaky"] * 3
+    # urllib3 retries the first failure at once and backs off 0.5 * 2 seconds before the second
+    times = [at for _, at in stub.requests]
+    assert times[2] - times[1] >= 0.9
+
+
+def test_client_errors_are_reported_without_retrying(stub):
+    stub.failures["bad"] = [400]
+    tool = WebSearchTool(search_url=stub.url)
+
+    assert tool._run("bad").startswith("Error searching web")
+    assert stub.queries() == ["bad"]
+
+
+def test_results_are_cached_in_memory_and_in_sqlite(stub, tmp_path):
+    cache_file = str(tmp_path / "search_cache.sqlite")
+    tool = WebSearchTool(search_url=stub.url, cache_file=cache_file)
+
+    first = tool._run("Python  Packaging")
+    assert tool._run("python packaging") == first
+    assert stub.queries() == ["Python  Packaging"]
+    assert tool.cache.get_stats()["hits"] == 1
+
+    # A new process starts with an empty memory tier and reads the SQLite one
+    restarted = WebSearchTool(search_url=stub.url, cache_file=cache_file)
+    assert restarted._run("python packaging") == first
+    assert len(stub.requests) == 1
+    assert restarted.cache.get_stats()["hits"] == 1
+
+
+def test_expired_results_are_fetched_again(stub, tmp_path, monkeypatch):
+    monkeypatch.setenv("DOCUMIND_SEARCH_CACHE_TTL", "0")
+    tool = WebSearchTool(search_url=stub.url, cache_file=str(tmp_path / "search_cache.sqlite"))
+
+    tool._run("news")
+    tool._run("news")
+    assert stub.queries() == ["news", "news"]
+
+
+def test_search_many_sends_each_distinct_query_once(stub):
+    tool = WebSearchTool(search_url=stub.url)
+
+    results = tool.search_many(["Rust", "go", " rust ", "GO", "zig"])
+    assert sorted(stub.queries()) == ["Rust", "go", "zig"]
+    assert results[0] == results[2] and results[1] == results[3]
+    assert "About zig" in results[4]
@@ -4,43 +4,205 @@ Document Processing Tool with RAG capabilities
 
 from langchain.tools import BaseTool
 from langchain.callbacks.manager import CallbackManagerForToolRun
-from langchain_community.document_loaders import PyPDFLoader, TextLoader
-from langchain_text_splitters import RecursiveCharacterTextSplitter
-from langchain_openai import OpenAIEmbeddings
-from langchain_community.vectorstores import Chroma
-from langchain.chains import RetrievalQA
-from langchain_openai import ChatOpenAI
-from typing import Optional, Any
+from typing import Optional, Any, Callable, Dict, List
+import functools
+import logging
 import os
+import shutil
+import threading
+import time
 from dotenv import load_dotenv
+from utils.ingestion_manifest import IngestionManifest
+from utils.embedding_pipeline import BatchedEmbeddings
+from utils.embedding_cache import CachedEmbeddings
+from utils.embedding_backends import embedding_signature, open_embeddings
+from utils.retrieval_prefetch import RetrievalPrefetch, current_prefetch
+from utils.lexical_index import BM25Index
+from utils.hybrid_retriever import HybridRetriever, document_key
+from utils.answer_cache import AnswerCache
+from utils.context_assembler import ContextAssembler
+from utils.chunking import ChunkingProfile, ChunkNeighbors, get_profile
+from utils.document_loader import (
+    count_pdf_pages, iter_loaded_documents, iter_pdf_windows, split_window
+)
+from utils.index_lock import acquire_index_lock
+from utils.ingestion_queue import IngestionJobQueue, IngestionWorker
+from utils.commands import CommandType, IngestionReport, parse_command
+from utils.settings import env_flag
+from utils.telemetry import get_telemetry
 
 # Load environment variables from .env file
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
+SUPPORTED_EXTENSIONS = ('.pdf', '.txt')
+
 class DocumentProcessor(BaseTool):
     name: str = "document_analysis"
     description: str = "Analyze and answer questions about uploaded documents (PDF, TXT)"
     embeddings: Optional[Any] = None
+    embedding_backend: Optional[str] = None
     documents_dir: Optional[str] = None
     documents_path: Optional[str] = None
     vectorstore: Optional[Any] = None
     qa_chain: Optional[Any] = None
     llm: Optional[Any] = None
+    index_path: Optional[str] = None
+    vector_backend: str = "chroma"
+    persist_directory: Optional[str] = None
+    manifest: Optional[Any] = None
+    lexical_index: Optional[Any] = None
+    retrieval_budget_ms: Optional[float] = None
+    retrieval_k: int = 3
+    answer_cache: Optional[Any] = None
+    ingest_batch_chunks: int = 512
+    load_workers: Optional[int] = None
+    stream_window_pages: int = 50
+    stream_threshold_bytes: int = 20 * 1024 * 1024
+    index_lock: Optional[Any] = None
+    open_lock: Optional[Any] = None
+    background_ingest: bool = True
+    jobs: Optional[Any] = None
+    worker: Optional[Any] = None
+    context_assembler: Optional[Any] = None
+    chunk_profile: Optional[Any] = None
+    neighbor_window: int = 1
+    watcher: Optional[Any] = None
+    prefetch_overlap: float = 0.6
     
-    def __init__(self):
+    def __init__(
+        self,
+        index_path: Optional[str] = None,
+        vector_backend: Optional[str] = None,
+        documents_path: Optional[str] = None,
+        embeddings: Optional[Any] = None,
+        embedding_backend: Optional[str] = None,
+        llm: Optional[Any] = None,
+        background_ingest: Optional[bool] = None,
+        watch: Optional[bool] = None,
+        context_assembler: Optional[Any] = None,
+        chunk_profile: Optional[Any] = None
+    ):
         super().__init__()
-        self.embeddings = OpenAIEmbeddings()
-        self.documents_path = "data/documents"
+        # index_lock serializes index writes; open_lock only guards lazy opens,
+        # so queries never wait for a long-running ingest
+        self.index_lock = threading.RLock()
+        self.open_lock = threading.RLock()
+        self.documents_path = documents_path or "data/documents"
         self.documents_dir = self.documents_path  # For compatibility
-        self.llm = ChatOpenAI(model="gpt-3.5-turbo", temperature=0)
+        self.index_path = index_path or os.getenv("DOCUMIND_INDEX_DIR", "data/index")
+        # Nothing below reloads state written by another process, so only one may use the index
+        acquire_index_lock(self.index_path)
+        
+        # The embeddings backend is chosen per index (DOCUMIND_EMBEDDINGS), e.g.
+        # local hashed n-grams so ingestion and queries never touch the network
+        if embeddings is None:
+            self.embedding_backend = embedding_backend or os.getenv("DOCUMIND_EMBEDDINGS", "openai")
+            embeddings = open_embeddings(self.embedding_backend)
+        embedding_model = embedding_signature(embeddings)
+        
+        batched = BatchedEmbeddings(
+            embeddings,
+            max_workers=int(os.getenv("DOCUMIND_EMBED_WORKERS", "4"))
+        )
+        if getattr(embeddings, "local", False):
+            # Computing a local embedding is cheaper than a cache lookup
+            self.embeddings = batched
+        else:
+            # Cache in front of the batched client: only cache misses hit the API
+            self.embeddings = CachedEmbeddings(
+                batched,
+                cache_file=os.path.join(self.index_path, "embedding_cache.sqlite"),
+                max_entries=int(os.getenv("DOCUMIND_EMBED_CACHE_SIZE", "50000"))
+            )
+        self.vector_backend = vector_backend or os.getenv("DOCUMIND_VECTOR_BACKEND", "chroma")
+        self.persist_directory = os.path.join(self.index_path, self.vector_backend)
+        self.retrieval_budget_ms = float(os.getenv("DOCUMIND_RETRIEVAL_BUDGET_MS", "500"))
+        self.retrieval_k = int(os.getenv("DOCUMIND_RETRIEVAL_K", "3"))
+        self.prefetch_overlap = float(os.getenv("DOCUMIND_PREFETCH_OVERLAP", "0.6"))
+        self.load_workers = int(os.getenv("DOCUMIND_LOAD_WORKERS", "0")) or None
+        self.stream_window_pages = int(os.getenv("DOCUMIND_STREAM_WINDOW_PAGES", "50"))
+        self.stream_threshold_bytes = int(float(os.getenv("DOCUMIND_STREAM_THRESHOLD_MB", "20")) * 1024 * 1024)
+        # The chat client is created with the QA chain on first question
+        self.llm = llm
+        # Retrieved chunks are deduplicated and packed into a token budget
+        self.context_assembler = context_assembler or ContextAssembler(
+            chunk_budget=int(os.getenv("DOCUMIND_CHUNK_TOKEN_BUDGET", "1500"))
+        )
+        # Chunking profile for this corpus, by name or as a ChunkingProfile
+        if not isinstance(chunk_profile, ChunkingProfile):
+            chunk_profile = get_profile(chunk_profile)
+        self.chunk_profile = chunk_profile
+        # Hits are widened with adjacent chunks at query time, unless the
+        # profile already repeats text between chunks
+        self.neighbor_window = 0 if chunk_profile.overlap_tokens else int(
+            os.getenv("DOCUMIND_CHUNK_NEIGHBORS", "1")
+        )
         self.vectorstore = None
+        self.lexical_index = None
         self.qa_chain = None
         
+        # Repeated questions are answered from cache until their chunks change. Reusing
+        # answers to merely similar questions is opt-in (DOCUMIND_SEMANTIC_CACHE_THRESHOLD)
+        threshold = os.getenv("DOCUMIND_SEMANTIC_CACHE_THRESHOLD", "")
+        self.answer_cache = AnswerCache(
+            embeddings=self.embeddings if threshold else None,
+            similarity_threshold=float(threshold or 1.0),
+            ttl_seconds=float(os.getenv("DOCUMIND_ANSWER_CACHE_TTL", "3600")),
+            max_entries=int(os.getenv("DOCUMIND_ANSWER_CACHE_SIZE", "1000"))
+        )
+        
         # Create documents directory if it doesn't exist
         os.makedirs(self.documents_path, exist_ok=True)
         
+        # The manifest records which file versions are in the persisted index.
+        # If the index directory was wiped or the backend switched, the
+        # manifest no longer describes it.
+        self.manifest = IngestionManifest(os.path.join(self.index_path, "manifest.json"))
+        built_with = self.manifest.meta.get("vector_backend", "chroma")
+        if self.manifest.entries and (built_with != self.vector_backend
+                                      or not os.path.exists(self.persist_directory)):
+            logger.warning("Index directory missing or built with another backend, discarding stale ingestion manifest")
+            self.manifest.reset()
+        if self.manifest.meta.get("vector_backend") != self.vector_backend:
+            self.manifest.meta["vector_backend"] = self.vector_backend
+            self.manifest.save()
+        # Vectors from another embeddings model are not comparable, so the collection is rebuilt.
+        # Indexes from before the backend was recorded were embedded by OpenAI.
+        built_with = self.manifest.meta.get("embeddings") or (
+            "text-embedding-ada-002" if self.manifest.entries else None)
+        if built_with != embedding_model:
+            if built_with and self.manifest.entries:
+                logger.warning("Index was embedded with %s, now %s; every document will be re-embedded",
+                               built_with, embedding_model)
+                shutil.rmtree(self.persist_directory, ignore_errors=True)
+                self.manifest.reset()
+            self.manifest.meta["embeddings"] = embedding_model
+            self.manifest.save()
+        # Files chunked with another profile count as changed and are re-split
+        if self.manifest.meta.get("chunking") != self.chunk_profile.signature:
+            if self.manifest.entries:
+                logger.info("Chunking profile is now %s; documents will be re-chunked", self.chunk_profile.signature)
+            self.manifest.meta["chunking"] = self.chunk_profile.signature
+            self.manifest.save()
+        
+        # New and changed documents are ingested by a background worker unless
+        # DOCUMIND_BACKGROUND_INGEST=false; queries see each file once committed
+        if background_ingest is None:
+            background_ingest = env_flag("DOCUMIND_BACKGROUND_INGEST", True)
+        self.background_ingest = background_ingest
+        self.jobs = IngestionJobQueue(os.path.join(self.index_path, "jobs.sqlite"))
+        self.worker = IngestionWorker(self, self.jobs)
+        
         # Process any existing documents on initialization
         self._process_existing_documents()
+        
+        # With DOCUMIND_WATCH_DOCUMENTS=true the directory is followed for as long as the process runs
+        if watch is None:
+            watch = env_flag("DOCUMIND_WATCH_DOCUMENTS", False)
+        if watch:
+            self.watch_documents()
     
     def _run(
         self,
@@ -48,239 +210,554 @@ class DocumentProcessor(BaseTool):
         run_manager: Optional[CallbackManagerForToolRun] = None,
     ) -> str:
         """Run the document processor"""
-        print(f"DocumentProcessor received query: '{query}'")
-        
-        # Check if vectorstore exists first
-        if self.vectorstore is None:
-            print("Vectorstore is None, attempting to process existing documents")
-            # Try to process any existing documents if not already done
-            self._process_existing_documents()
+        logger.debug("DocumentProcessor received query: %r", query)
+        command = parse_command(query)
         
-        # Process all documents in directory
-        if "process all documents" in query.lower():
-            print("Processing all documents in directory")
-            if not os.path.exists(self.documents_path):
-                return "No documents directory found."
-            
-            files = os.listdir(self.documents_path)
-            if not files:
-                return "No documents found in the documents directory."
-            
-            processed = []
-            for file in files:
-                file_path = os.path.join(self.documents_path, file)
-                if file.lower().endswith('.pdf') or file.lower().endswith('.txt'):
-                    try:
-                        self._process_document(file_path)
-                        processed.append(file)
-                    except Exception as e:
-                        print(f"Error processing {file}: {str(e)}")
-                        continue
-            
-            if processed:
-                return f"Successfully processed {len(processed)} documents: {', '.join(processed)}"
-            else:
-                return "No documents were processed successfully."
-        
-        # Process single document (only if it contains a file path)
-        elif ("upload" in query.lower() or "process" in query.lower()) and ":" in query:
-            print("Processing single document")
-            # Extract file path from query
-            file_path = query.split(":")[-1].strip()
-            if not file_path:
-                return "Please provide a file path."
-            
-            try:
-                return self._process_document(file_path)
-            except Exception as e:
-                return f"Error processing document: {str(e)}"
+        if command.is_ingestion:
+            return self.run_command(command).message
         else:
             # Handle QA
-            print("Handling QA query")
-            if not self.vectorstore:
-                print("No vectorstore available for QA")
+            if not self.manifest.entries:
+                logger.info("No documents indexed yet, cannot answer %r", query)
+                if self.jobs.has_active():
+                    return "Documents are still being indexed. Please try again shortly."
                 return "No documents have been processed yet. Please upload a document first."
             
+            telemetry = get_telemetry()
             try:
-                print(f"Querying vectorstore with: {query}")
-                result = self.qa_chain.invoke({"query": query})["result"]
-                print(f"Got result: {result[:100]}...")
-                return result
+                with telemetry.span("qa") as span:
+                    generation = self.answer_cache.generation
+                    cached = self.answer_cache.get(query)
+                    if cached is not None:
+                        telemetry.cache("answer", hits=1)
+                        span.set(cached=True)
+                        return cached
+                    telemetry.cache("answer", misses=1)
+                    
+                    # Child callbacks put the chain's LLM and retriever runs under the tool's trace
+                    config = {"callbacks": run_manager.get_child()} if run_manager else None
+                    prefetch = current_prefetch()
+                    documents = prefetch.take(query) if prefetch is not None else None
+                    if documents is None:
+                        response = self._get_qa_chain().invoke({"query": query}, config=config)
+                    else:
+                        response = self._answer_from(query, documents, config)
+                    span.set(prefetched=documents is not None)
+                    result = response["result"]
+                    logger.debug("Answer for %r: %.100s", query, result)
+                    self.answer_cache.put(
+                        query, result,
+                        [document_key(document) for document in response.get("source_documents", [])],
+                        generation=generation
+                    )
+                    span.set(cached=False, sources=len(response.get("source_documents", [])))
+                    return result
             except Exception as e:
-                print(f"Error in QA: {str(e)}")
-                import traceback
-                print(traceback.format_exc())
+                logger.exception("Error answering %r", query)
                 return f"Error answering question: {str(e)}"
     
+    def prefetch(self, question: str) -> Optional[RetrievalPrefetch]:
+        """Start retrieving for a question in the background, before the agent picks a tool.
+
+        ``_run`` answers from these documents when the agent's query for this
+        tool matches the question. Returns None when there is nothing to
+        retrieve from or the question is an ingestion command.
+        """
+        if not self.manifest.entries or parse_command(question).is_ingestion:
+            return None
+        retriever = self._get_qa_chain().retriever
+        return RetrievalPrefetch(question, retriever.invoke, min_overlap=self.prefetch_overlap)
+    
+    def _answer_from(self, query: str, documents: list, config: Optional[dict] = None) -> dict:
+        """Run the QA chain's answer step on documents that were already retrieved"""
+        output = self._get_qa_chain().combine_documents_chain.invoke(
+            {"input_documents": documents, "question": query}, config=config
+        )
+        return {"result": output["output_text"], "source_documents": documents}
+    
+    def run_command(self, command) -> IngestionReport:
+        """Execute a parsed ingestion command directly, without the agent"""
+        if command.type == CommandType.REBUILD_INDEX:
+            logger.info("Rebuilding document index")
+            return self.rebuild()
+        if command.type == CommandType.PROCESS_ALL:
+            logger.info("Processing all documents in directory")
+            return self.sync_documents()
+        if command.type == CommandType.PROCESS_FILE:
+            logger.info("Processing single document %s", command.argument)
+            if not command.argument:
+                return IngestionReport(message="Please provide a file path.")
+            return self.index_document(self.resolve_document_path(command.argument))
+        raise ValueError(f"Not an ingestion command: {command.text!r}")
+    
+    def resolve_document_path(self, file_path: str) -> str:
+        """Resolve a path from a command; a bare filename missing from the CWD is looked up in documents_path"""
+        if not os.path.exists(file_path) and not os.path.dirname(file_path):
+            candidate = os.path.join(self.documents_path, file_path)
+            if os.path.exists(candidate):
+                return candidate
+        return file_path
+    
     def _handle_upload_request(self, query: str) -> str:
         """Handle document upload requests"""
-        # In a real implementation, this would handle file uploads
-        # For demo purposes, we'll look for files in the documents directory
-        try:
-            files = os.listdir(self.documents_path)
-            if not files:
-                return "No documents found in the documents directory. Please add some files to data/documents/"
-            
-            # Process all documents in the directory
-            all_documents = []
-            for file in files:
-                file_path = os.path.join(self.documents_path, file)
-                if file.endswith('.pdf'):
-                    loader = PyPDFLoader(file_path)
-                elif file.endswith('.txt'):
-                    loader = TextLoader(file_path)
-                else:
-                    continue
-                
-                documents = loader.load()
-                all_documents.extend(documents)
-            
-            if not all_documents:
-                return "No valid documents found (PDF or TXT files only)."
-            
-            # Split documents
-            text_splitter = RecursiveCharacterTextSplitter(
-                chunk_size=1000,
-                chunk_overlap=200
-            )
-            splits = text_splitter.split_documents(all_documents)
-            
-            # Create vectorstore
-            self.vectorstore = Chroma.from_documents(
-                documents=splits,
-                embedding=self.embeddings,
-                persist_directory="./chroma_db"
-            )
-            
-            # Create QA chain
-            self.qa_chain = RetrievalQA.from_chain_type(
-                llm=self.llm,
-                chain_type="stuff",
-                retriever=self.vectorstore.as_retriever(search_kwargs={"k": 3}),
-                return_source_documents=True
-            )
-            
-            return f"Successfully processed {len(all_documents)} documents with {len(splits)} text chunks. You can now ask questions about the content."
-            
-        except Exception as e:
-            return f"Error uploading documents: {str(e)}"
+        # Uploaded files land in the documents directory, so an upload is a sync
+        return self.process_all_documents()
+    
+    def _get_vectorstore(self):
+        """Open the persistent vector store on first use.
+
+        Opening an existing index only reads it from disk; nothing is
+        re-embedded, so a restart with an unchanged corpus makes no API calls.
+        """
+        if self.vectorstore is None:
+            with self.open_lock:
+                if self.vectorstore is None:
+                    from utils.vector_backends import open_vector_store
+                    logger.info("Opening %s vectorstore at %s", self.vector_backend, self.persist_directory)
+                    self.vectorstore = open_vector_store(
+                        self.vector_backend, self.embeddings, self.persist_directory
+                    )
+        return self.vectorstore
+    
+    def _get_lexical_index(self):
+        """Open the BM25 index on first use and reconcile it with the manifest.
+
+        If a previous run stopped between updating the vector store and
+        saving the lexical index, missing chunks are copied back from the
+        vector store and chunks no longer in the manifest are dropped.
+        """
+        if self.lexical_index is None:
+            with self.open_lock:
+                if self.lexical_index is None:
+                    # Indexes from before the SQLite store are rebuilt below from the vector store
+                    legacy_file = os.path.join(self.index_path, "lexical.pkl")
+                    if os.path.exists(legacy_file):
+                        os.remove(legacy_file)
+                    lexical_index = BM25Index(os.path.join(self.index_path, "lexical.sqlite"))
+                    expected = {chunk_id for entry in self.manifest.entries.values()
+                                for chunk_id in entry.get("chunk_ids", [])}
+                    indexed = lexical_index.chunk_ids()
+                    stale = indexed - expected
+                    missing = list(expected - indexed)
+                    if stale:
+                        logger.warning("Dropping %d stale chunks from lexical index", len(stale))
+                        lexical_index.remove(stale)
+                    if missing:
+                        logger.warning("Restoring %d chunks to lexical index from vectorstore", len(missing))
+                        stored = self._get_vectorstore().get(ids=missing)
+                        lexical_index.add(stored["ids"], stored["documents"], stored["metadatas"])
+                    lexical_index.flush()
+                    self.lexical_index = lexical_index
+        return self.lexical_index
+    
+    def _get_qa_chain(self):
+        """Create the QA chain over the hybrid BM25 + vector retriever on first use"""
+        if self.qa_chain is None:
+            with self.open_lock:
+                if self.qa_chain is None:
+                    from langchain.chains import RetrievalQA
+                    if self.llm is None:
+                        from langchain_openai import ChatOpenAI
+                        self.llm = ChatOpenAI(model="gpt-3.5-turbo", temperature=0)
+                    retriever = HybridRetriever(
+                        vectorstore=self._get_vectorstore(),
+                        lexical_index=self._get_lexical_index(),
+                        k=self.retrieval_k,
+                        latency_budget_ms=self.retrieval_budget_ms,
+                        context_assembler=self.context_assembler,
+                        neighbor_lookup=ChunkNeighbors(self.manifest, self._get_lexical_index()),
+                        neighbor_window=self.neighbor_window
+                    )
+                    self.qa_chain = RetrievalQA.from_chain_type(
+                        llm=self.llm,
+                        chain_type="stuff",
+                        retriever=retriever,
+                        return_source_documents=True
+                    )
+        return self.qa_chain
+    
+    def rebuild_index(self):
+        """Drop the persisted index and re-embed every document from scratch"""
+        return self.rebuild().message
+    
+    def rebuild(self) -> IngestionReport:
+        """Rebuild the index, returning a structured report"""
+        with self.index_lock:
+            logger.info("Rebuilding index at %s", self.persist_directory)
+            with self.open_lock:
+                self._get_vectorstore().delete_collection()
+                self.vectorstore = None
+                self.qa_chain = None
+                self.manifest.reset()
+                self._get_lexical_index().reset()
+                self.answer_cache.clear()
+            return self.sync_documents()
     
     def process_all_documents(self):
-        """Process all documents in the documents directory"""
+        """Bring the index in line with the documents directory.
+
+        Unchanged files are skipped, changed files have their old chunks
+        replaced and files deleted from disk are purged from the index.
+        """
+        return self.sync_documents().message
+    
+    def sync_documents(self) -> IngestionReport:
+        """Sync the index with the documents directory, returning a structured report"""
+        start = time.perf_counter()
+        with get_telemetry().span("ingest.sync") as span, self.index_lock:
+            report = self._sync_documents()
+            span.set(processed=len(report.processed), failed=len(report.failed), chunks=report.chunks)
+        report.elapsed_seconds = time.perf_counter() - start
+        return report
+    
+    def _sync_documents(self) -> IngestionReport:
+        """Sync the index with the documents directory; callers hold index_lock"""
         if not os.path.exists(self.documents_path):
-            return "No documents directory found."
+            return IngestionReport(message="No documents directory found.")
         
-        files = os.listdir(self.documents_path)
-        if not files:
-            return "No documents found in the documents directory."
+        changed, removed = self.manifest.scan(self.documents_path, SUPPORTED_EXTENSIONS)
+        return self._apply_changes(changed, removed)
+    
+    def sync_paths(self, file_paths: List[str]) -> IngestionReport:
+        """Sync only the given files: index new or changed ones and purge deleted ones.
+
+        Used by the document watcher, so a burst of file events costs one
+        batched ingest of just those files instead of a directory scan.
+        """
+        start = time.perf_counter()
+        with get_telemetry().span("ingest.sync", paths=len(file_paths)) as span, self.index_lock:
+            changed, removed = self.manifest.check(file_paths, SUPPORTED_EXTENSIONS)
+            report = self._apply_changes(changed, removed)
+            span.set(processed=len(report.processed), failed=len(report.failed), chunks=report.chunks)
+        report.elapsed_seconds = time.perf_counter() - start
+        return report
+    
+    def _apply_changes(self, changed: List[str], removed: List[str],
+                       progress: Optional[Callable[..., None]] = None) -> IngestionReport:
+        """Index changed files and purge removed ones; callers hold index_lock.
+
+        ``progress`` is called as ``progress(file_path, **counts)`` with
+        pages_done/pages_total and chunks_done/chunks_total as each file's
+        work is committed, and as ``progress(file_path, error=...)`` when a
+        file fails.
+        """
+        progress = progress or (lambda file_path, **counts: None)
+        self._remove_documents(removed)
         
+        # Files are parsed in a process pool and streamed in as they finish;
+        # chunks are gathered across files so small files share embedding batches
         processed = []
-        for file in files:
-            file_path = os.path.join(self.documents_path, file)
-            if file.lower().endswith('.pdf') or file.lower().endswith('.txt'):
-                try:
-                    self._process_document(file_path)
-                    processed.append(file)
-                except Exception as e:
-                    continue
+        failed = []
+        chunks = 0
+        pending = []
+        pending_chunks = 0
+        streamed = [file_path for file_path in changed if self._should_stream(file_path)]
+        pooled = [file_path for file_path in changed if file_path not in streamed]
+        telemetry = get_telemetry()
+        
+        def commit(pending):
+            committed = self._commit_documents(pending)
+            for file_path, _, splits, _, _ in pending:
+                if committed:
+                    progress(file_path, chunks_done=len(splits), chunks_total=len(splits))
+                else:
+                    failed.append(f"{os.path.basename(file_path)} (could not update the index)")
+                    progress(file_path, error="could not update the index")
+            processed.extend(committed)
+            return sum(len(splits) for _, _, splits, _, _ in pending) if committed else 0
+        
+        for file_path, loaded, error, seconds in iter_loaded_documents(pooled, self.load_workers, self.chunk_profile):
+            # Parsing happens in worker processes, so its time is recorded here
+            telemetry.record("ingest.parse", seconds, file=os.path.basename(file_path),
+                             chunks=len(loaded[2]) if loaded else 0, error=error)
+            if error:
+                logger.warning("Error processing %s: %s", file_path, error)
+                failed.append(f"{os.path.basename(file_path)} ({error})")
+                progress(file_path, error=error)
+                continue
+            progress(file_path, chunks_total=len(loaded[2]))
+            pending.append(loaded)
+            pending_chunks += len(loaded[2])
+            if pending_chunks >= self.ingest_batch_chunks:
+                chunks += commit(pending)
+                pending, pending_chunks = [], 0
+        if pending:
+            chunks += commit(pending)
         
+        # Large PDFs are ingested window by window to keep memory flat
+        for file_path in streamed:
+            try:
+                chunks += self._stream_document(file_path, functools.partial(progress, file_path))
+                processed.append(os.path.basename(file_path))
+            except Exception as e:
+                logger.exception("Error processing %s", file_path)
+                failed.append(f"{os.path.basename(file_path)} ({e})")
+                progress(file_path, error=str(e))
+        
+        if changed:
+            self._report_embedding_stats()
+        
+        report = IngestionReport(
+            processed=processed,
+            failed=failed,
+            removed=[os.path.basename(file_path) for file_path in removed],
+            unchanged=len(self.manifest.entries) - len(processed),
+            chunks=chunks
+        )
+        failures = f" Failed to process {len(failed)} documents: {'; '.join(failed)}" if failed else ""
         if processed:
-            return f"Successfully processed {len(processed)} documents: {', '.join(processed)}"
+            report.message = f"Successfully processed {len(processed)} documents: {', '.join(processed)}.{failures}"
+        elif changed:
+            report.message = f"No documents were processed successfully.{failures}"
+        elif not self.manifest.entries:
+            report.message = "No documents found in the documents directory."
+        elif removed:
+            report.message = f"Removed {len(removed)} deleted documents; all other documents are up to date."
         else:
-            return "No documents were processed successfully."
+            report.message = f"All {len(self.manifest.entries)} documents are already up to date."
+        return report
     
     def _process_document(self, file_path):
         """Process a single document file"""
-        try:
-            print(f"Starting to process document: {file_path}")
-            
-            # Load document based on file type
-            if file_path.lower().endswith('.pdf'):
-                print(f"Loading PDF file: {file_path}")
-                loader = PyPDFLoader(file_path)
-            elif file_path.lower().endswith('.txt'):
-                print(f"Loading text file: {file_path}")
-                loader = TextLoader(file_path)
-            else:
-                print(f"Unsupported file type: {file_path}")
-                return f"Unsupported file type: {file_path}"
-            
-            # Load the document
-            print("Loading document content...")
-            documents = loader.load()
-            print(f"Loaded {len(documents)} document(s)")
-            if not documents:
-                print("No content found in document")
-                return f"No content found in {file_path}"
-            
-            # Split text into chunks
-            print("Splitting text into chunks...")
-            text_splitter = RecursiveCharacterTextSplitter(
-                chunk_size=1000,
-                chunk_overlap=200
-            )
-            splits = text_splitter.split_documents(documents)
-            print(f"Created {len(splits)} text chunks")
-            
-            # Create or update vectorstore
-            print("Creating/updating vectorstore...")
-            if self.vectorstore:
-                print("Adding documents to existing vectorstore")
-                self.vectorstore.add_documents(splits)
+        return self.index_document(file_path).message
+    
+    def index_document(self, file_path) -> IngestionReport:
+        """Index a single document file, returning a structured report"""
+        file_path = os.path.normpath(file_path)
+        return self.index_documents([file_path])[file_path]
+    
+    def index_documents(self, file_paths: List[str],
+                        progress: Optional[Callable[..., None]] = None) -> Dict[str, IngestionReport]:
+        """Index several files as one batch, returning a report per normalized file path.
+
+        The files go through the same pooled parsing and shared embedding
+        batches as ``sync_documents``. ``progress`` is called as
+        ``progress(file_path, **counts)`` as each file's work is committed.
+        """
+        start = time.perf_counter()
+        file_paths = [os.path.normpath(file_path) for file_path in file_paths]
+        errors = {}
+        chunk_counts = {}
+        
+        def track(file_path, error=None, **counts):
+            if error:
+                errors[file_path] = error
+            if "chunks_done" in counts:
+                chunk_counts[file_path] = counts["chunks_done"]
+            if progress and counts:
+                progress(file_path, **counts)
+        
+        with get_telemetry().span("ingest.sync", paths=len(file_paths)) as span, self.index_lock:
+            changed, removed = self.manifest.check(file_paths, SUPPORTED_EXTENSIONS)
+            batch = self._apply_changes(changed, removed, track)
+            span.set(processed=len(batch.processed), failed=len(batch.failed), chunks=batch.chunks)
+        elapsed = time.perf_counter() - start
+        
+        reports = {}
+        for file_path in file_paths:
+            name = os.path.basename(file_path)
+            if not file_path.lower().endswith(SUPPORTED_EXTENSIONS):
+                logger.warning("Unsupported file type: %s", file_path)
+                report = IngestionReport(failed=[f"{name} (unsupported file type)"],
+                                         message=f"Unsupported file type: {file_path}")
+            elif file_path in errors:
+                report = IngestionReport(failed=[f"{name} ({errors[file_path]})"],
+                                         message=f"Error processing document {name}: {errors[file_path]}")
+            elif file_path in changed:
+                num_chunks = chunk_counts.get(file_path, 0)
+                report = IngestionReport(processed=[name], chunks=num_chunks,
+                                         message=f"Successfully processed {name} with {num_chunks} text chunks.")
+            elif file_path in removed:
+                report = IngestionReport(removed=[name], message=f"{name} was deleted and removed from the index.")
+            elif not os.path.exists(file_path):
+                report = IngestionReport(failed=[f"{name} (file not found)"],
+                                         message=f"Error processing document {name}: file not found")
             else:
-                print("Creating new vectorstore with embeddings")
-                self.embeddings = OpenAIEmbeddings()
-                self.vectorstore = Chroma.from_documents(
-                    documents=splits,
-                    embedding=self.embeddings
-                )
-            print("Vectorstore updated successfully")
-            
-            # Create QA chain if it doesn't exist
-            if not self.qa_chain:
-                print("Creating QA chain...")
-                self.qa_chain = RetrievalQA.from_chain_type(
-                    llm=self.llm,
-                    chain_type="stuff",
-                    retriever=self.vectorstore.as_retriever(search_kwargs={"k": 3}),
-                    return_source_documents=True
-                )
-                print("QA chain created successfully")
-            
-            print(f"Document processing complete: {os.path.basename(file_path)}")
-            return f"Successfully processed {os.path.basename(file_path)} with {len(splits)} text chunks."
+                report = IngestionReport(unchanged=1, message=f"{name} is already indexed and unchanged.")
+            report.elapsed_seconds = elapsed
+            reports[file_path] = report
+        return reports
+    
+    def _should_stream(self, file_path) -> bool:
+        """Large PDFs, and PDFs with an interrupted ingest, use the streaming path"""
+        if not file_path.lower().endswith('.pdf'):
+            return False
+        entry = self.manifest.entries.get(os.path.normpath(file_path))
+        if entry and not entry.get("complete", True):
+            return True
+        return os.path.getsize(file_path) >= self.stream_threshold_bytes
+    
+    def _stream_document(self, file_path, progress: Optional[Callable[..., None]] = None) -> int:
+        """Ingest a PDF a window of pages at a time, committing after each window.
+
+        Only stream_window_pages pages are parsed, split and embedded at once,
+        and progress is saved to the manifest so an interrupted run resumes
+        from the last committed page. Returns the number of chunks indexed.
+        """
+        content_hash, size, mtime = IngestionManifest.fingerprint(file_path)
+        vectorstore = self._get_vectorstore()
+        lexical_index = self._get_lexical_index()
+        start_page = self.manifest.get_resume_point(file_path, content_hash)
+        if start_page:
+            logger.info("Resuming %s from page %d", file_path, start_page)
+            chunk_ids = self.manifest.get_chunk_ids(file_path)
+        else:
+            # Drop chunks from the previous version of this file
+            chunk_ids = []
+            old_ids = self.manifest.get_chunk_ids(file_path)
+            if old_ids:
+                logger.info("Removing %d stale chunks", len(old_ids))
+                vectorstore.delete(ids=old_ids)
+                lexical_index.remove(old_ids)
+                self.answer_cache.invalidate(old_ids)
+        
+        telemetry = get_telemetry()
+        if progress:
+            progress(pages_total=count_pdf_pages(file_path), pages_done=start_page)
+        parse_start = time.perf_counter()
+        for pages_done, documents in iter_pdf_windows(file_path, self.stream_window_pages, start_page):
+            splits, window_ids = split_window(file_path, content_hash, documents,
+                                              self.chunk_profile, first_index=len(chunk_ids))
+            telemetry.record("ingest.parse", time.perf_counter() - parse_start, file=os.path.basename(file_path),
+                             pages=len(documents), chunks=len(splits))
+            with telemetry.span("ingest.embed_store", chunks=len(splits),
+                                tokens=sum(split.metadata.get("token_count", 0) for split in splits)):
+                if splits:
+                    vectorstore.add_documents(splits, ids=window_ids)
+                    lexical_index.add(window_ids, [split.page_content for split in splits],
+                                      [split.metadata for split in splits])
+                    self.answer_cache.corpus_changed()
+                vectorstore.persist()
+                lexical_index.flush()
+            chunk_ids.extend(window_ids)
+            self.manifest.record_progress(file_path, content_hash, chunk_ids, pages_done, size, mtime)
+            logger.info("Committed %s up to page %d (%d chunks)", file_path, pages_done, len(chunk_ids))
+            parse_start = time.perf_counter()
+            if progress:
+                progress(pages_done=pages_done, chunks_done=len(chunk_ids), chunks_total=len(chunk_ids))
+        
+        self.manifest.record(file_path, content_hash, chunk_ids, size, mtime)
+        return len(chunk_ids)
+    
+    def _commit_documents(self, loaded_documents):
+        """Embed and store the chunks of several loaded documents in one call.
+
+        Chunks from older versions of the files are replaced. Returns the
+        names of the files that were committed.
+        """
+        vectorstore = self._get_vectorstore()
+        lexical_index = self._get_lexical_index()
+        try:
+            # Drop chunks from the previous version of these files
+            old_ids = []
+            for file_path, _, _, _, _ in loaded_documents:
+                old_ids.extend(self.manifest.get_chunk_ids(file_path))
+            if old_ids:
+                logger.info("Removing %d stale chunks", len(old_ids))
+                vectorstore.delete(ids=old_ids)
+                lexical_index.remove(old_ids)
+                self.answer_cache.invalidate(old_ids)
             
-        except Exception as e:
-            print(f"Error processing document: {str(e)}")
-            import traceback
-            print(traceback.format_exc())
-            return f"Error processing document {os.path.basename(file_path)}: {str(e)}"
+            # The embeddings wrapper splits this into concurrent batches
+            splits = [split for _, _, doc_splits, _, _ in loaded_documents for split in doc_splits]
+            chunk_ids = [chunk_id for _, _, _, doc_ids, _ in loaded_documents for chunk_id in doc_ids]
+            tokens = sum(split.metadata.get("token_count", 0) for split in splits)
+            logger.info("Adding %d chunks (%d tokens) from %d documents to vectorstore",
+                        len(splits), tokens, len(loaded_documents))
+            with get_telemetry().span("ingest.embed_store", chunks=len(splits), tokens=tokens,
+                                      documents=len(loaded_documents)):
+                if splits:
+                    vectorstore.add_documents(splits, ids=chunk_ids)
+                    lexical_index.add(chunk_ids, [split.page_content for split in splits],
+                                      [split.metadata for split in splits])
+                    # Any cached answer, "not found" ones included, may now have a better source
+                    self.answer_cache.corpus_changed()
+                vectorstore.persist()
+                lexical_index.flush()
+        except Exception:
+            names = ", ".join(os.path.basename(doc[0]) for doc in loaded_documents)
+            logger.exception("Error adding documents to vectorstore (%s)", names)
+            return []
+        
+        self.manifest.record_many([(file_path, content_hash, doc_ids, size, mtime)
+                                   for file_path, content_hash, _, doc_ids, (size, mtime) in loaded_documents])
+        return [os.path.basename(doc[0]) for doc in loaded_documents]
+    
+    def get_neighbor_chunks(self, chunk_id: str, window: int = 1) -> list:
+        """Return a chunk and up to ``window`` chunks either side of it, in file order"""
+        return ChunkNeighbors(self.manifest, self._get_lexical_index())(chunk_id, window)
+    
+    def _report_embedding_stats(self):
+        """Log embedding throughput for the work done so far"""
+        if not hasattr(self.embeddings, "get_stats"):
+            return
+        stats = self.embeddings.get_stats()
+        logger.info("Embedded %d chunks (%d tokens) in %d batches: %.1f chunks/s, %.0f tokens/s, %d rate limits",
+                    stats["chunks"], stats["tokens"], stats["batches"], stats["chunks_per_sec"],
+                    stats["tokens_per_sec"], stats["rate_limits"])
+        if "cache_hit_rate" in stats:
+            logger.info("Embedding cache: %d hits, %d misses (%.0f%% hit rate, %d entries)",
+                        stats["cache_hits"], stats["cache_misses"], stats["cache_hit_rate"] * 100,
+                        stats["cache_entries"])
+    
+    def _remove_documents(self, file_paths: List[str]):
+        """Purge the chunks of deleted files from the index in one update"""
+        chunk_ids = self.manifest.remove_many(file_paths)
+        if chunk_ids:
+            logger.info("Removing %d chunks for %d deleted documents", len(chunk_ids), len(file_paths))
+            self._get_vectorstore().delete(ids=chunk_ids)
+            self._get_vectorstore().persist()
+            self._get_lexical_index().remove(chunk_ids)
+            self._get_lexical_index().flush()
+            self.answer_cache.invalidate(chunk_ids)
     
     def _process_existing_documents(self):
-        """Process any existing documents in the documents directory on initialization"""
-        print(f"Checking for documents in {self.documents_path}")
+        """Process any new or changed documents in the documents directory on initialization"""
+        logger.info("Checking for documents in %s", self.documents_path)
         if not os.path.exists(self.documents_path):
-            print(f"Directory {self.documents_path} does not exist")
-            return
-        
-        files = os.listdir(self.documents_path)
-        print(f"Found {len(files)} files in directory: {files}")
-        if not files:
-            print("No files found in directory")
+            logger.warning("Directory %s does not exist", self.documents_path)
             return
         
-        for file in files:
-            file_path = os.path.join(self.documents_path, file)
-            print(f"Checking file: {file_path}")
-            if file.lower().endswith('.pdf') or file.lower().endswith('.txt'):
-                try:
-                    print(f"Processing document: {file}")
-                    result = self._process_document(file_path)
-                    print(f"Result: {result}")
-                except Exception as e:
-                    print(f"Error processing document {file}: {str(e)}")
-            else:
-                print(f"Skipping file with unsupported extension: {file}")
+        if self.background_ingest:
+            job_ids = self.enqueue_documents()
+            logger.info("Queued %d documents for background ingestion", len(job_ids))
+        else:
+            logger.info("%s", self.process_all_documents())
+    
+    def enqueue_documents(self, file_paths: Optional[List[str]] = None) -> List[int]:
+        """Queue documents for the background worker and return their job ids.
+
+        Without ``file_paths`` the documents directory is scanned: deleted
+        files are purged right away and new or changed files are queued.
+        """
+        if file_paths is None:
+            if not os.path.exists(self.documents_path):
+                return []
+            with self.index_lock:
+                file_paths, removed = self.manifest.scan(self.documents_path, SUPPORTED_EXTENSIONS)
+                self._remove_documents(removed)
+        job_ids = self.jobs.enqueue(file_paths)
+        if job_ids:
+            self.worker.start()
+            self.worker.notify()
+        return job_ids
+    
+    def watch_documents(self, **options):
+        """Start a background watcher that indexes documents as they are added, changed or deleted.
+
+        ``options`` are passed to DocumentWatcher (debounce_seconds,
+        max_delay_seconds, poll_seconds, use_inotify, on_sync).
+        """
+        from utils.document_watcher import DocumentWatcher
+        if self.watcher is None:
+            options.setdefault("debounce_seconds", float(os.getenv("DOCUMIND_WATCH_DEBOUNCE", "2")))
+            self.watcher = DocumentWatcher(self, SUPPORTED_EXTENSIONS, **options)
+        self.watcher.start()
+        return self.watcher
+    
+    def get_ingestion_status(self, limit: int = 20) -> List[dict]:
+        """Return recent ingestion jobs with progress (0-1) and ETA in seconds"""
+        return self.jobs.list_jobs(limit)
     
     def get_tool(self):
         """Get the tool for agent use"""
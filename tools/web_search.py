@@ -4,25 +4,113 @@ Web Search Tool using SerpAPI
 
 from langchain.tools import BaseTool
 from langchain.callbacks.manager import CallbackManagerForToolRun
-from typing import Optional
+import contextvars
+from typing import Optional, Any, List
+import logging
+import re
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import os
 from dotenv import load_dotenv
+from utils.ttl_cache import TTLCache
+from utils.telemetry import get_telemetry
+from utils.thread_pools import shared_pool
 
 # Load environment variables from .env file
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
+SERPAPI_URL = "https://serpapi.com/search"
+
+def build_session(pool_size: int = 16, retries: int = 3) -> requests.Session:
+    """Create a pooled HTTP session that retries transient failures"""
+    retry = Retry(
+        total=retries,
+        backoff_factor=0.5,
+        status_forcelist=[429, 500, 502, 503, 504],
+        allowed_methods=["GET"]
+    )
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+    session = requests.Session()
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+def normalize_search_query(query: str) -> str:
+    """Normalize a query so trivially different spellings share a cache entry"""
+    return re.sub(r"\s+", " ", query.lower()).strip()
+
 class WebSearchTool(BaseTool):
     name: str = "web_search"
     description: str = "Search the web for current information on any topic"
     serpapi_key: Optional[str] = None
-    
-    def __init__(self):
+    search_url: str = SERPAPI_URL
+    timeout: float = 10.0
+    session: Optional[Any] = None
+    cache: Optional[Any] = None
+
+    def __init__(self, search_url: Optional[str] = None, cache_file: Optional[str] = None):
         super().__init__()
+        # A missing key is reported when a search is attempted, so the agent
+        # can still start and answer document questions without one
         self.serpapi_key = os.getenv("SERPAPI_API_KEY")
+
+        # SERPAPI_URL lets tests point the tool at a local stub server
+        self.search_url = search_url or os.getenv("SERPAPI_URL", SERPAPI_URL)
+        self.timeout = float(os.getenv("DOCUMIND_SEARCH_TIMEOUT", "10"))
+        self.session = build_session()
+        self.cache = TTLCache(
+            ttl_seconds=float(os.getenv("DOCUMIND_SEARCH_CACHE_TTL", "3600")),
+            max_entries=int(os.getenv("DOCUMIND_SEARCH_CACHE_SIZE", "1000")),
+            cache_file=cache_file or os.getenv("DOCUMIND_SEARCH_CACHE_FILE")
+        )
+
+    def _search(self, query: str) -> List[dict]:
+        """Return parsed organic results for a query, using the cache when possible"""
+        key = normalize_search_query(query)
+        results = self.cache.get(key)
+        telemetry = get_telemetry()
+        if results is not None:
+            telemetry.cache("web_search", hits=1)
+            return results
+        telemetry.cache("web_search", misses=1)
         if not self.serpapi_key:
             raise ValueError("SERPAPI_API_KEY not found in environment variables")
-    
+
+        params = {
+            "q": query,
+            "api_key": self.serpapi_key,
+            "engine": "google",
+            "num": 5
+        }
+        with telemetry.span("web_search.request") as span:
+            response = self.session.get(self.search_url, params=params, timeout=self.timeout)
+            span.set(status=response.status_code, output_bytes=len(response.content))
+            response.raise_for_status()
+            data = response.json()
+
+        # Extract search results
+        results = [
+            {
+                "title": result.get("title", ""),
+                "snippet": result.get("snippet", ""),
+                "link": result.get("link", "")
+            }
+            for result in data.get("organic_results", [])[:5]
+        ]
+        self.cache.set(key, results)
+        return results
+
+    @staticmethod
+    def _format_results(results: List[dict]) -> str:
+        formatted = [
+            f"Title: {result['title']}\nSnippet: {result['snippet']}\nURL: {result['link']}\n"
+            for result in results
+        ]
+        return "\n".join(formatted) if formatted else "No results found."
+
     def _run(
         self,
         query: str,
@@ -30,31 +118,27 @@ class WebSearchTool(BaseTool):
     ) -> str:
         """Execute web search"""
         try:
-            url = "https://serpapi.com/search"
-            params = {
-                "q": query,
-                "api_key": self.serpapi_key,
-                "engine": "google",
-                "num": 5
-            }
-            
-            response = requests.get(url, params=params)
-            data = response.json()
-            
-            # Extract search results
-            results = []
-            if "organic_results" in data:
-                for result in data["organic_results"][:5]:
-                    title = result.get("title", "")
-                    snippet = result.get("snippet", "")
-                    link = result.get("link", "")
-                    results.append(f"Title: {title}\nSnippet: {snippet}\nURL: {link}\n")
-            
-            return "\n".join(results) if results else "No results found."
-            
+            return self._format_results(self._search(query))
         except Exception as e:
+            logger.warning("Web search for %r failed: %s", query, e)
             return f"Error searching web: {str(e)}"
-    
+
+    def search_many(self, queries: List[str]) -> List[str]:
+        """Run several searches concurrently, returning formatted results in order.
+
+        Duplicate queries (after normalization) are only sent once. Searches
+        from every caller share one pool, sized by DOCUMIND_WEB_SEARCH_WORKERS.
+        """
+        unique = {}
+        for query in queries:
+            unique.setdefault(normalize_search_query(query), query)
+
+        pool = shared_pool("web-search", "DOCUMIND_WEB_SEARCH_WORKERS", 8)
+        # Copied contexts keep each search's spans in the caller's trace
+        futures = [pool.submit(contextvars.copy_context().run, self._run, query) for query in unique.values()]
+        results = dict(zip(unique, (future.result() for future in futures)))
+        return [results[normalize_search_query(query)] for query in queries]
+
     def get_tool(self):
         """Return the tool instance"""
         return self
@@ -63,6 +147,9 @@ class WebSearchWrapper:
     """Wrapper for easier integration"""
     def __init__(self):
         self.tool = WebSearchTool()
-    
+
     def search(self, query: str) -> str:
-        return self.tool._run(query)
\ No newline at end of file
+        return self.tool._run(query)
+
+    def search_many(self, queries: List[str]) -> List[str]:
+        return self.tool.search_many(queries)
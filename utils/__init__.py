@@ -1,3 +1,9 @@
-from .memory_manager import MemoryManager
-
 __all__ = ['MemoryManager']
+
+
+def __getattr__(name):
+    # Imported on first access so `import utils.x` does not load langchain
+    if name == 'MemoryManager':
+        from .memory_manager import MemoryManager
+        return MemoryManager
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,164 @@
+"""
+Answer Cache - exact and semantic cache for document QA answers
+"""
+
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, Optional
+
+from utils.lexical_index import identifier_tokens
+
+
+def normalize_query(query: str) -> str:
+    """Lowercase, collapse whitespace and drop trailing punctuation"""
+    return re.sub(r"\s+", " ", query.lower()).strip().rstrip("?!. ")
+
+
+class AnswerCache:
+    """Cache of QA answers keyed by normalized query, with an optional semantic tier.
+
+    When ``embeddings`` is given, a miss on the exact key falls back to the
+    cached answer whose query embedding is most similar, if the cosine
+    similarity reaches ``similarity_threshold`` and both queries name the
+    same identifiers (any token with a digit, e.g. a part number or error
+    code), which embeddings barely tell apart. Each entry remembers the
+    chunk ids its answer was built from and is dropped when any of them
+    change. Adding chunks can change any answer, including "not found"
+    ones, so ``corpus_changed`` drops everything and starts a new
+    generation. Entries expire after ``ttl_seconds`` and the least recently
+    used entry is evicted beyond ``max_entries``.
+    """
+
+    def __init__(
+        self,
+        embeddings: Any = None,
+        similarity_threshold: float = 0.95,
+        ttl_seconds: float = 3600,
+        max_entries: int = 1000,
+    ):
+        self.embeddings = embeddings
+        self.similarity_threshold = similarity_threshold
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.entries: "OrderedDict[str, dict]" = OrderedDict()
+        self.chunk_index: Dict[str, set] = {}
+        self.generation = 0
+        self.lock = threading.Lock()
+        self.stats = {"exact_hits": 0, "semantic_hits": 0, "misses": 0,
+                      "evictions": 0, "expirations": 0, "invalidations": 0}
+
+    def _embed(self, query: str):
+        import numpy as np
+        vector = np.asarray(self.embeddings.embed_query(query), dtype="float32")
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def _drop(self, key: str):
+        entry = self.entries.pop(key, None)
+        if entry is None:
+            return
+        for chunk_id in entry["chunk_ids"]:
+            keys = self.chunk_index.get(chunk_id)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self.chunk_index[chunk_id]
+
+    def _expire(self):
+        cutoff = time.time() - self.ttl_seconds
+        expired = [key for key, entry in self.entries.items() if entry["created"] < cutoff]
+        for key in expired:
+            self._drop(key)
+        self.stats["expirations"] += len(expired)
+
+    def get(self, query: str) -> Optional[str]:
+        """Return a cached answer for the query, or None on a miss"""
+        key = normalize_query(query)
+        with self.lock:
+            self._expire()
+            entry = self.entries.get(key)
+            if entry is not None:
+                self.entries.move_to_end(key)
+                self.stats["exact_hits"] += 1
+                return entry["answer"]
+            identifiers = frozenset(identifier_tokens(query, min_length=1))
+            candidates = [(k, e["vector"]) for k, e in self.entries.items()
+                          if e["vector"] is not None and e["identifiers"] == identifiers]
+
+        if self.embeddings is not None and candidates:
+            import numpy as np
+            vector = self._embed(query)
+            similarities = np.stack([candidate for _, candidate in candidates]) @ vector
+            best = int(np.argmax(similarities))
+            if similarities[best] >= self.similarity_threshold:
+                best_key = candidates[best][0]
+                with self.lock:
+                    entry = self.entries.get(best_key)
+                    if entry is not None:
+                        self.entries.move_to_end(best_key)
+                        self.stats["semantic_hits"] += 1
+                        return entry["answer"]
+
+        with self.lock:
+            self.stats["misses"] += 1
+        return None
+
+    def put(self, query: str, answer: str, chunk_ids: Iterable[str], generation: Optional[int] = None):
+        """Cache an answer along with the chunk ids it was built from.
+
+        ``generation`` is the value of ``self.generation`` when answering
+        started; an answer that raced with newly added chunks is not stored.
+        """
+        key = normalize_query(query)
+        vector = self._embed(query) if self.embeddings is not None else None
+        chunk_ids = set(chunk_ids)
+        with self.lock:
+            if generation is not None and generation != self.generation:
+                return
+            self._drop(key)
+            self.entries[key] = {"answer": answer, "chunk_ids": chunk_ids, "vector": vector,
+                                 "identifiers": frozenset(identifier_tokens(query, min_length=1)),
+                                 "created": time.time()}
+            for chunk_id in chunk_ids:
+                self.chunk_index.setdefault(chunk_id, set()).add(key)
+            while len(self.entries) > self.max_entries:
+                self._drop(next(iter(self.entries)))
+                self.stats["evictions"] += 1
+
+    def invalidate(self, chunk_ids: Iterable[str]) -> int:
+        """Drop every answer built from any of the given chunks"""
+        with self.lock:
+            keys = set()
+            for chunk_id in chunk_ids:
+                keys.update(self.chunk_index.get(chunk_id, ()))
+            for key in keys:
+                self._drop(key)
+            self.stats["invalidations"] += len(keys)
+        return len(keys)
+
+    def corpus_changed(self) -> int:
+        """Drop every answer after chunks were added, returning how many were dropped"""
+        with self.lock:
+            dropped = len(self.entries)
+            self.entries.clear()
+            self.chunk_index.clear()
+            self.generation += 1
+            self.stats["invalidations"] += dropped
+        return dropped
+
+    def clear(self):
+        """Drop every cached answer"""
+        with self.lock:
+            self.entries.clear()
+            self.chunk_index.clear()
+
+    def get_stats(self) -> dict:
+        """Return hit/miss counters and the hit rate"""
+        with self.lock:
+            stats = dict(self.stats)
+            stats["entries"] = len(self.entries)
+        lookups = stats["exact_hits"] + stats["semantic_hits"] + stats["misses"]
+        stats["hit_rate"] = (stats["exact_hits"] + stats["semantic_hits"]) / lookups if lookups else 0.0
+        return stats
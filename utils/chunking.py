@@ -0,0 +1,263 @@
+"""
+Chunking - token-based, structure-aware splitting with per-corpus profiles
+"""
+
+import hashlib
+import os
+import re
+from dataclasses import dataclass, replace
+from typing import Dict, List, Optional, Sequence
+
+from langchain_core.documents import Document
+
+from utils.embedding_pipeline import count_tokens
+
+MARKDOWN_HEADING = re.compile(r"^#{1,6}\s+\S")
+NUMBERED_HEADING = re.compile(r"^(?:\d+\.)+\d*\s+[A-Z]|^(?:chapter|section|part|appendix)\s+[0-9IVXLC]+\b",
+                              re.IGNORECASE)
+SENTENCE_END = re.compile(r"(?<=[.!?])\s+")
+WORD = re.compile(r"\S+\s*")
+
+
+@dataclass(frozen=True)
+class ChunkingProfile:
+    """How one corpus is cut into chunks.
+
+    Chunks hold up to ``chunk_tokens`` tokens of whole paragraphs, falling
+    back to sentences and then words for oversized paragraphs. Headings start
+    a new chunk once the current one has ``min_chunk_tokens``; with
+    ``page_breaks`` a chunk never spans pages. ``overlap_tokens`` repeats
+    trailing paragraphs in the next chunk, which the default profiles leave
+    at zero because retrieval can fetch neighbouring chunks instead.
+    """
+
+    name: str
+    chunk_tokens: int = 350
+    overlap_tokens: int = 0
+    min_chunk_tokens: int = 50
+    respect_headings: bool = True
+    page_breaks: bool = False
+
+    @property
+    def signature(self) -> str:
+        """Identify the profile and its settings; a change means re-chunking"""
+        flags = ("h" if self.respect_headings else "") + ("p" if self.page_breaks else "")
+        return f"{self.name}:{self.chunk_tokens}/{self.overlap_tokens}/{self.min_chunk_tokens}/{flags}"
+
+
+PROFILES: Dict[str, ChunkingProfile] = {
+    # Reports, articles and general documents
+    "default": ChunkingProfile("default"),
+    # Manuals and specs: short sections dense with identifiers
+    "technical": ChunkingProfile("technical", chunk_tokens=250, min_chunk_tokens=30),
+    # Books and long-form prose with few headings
+    "narrative": ChunkingProfile("narrative", chunk_tokens=500, respect_headings=False),
+    # Slides and forms, where each page stands alone
+    "paged": ChunkingProfile("paged", chunk_tokens=400, page_breaks=True),
+    # Close to the old 1000/200 character splitter
+    "legacy": ChunkingProfile("legacy", chunk_tokens=250, overlap_tokens=50, respect_headings=False),
+}
+
+
+def get_profile(name: Optional[str] = None) -> ChunkingProfile:
+    """Look up a profile by name (DOCUMIND_CHUNK_PROFILE by default).
+
+    DOCUMIND_CHUNK_TOKENS and DOCUMIND_CHUNK_OVERLAP override its sizes.
+    """
+    name = name or os.getenv("DOCUMIND_CHUNK_PROFILE", "default")
+    if name not in PROFILES:
+        raise ValueError(f"Unknown chunking profile {name!r}; choose from {', '.join(PROFILES)}")
+    profile = PROFILES[name]
+    if os.getenv("DOCUMIND_CHUNK_TOKENS"):
+        profile = replace(profile, chunk_tokens=int(os.environ["DOCUMIND_CHUNK_TOKENS"]))
+    if os.getenv("DOCUMIND_CHUNK_OVERLAP"):
+        profile = replace(profile, overlap_tokens=int(os.environ["DOCUMIND_CHUNK_OVERLAP"]))
+    return profile
+
+
+def is_heading(line: str) -> bool:
+    """Recognise markdown, numbered and all-caps heading lines"""
+    line = line.strip()
+    if not line or len(line) > 100:
+        return False
+    if MARKDOWN_HEADING.match(line):
+        return True
+    # Numbered list items are sentences; numbered headings are not
+    if NUMBERED_HEADING.match(line):
+        return not line.endswith((".", ",", ";"))
+    letters = sum(character.isalpha() for character in line)
+    return letters >= 4 and " " in line and line == line.upper()
+
+
+@dataclass
+class _Unit:
+    """A paragraph, sentence or word run at [start, end) of one page's text"""
+    page: int
+    start: int
+    end: int
+    tokens: int
+    heading: bool = False
+
+
+def _split_oversized(text: str, page: int, start: int, end: int, max_tokens: int) -> List[_Unit]:
+    """Break a span into sentence units, and over-long sentences into word runs"""
+    units = []
+    spans = []
+    position = start
+    for match in SENTENCE_END.finditer(text, start, end):
+        spans.append((position, match.end()))
+        position = match.end()
+    if position < end:
+        spans.append((position, end))
+
+    for span_start, span_end in spans:
+        tokens = count_tokens(text[span_start:span_end])
+        if tokens <= max_tokens:
+            units.append(_Unit(page, span_start, span_end, tokens))
+            continue
+        run_start, run_tokens = span_start, 0
+        for match in WORD.finditer(text, span_start, span_end):
+            word_tokens = count_tokens(match.group())
+            if run_tokens and run_tokens + word_tokens > max_tokens:
+                units.append(_Unit(page, run_start, match.start(), run_tokens))
+                run_start, run_tokens = match.start(), 0
+            run_tokens += word_tokens
+        if run_tokens:
+            units.append(_Unit(page, run_start, span_end, run_tokens))
+    return units
+
+
+def _page_units(text: str, page: int, max_tokens: int) -> List[_Unit]:
+    """Cut a page into heading and paragraph units with character offsets"""
+    units = []
+    paragraph_start = paragraph_end = None
+
+    def close_paragraph():
+        if paragraph_start is None:
+            return
+        tokens = count_tokens(text[paragraph_start:paragraph_end])
+        if tokens > max_tokens:
+            units.extend(_split_oversized(text, page, paragraph_start, paragraph_end, max_tokens))
+        else:
+            units.append(_Unit(page, paragraph_start, paragraph_end, tokens))
+
+    position = 0
+    for line in text.splitlines(keepends=True):
+        line_start, position = position, position + len(line)
+        stripped = line.strip()
+        if not stripped:
+            close_paragraph()
+            paragraph_start = None
+        elif is_heading(stripped):
+            close_paragraph()
+            paragraph_start = None
+            content_start = line_start + line.index(stripped[0])
+            units.append(_Unit(page, content_start, content_start + len(stripped),
+                               count_tokens(stripped), heading=True))
+        else:
+            if paragraph_start is None:
+                paragraph_start = line_start + line.index(stripped[0])
+            paragraph_end = line_start + len(line.rstrip())
+    close_paragraph()
+    return units
+
+
+def split_documents(documents: Sequence[Document], profile: Optional[ChunkingProfile] = None,
+                    first_index: int = 0) -> List[Document]:
+    """Split the pages of one file into chunks with precomputed metadata.
+
+    ``documents`` are the file's pages in order (a single document for plain
+    text). Each chunk keeps the metadata of the page it starts on plus
+    page_start/page_end, start_offset (into the first page's text) and
+    end_offset (into the last page's text), the section heading, its token
+    count, a content hash and chunk_index, its position in the file counting
+    from ``first_index``.
+    """
+    profile = profile or get_profile()
+    texts = [document.page_content for document in documents]
+    units: List[_Unit] = []
+    for page, text in enumerate(texts):
+        units.extend(_page_units(text, page, profile.chunk_tokens))
+
+    chunks = []
+    current: List[_Unit] = []
+    current_tokens = 0
+    section = ""
+    current_section = ""
+
+    def emit():
+        parts = []
+        for unit in current:
+            if parts and parts[-1][0] == unit.page:
+                parts[-1][2] = unit.end
+            else:
+                parts.append([unit.page, unit.start, unit.end])
+        text = "\n".join(texts[page][start:end] for page, start, end in parts)
+        first, last = current[0], current[-1]
+        metadata = dict(documents[first.page].metadata)
+        metadata.update({
+            "page_start": documents[first.page].metadata.get("page", first.page),
+            "page_end": documents[last.page].metadata.get("page", last.page),
+            "start_offset": first.start,
+            "end_offset": last.end,
+            "section": current_section,
+            "token_count": count_tokens(text),
+            "chunk_hash": hashlib.sha1(text.encode("utf-8")).hexdigest(),
+            "chunk_index": first_index + len(chunks),
+        })
+        chunks.append(Document(page_content=text, metadata=metadata))
+
+    for unit in units:
+        structural = current and (
+            (unit.heading and profile.respect_headings and current_tokens >= profile.min_chunk_tokens)
+            or (profile.page_breaks and unit.page != current[-1].page)
+        )
+        if current and (structural or current_tokens + unit.tokens > profile.chunk_tokens):
+            emit()
+            carried: List[_Unit] = []
+            if profile.overlap_tokens and not structural:
+                # Repeat trailing units that fit the overlap allowance
+                carried_tokens = 0
+                for previous in reversed(current):
+                    if carried_tokens + previous.tokens > profile.overlap_tokens:
+                        break
+                    carried.insert(0, previous)
+                    carried_tokens += previous.tokens
+            current = carried
+            current_tokens = sum(previous.tokens for previous in carried)
+        if unit.heading:
+            section = texts[unit.page][unit.start:unit.end].lstrip("#").strip()
+        if not current:
+            current_section = section
+        current.append(unit)
+        current_tokens += unit.tokens
+    if current:
+        emit()
+    return chunks
+
+
+class ChunkNeighbors:
+    """Fetch a chunk's neighbours in file order without touching the vector store.
+
+    Order comes from the manifest's per-file chunk id lists and text from the
+    lexical index, which stores every chunk with its metadata.
+    """
+
+    def __init__(self, manifest, lexical_index):
+        self.manifest = manifest
+        self.lexical_index = lexical_index
+
+    def __call__(self, chunk_id: str, window: int = 1) -> List[Document]:
+        """Return the chunk and up to ``window`` chunks either side of it"""
+        entry = self.lexical_index.get(chunk_id)
+        if entry is None:
+            return []
+        _, metadata = entry
+        neighbors = []
+        for neighbor_id in self.manifest.get_neighbor_ids(
+                metadata.get("source", ""), chunk_id, metadata.get("chunk_index"), window):
+            neighbor = self.lexical_index.get(neighbor_id)
+            if neighbor is not None:
+                text, neighbor_metadata = neighbor
+                neighbors.append(Document(page_content=text, metadata={**neighbor_metadata, "chunk_id": neighbor_id}))
+        return neighbors
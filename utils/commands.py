@@ -0,0 +1,84 @@
+"""
+Commands - typed parsing of ingestion commands and structured ingestion results
+"""
+
+import re
+from dataclasses import dataclass, field
+from enum import Enum
+from typing import List, Optional
+
+
+class CommandType(str, Enum):
+    PROCESS_ALL = "process_all"
+    PROCESS_FILE = "process_file"
+    REBUILD_INDEX = "rebuild_index"
+    QUESTION = "question"
+
+
+@dataclass(frozen=True)
+class Command:
+    """A parsed user input; ``argument`` holds the file path for PROCESS_FILE"""
+    type: CommandType
+    text: str
+    argument: Optional[str] = None
+
+    @property
+    def is_ingestion(self) -> bool:
+        return self.type != CommandType.QUESTION
+
+
+@dataclass
+class IngestionReport:
+    """Outcome of an ingestion or indexing command"""
+    processed: List[str] = field(default_factory=list)
+    failed: List[str] = field(default_factory=list)
+    removed: List[str] = field(default_factory=list)
+    unchanged: int = 0
+    chunks: int = 0
+    message: str = ""
+    elapsed_seconds: float = 0.0
+
+    @property
+    def ok(self) -> bool:
+        return not self.failed
+
+    def to_dict(self) -> dict:
+        return {
+            "ok": self.ok,
+            "processed": list(self.processed),
+            "failed": list(self.failed),
+            "removed": list(self.removed),
+            "unchanged": self.unchanged,
+            "chunks": self.chunks,
+            "message": self.message,
+            "elapsed_seconds": self.elapsed_seconds,
+        }
+
+
+# A command is the whole input, starting with its verb; anything else is a question.
+# Rebuilding is deliberately not parsed from text: it is an explicit CLI or UI action.
+_PROCESS_ALL = re.compile(r"^\s*(process|index|ingest|sync)\s+(all\s+)?(the\s+)?documents\s*[.!]?\s*$",
+                          re.IGNORECASE)
+# "upload: path", "process: path" and the CLI's "upload <filename>"; only the
+# first colon, right after the verb, is a separator so Windows drive letters survive
+_FILE_COMMAND = re.compile(r"^\s*(upload|process|ingest)(\s*:\s*|\s+)(?P<path>\S.*\.(pdf|txt))\s*$", re.IGNORECASE)
+
+
+def parse_command(text: str) -> Command:
+    """Classify input as an ingestion command or an open-ended question.
+
+    Matching is deterministic so ingestion never needs an LLM round trip to
+    pick a tool. Only an input that is nothing but a command counts;
+    "How do I process all documents?" is a question.
+    """
+    if _PROCESS_ALL.match(text):
+        return Command(CommandType.PROCESS_ALL, text)
+    match = _FILE_COMMAND.match(text)
+    if match:
+        return Command(CommandType.PROCESS_FILE, text, match.group("path").strip())
+    return Command(CommandType.QUESTION, text)
+
+
+def rebuild_command() -> Command:
+    """The command behind explicit "rebuild index" actions in the CLI and web app"""
+    return Command(CommandType.REBUILD_INDEX, "rebuild index")
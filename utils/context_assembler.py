@@ -0,0 +1,174 @@
+"""
+Context Assembler - fits chat history, summaries and retrieved chunks into token budgets
+"""
+
+import hashlib
+import logging
+import re
+import threading
+from collections import deque
+from typing import Any, Callable, List, Optional, Sequence, Tuple
+
+from utils.embedding_pipeline import count_tokens, truncate_tokens
+
+logger = logging.getLogger(__name__)
+
+# Overlaps shorter than this are coincidental rather than splitter overlap
+MIN_OVERLAP_CHARS = 20
+
+
+def _content_hash(text: str) -> str:
+    return hashlib.sha1(re.sub(r"\s+", " ", text).strip().lower().encode("utf-8")).hexdigest()
+
+
+def _overlap(left: str, right: str, max_chars: int) -> int:
+    """Length of the longest suffix of ``left`` that is a prefix of ``right``"""
+    for length in range(min(len(left), len(right), max_chars), MIN_OVERLAP_CHARS - 1, -1):
+        if left.endswith(right[:length]):
+            return length
+    return 0
+
+
+class ContextAssembler:
+    """Build prompt context within fixed token budgets.
+
+    Chat history keeps the most recent messages that fit ``history_budget``
+    tokens; older turns are folded into a rolling summary of at most
+    ``summary_budget`` tokens. Retrieved chunks are deduplicated, have the
+    text they share with higher-ranked chunks trimmed (the splitter overlaps
+    neighbouring chunks), and are packed in rank order into
+    ``chunk_budget`` tokens.
+
+    Summaries are extractive by default; pass ``summarizer``, a callable
+    taking (previous_summary, transcript) and returning text, to use an LLM.
+    Token counts for each call are kept for ``get_stats``.
+    """
+
+    def __init__(
+        self,
+        history_budget: int = 1500,
+        summary_budget: int = 300,
+        chunk_budget: int = 1500,
+        summarizer: Optional[Callable[[str, str], str]] = None,
+        max_overlap_chars: int = 400,
+    ):
+        self.history_budget = history_budget
+        self.summary_budget = summary_budget
+        self.chunk_budget = chunk_budget
+        self.summarizer = summarizer
+        self.max_overlap_chars = max_overlap_chars
+        self.lock = threading.Lock()
+        self.recent: deque = deque(maxlen=1000)
+        self.totals = {"history_calls": 0, "history_tokens": 0, "summary_tokens": 0,
+                       "messages_dropped": 0, "chunk_calls": 0, "chunk_tokens": 0,
+                       "chunks_deduplicated": 0, "chunk_tokens_trimmed": 0, "chunks_dropped": 0}
+
+    def _record(self, kind: str, **counts: int):
+        with self.lock:
+            self.recent.append({"kind": kind, **counts})
+            for key, value in counts.items():
+                if key in self.totals:
+                    self.totals[key] += value
+            self.totals[f"{kind}_calls"] += 1
+
+    def fit_history(self, messages: Sequence[Any], summary: str = "", record: bool = True) -> Tuple[list, list]:
+        """Split messages into (kept, overflow): the newest that fit the budget and the rest.
+
+        Tokens for the summary are reserved from the history budget.
+        """
+        budget = self.history_budget - (count_tokens(summary) if summary else 0)
+        kept = []
+        used = 0
+        for index in range(len(messages) - 1, -1, -1):
+            tokens = count_tokens(messages[index].content) + 4  # role and separators
+            if used + tokens > budget:
+                break
+            kept.append(messages[index])
+            used += tokens
+        kept.reverse()
+        overflow = list(messages[:len(messages) - len(kept)])
+        if record:
+            self._record("history", history_tokens=used, summary_tokens=count_tokens(summary) if summary else 0,
+                         messages_dropped=len(overflow))
+        return kept, overflow
+
+    def summarize(self, summary: str, messages: Sequence[Any]) -> str:
+        """Fold messages into the running summary, keeping it within summary_budget"""
+        if not messages:
+            return summary
+        transcript = "\n".join(
+            f"{'User' if message.type == 'human' else 'Assistant'}: {message.content}" for message in messages
+        )
+        if self.summarizer is not None:
+            try:
+                return truncate_tokens(self.summarizer(summary, transcript).strip(), self.summary_budget)
+            except Exception as e:
+                logger.warning("Error summarizing conversation, using extractive summary: %s", e)
+        # Extractive: the opening of each turn, newest lines kept when over budget
+        lines = [line for line in summary.split("\n") if line]
+        for message in messages:
+            role = "User asked" if message.type == "human" else "Assistant said"
+            lines.append(f"{role}: {truncate_tokens(' '.join(message.content.split()), 40)}")
+        while len(lines) > 1 and count_tokens("\n".join(lines)) > self.summary_budget:
+            lines.pop(0)
+        return truncate_tokens("\n".join(lines), self.summary_budget)
+
+    def fit_documents(self, documents: Sequence[Any], budget: Optional[int] = None) -> List[Any]:
+        """Deduplicate, overlap-trim and pack ranked documents into the chunk budget"""
+        from langchain_core.documents import Document
+
+        budget = self.chunk_budget if budget is None else budget
+        selected: List[Any] = []
+        seen = set()
+        used = deduplicated = trimmed = dropped = 0
+        for document in documents:
+            text = document.page_content
+            key = _content_hash(text)
+            if key in seen or not text.strip():
+                deduplicated += 1
+                continue
+            seen.add(key)
+
+            # Drop text already present at the edge of a selected chunk from the same source
+            original_tokens = count_tokens(text)
+            source = document.metadata.get("source")
+            for other in selected:
+                if other.metadata.get("source") != source:
+                    continue
+                head = _overlap(other.page_content, text, self.max_overlap_chars)
+                if head:
+                    text = text[head:]
+                tail = _overlap(text, other.page_content, self.max_overlap_chars)
+                if tail:
+                    text = text[:-tail]
+            if not text.strip():
+                deduplicated += 1
+                continue
+
+            tokens = count_tokens(text)
+            trimmed += original_tokens - tokens
+            if used + tokens > budget:
+                remaining = budget - used
+                # A meaningful slice of the next chunk beats nothing at all
+                if remaining >= 50:
+                    text = truncate_tokens(text, remaining)
+                    trimmed += tokens - remaining
+                    tokens = remaining
+                else:
+                    dropped += 1
+                    continue
+            selected.append(Document(page_content=text, metadata=dict(document.metadata)))
+            used += tokens
+        self._record("chunk", chunk_tokens=used, chunks_deduplicated=deduplicated,
+                     chunk_tokens_trimmed=trimmed, chunks_dropped=dropped)
+        return selected
+
+    def get_stats(self) -> dict:
+        """Return cumulative token counts and averages per call"""
+        with self.lock:
+            stats = dict(self.totals)
+            stats["last_calls"] = list(self.recent)[-10:]
+        stats["avg_history_tokens"] = (stats["history_tokens"] / stats["history_calls"]
+                                       if stats["history_calls"] else 0.0)
+        stats["avg_chunk_tokens"] = stats["chunk_tokens"] / stats["chunk_calls"] if stats["chunk_calls"] else 0.0
+        return stats
@@ -0,0 +1,170 @@
+"""
+Document Loading - parallel load and split stage for ingestion
+"""
+
+import os
+import time
+import traceback
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from typing import Iterable, Iterator, List, Optional, Tuple
+
+from langchain_core.documents import Document
+
+from utils.chunking import ChunkingProfile, split_documents
+from utils.ingestion_manifest import IngestionManifest
+
+
+def load_document(file_path: str) -> list:
+    """Load a file as a list of page documents (one document for plain text)"""
+    # langchain_community is slow to import, so only pay for it when loading
+    from langchain_community.document_loaders import PyPDFLoader, TextLoader
+
+    # Load document based on file type
+    if file_path.lower().endswith('.pdf'):
+        loader = PyPDFLoader(file_path)
+    else:
+        loader = TextLoader(file_path)
+    documents = loader.load()
+    if not documents:
+        raise ValueError(f"No content found in {file_path}")
+    return documents
+
+
+def load_and_split(file_path: str, profile: Optional[ChunkingProfile] = None
+                   ) -> Tuple[str, str, list, List[str], Tuple[int, float]]:
+    """Load and split one document.
+
+    Returns (file_path, content_hash, splits, chunk_ids, (size, mtime)), with
+    the size and mtime stat'ed together with the hash. Runs inside worker
+    processes, so it must stay a picklable module-level function.
+    """
+    content_hash, size, mtime = IngestionManifest.fingerprint(file_path)
+    splits = split_documents(load_document(file_path), profile)
+    chunk_ids = [
+        IngestionManifest.make_chunk_id(file_path, content_hash, i)
+        for i in range(len(splits))
+    ]
+    for split, chunk_id in zip(splits, chunk_ids):
+        split.metadata["chunk_id"] = chunk_id
+    return file_path, content_hash, splits, chunk_ids, (size, mtime)
+
+
+def count_pdf_pages(file_path: str) -> int:
+    """Return the number of pages in a PDF without extracting any text"""
+    from pypdf import PdfReader
+
+    with open(file_path, "rb") as f:
+        return len(PdfReader(f).pages)
+
+
+def iter_pdf_windows(file_path: str, window_pages: int, start_page: int = 0) -> Iterator[Tuple[int, list]]:
+    """Parse a PDF one page at a time, yielding (next_page, documents) per window.
+
+    Pages before ``start_page`` are skipped without extracting their text,
+    which lets an interrupted ingest resume cheaply. Documents carry the same
+    metadata as PyPDFLoader.
+
+    The reader is given an open file rather than a path, which pypdf would
+    read into memory whole, and its cache of parsed objects is dropped after
+    every window, so peak memory follows the window size plus the page tree
+    (a few KB per page) instead of the file size.
+    """
+    from pypdf import PdfReader
+
+    with open(file_path, "rb") as f:
+        reader = PdfReader(f)
+        window = []
+        for page in range(start_page, len(reader.pages)):
+            text = reader.pages[page].extract_text() or ""
+            window.append(Document(page_content=text, metadata={"source": file_path, "page": page}))
+            if len(window) >= window_pages:
+                yield page + 1, window
+                window = []
+                reader.resolved_objects.clear()
+        if window:
+            yield len(reader.pages), window
+
+
+def split_window(file_path: str, content_hash: str, documents: list,
+                 profile: Optional[ChunkingProfile] = None, first_index: int = 0) -> Tuple[list, List[str]]:
+    """Split a window of pages, returning the splits and page-scoped chunk ids.
+
+    Ids are numbered within the page each chunk starts on, so they do not
+    depend on the window size used when the file was ingested.
+    ``first_index`` is the number of chunks already committed for the file.
+    """
+    splits = split_documents(documents, profile, first_index)
+    chunk_ids = []
+    per_page = {}
+    for split in splits:
+        page = split.metadata.get("page_start", 0)
+        index = per_page.get(page, 0)
+        per_page[page] = index + 1
+        chunk_id = IngestionManifest.make_chunk_id(file_path, content_hash, f"{page}:{index}")
+        split.metadata["chunk_id"] = chunk_id
+        chunk_ids.append(chunk_id)
+    return splits, chunk_ids
+
+
+def _load_safely(file_path: str, profile: Optional[ChunkingProfile] = None):
+    """Run load_and_split, returning (file_path, loaded, error, seconds) instead of raising"""
+    start = time.perf_counter()
+    try:
+        return file_path, load_and_split(file_path, profile), None, time.perf_counter() - start
+    except Exception as e:
+        detail = traceback.format_exception_only(type(e), e)[-1].strip()
+        return file_path, None, detail, time.perf_counter() - start
+
+
+def iter_loaded_documents(file_paths: Iterable[str], max_workers: Optional[int] = None,
+                          profile: Optional[ChunkingProfile] = None) -> Iterator[tuple]:
+    """Load and split files in a process pool, yielding results as they finish.
+
+    Yields (file_path, loaded, error, seconds) tuples where exactly one of
+    ``loaded`` and ``error`` is set, so one bad file never stops the others,
+    and ``seconds`` is the time spent parsing and splitting. At most
+    ``2 * max_workers`` files are in flight, which keeps memory bounded while
+    the caller embeds earlier results.
+    """
+    file_paths = list(file_paths)
+    max_workers = max_workers or os.cpu_count() or 1
+    if max_workers <= 1 or len(file_paths) <= 1:
+        for file_path in file_paths:
+            yield _load_safely(file_path, profile)
+        return
+
+    remaining = iter(file_paths)
+    with ProcessPoolExecutor(max_workers=min(max_workers, len(file_paths))) as pool:
+        in_flight = {}
+
+        def submit_next():
+            for file_path in remaining:
+                try:
+                    in_flight[pool.submit(_load_safely, file_path, profile)] = file_path
+                    return None
+                except Exception as e:
+                    # The pool is broken; report the file instead of losing it
+                    return file_path, None, f"worker pool unavailable: {e}", 0.0
+            return None
+
+        for _ in range(2 * max_workers):
+            failed = submit_next()
+            if failed:
+                yield failed
+
+        while in_flight:
+            done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in done:
+                file_path = in_flight.pop(future)
+                try:
+                    yield future.result()
+                except Exception as e:
+                    # The worker process itself died (e.g. out of memory)
+                    yield file_path, None, f"worker failed: {e}", 0.0
+                failed = submit_next()
+                if failed:
+                    yield failed
+
+        # Anything the pool could not take is loaded in this process
+        for file_path in remaining:
+            yield _load_safely(file_path, profile)
@@ -0,0 +1,236 @@
+"""
+Document Watcher - keeps the index in sync with the documents directory as files change
+"""
+
+import ctypes
+import ctypes.util
+import logging
+import os
+import select
+import struct
+import sys
+import threading
+import time
+from typing import Any, Callable, Dict, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+# inotify event bits, from <sys/inotify.h>
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+
+# Files are reported once closed after writing, so half-copied files are not picked up
+WATCH_MASK = (IN_CLOSE_WRITE | IN_MOVED_TO | IN_MOVED_FROM | IN_DELETE | IN_ATTRIB
+              | IN_DELETE_SELF | IN_MOVE_SELF | IN_ONLYDIR)
+EVENT_HEADER = struct.Struct("iIII")
+
+
+class InotifySource:
+    """File events for one directory from Linux inotify, read through libc"""
+
+    name = "inotify"
+
+    def __init__(self, directory: str, stopping: threading.Event):
+        self.directory = directory
+        self.stopping = stopping
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        self.fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        if libc.inotify_add_watch(self.fd, os.fsencode(directory), WATCH_MASK) < 0:
+            errno = ctypes.get_errno()
+            os.close(self.fd)
+            raise OSError(errno, f"Cannot watch {directory}")
+
+    def read(self, timeout: float) -> Tuple[Set[str], bool]:
+        """Wait up to ``timeout`` seconds; return changed paths and whether to rescan everything"""
+        readable, _, _ = select.select([self.fd], [], [], timeout)
+        if not readable:
+            return set(), False
+        try:
+            data = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return set(), False
+
+        paths = set()
+        rescan = False
+        offset = 0
+        while offset + EVENT_HEADER.size <= len(data):
+            _, mask, _, length = EVENT_HEADER.unpack_from(data, offset)
+            name = data[offset + EVENT_HEADER.size:offset + EVENT_HEADER.size + length].rstrip(b"\0")
+            offset += EVENT_HEADER.size + length
+            if mask & (IN_DELETE_SELF | IN_MOVE_SELF | IN_IGNORED):
+                raise OSError(f"{self.directory} was removed or moved")
+            if mask & IN_Q_OVERFLOW:
+                # The kernel dropped events; only a full scan can catch up
+                rescan = True
+            elif name:
+                paths.add(os.path.join(self.directory, os.fsdecode(name)))
+        return paths, rescan
+
+    def close(self):
+        os.close(self.fd)
+
+
+class PollingSource:
+    """File events for one directory from comparing size and mtime snapshots"""
+
+    name = "polling"
+
+    def __init__(self, directory: str, stopping: threading.Event):
+        self.directory = directory
+        self.stopping = stopping
+        self.snapshot = self._snapshot()
+
+    def _snapshot(self) -> Dict[str, Tuple[int, int]]:
+        snapshot = {}
+        try:
+            with os.scandir(self.directory) as entries:
+                for entry in entries:
+                    try:
+                        if entry.is_file():
+                            stat = entry.stat()
+                            snapshot[entry.path] = (stat.st_size, stat.st_mtime_ns)
+                    except FileNotFoundError:
+                        continue
+        except FileNotFoundError:
+            pass
+        return snapshot
+
+    def read(self, timeout: float) -> Tuple[Set[str], bool]:
+        """Wait ``timeout`` seconds and return the paths that appeared, changed or vanished"""
+        self.stopping.wait(timeout)
+        snapshot = self._snapshot()
+        previous, self.snapshot = self.snapshot, snapshot
+        paths = {path for path in snapshot.keys() | previous.keys() if snapshot.get(path) != previous.get(path)}
+        return paths, False
+
+    def close(self):
+        pass
+
+
+class DocumentWatcher:
+    """Feed added, changed and removed documents into incremental indexing.
+
+    Events come from inotify on Linux and from polling elsewhere, or when
+    inotify is unavailable. They are collected until the directory has been
+    quiet for ``debounce_seconds``, or ``max_delay_seconds`` after the first
+    pending event so a long copy still makes progress, and each batch goes to
+    ``DocumentProcessor.sync_paths`` in one call. A 500-file copy therefore
+    becomes a few batched ingests rather than 500 separate ones.
+
+    The watcher writes through ``doc_processor``, so it has to run in the
+    process that serves queries from that index (see utils.index_lock).
+    """
+
+    def __init__(
+        self,
+        doc_processor: Any,
+        extensions: Tuple[str, ...] = (".pdf", ".txt"),
+        debounce_seconds: float = 2.0,
+        max_delay_seconds: float = 30.0,
+        poll_seconds: float = 2.0,
+        use_inotify: Optional[bool] = None,
+        on_sync: Optional[Callable[[Any], None]] = None
+    ):
+        self.doc_processor = doc_processor
+        self.directory = os.path.normpath(doc_processor.documents_path)
+        self.extensions = extensions
+        self.debounce_seconds = debounce_seconds
+        self.max_delay_seconds = max_delay_seconds
+        self.poll_seconds = poll_seconds
+        self.use_inotify = sys.platform.startswith("linux") if use_inotify is None else use_inotify
+        self.on_sync = on_sync
+        self.stopping = threading.Event()
+        self.thread: Optional[threading.Thread] = None
+        self.source = None
+
+    def _open_source(self):
+        os.makedirs(self.directory, exist_ok=True)
+        if self.use_inotify:
+            try:
+                return InotifySource(self.directory, self.stopping)
+            except (OSError, AttributeError) as e:
+                logger.warning("inotify unavailable (%s), polling %s every %.1fs", e, self.directory,
+                               self.poll_seconds)
+        return PollingSource(self.directory, self.stopping)
+
+    def start(self):
+        """Watch on a daemon thread"""
+        if self.thread is not None and self.thread.is_alive():
+            return
+        self.stopping.clear()
+        self.thread = threading.Thread(target=self.run, name="document-watcher", daemon=True)
+        self.thread.start()
+
+    def stop(self, timeout: Optional[float] = None):
+        """Stop watching after the current batch finishes"""
+        self.stopping.set()
+        if self.thread is not None:
+            self.thread.join(timeout)
+
+    def run(self):
+        """Watch until ``stop`` is called; blocks the calling thread"""
+        self.source = self._open_source()
+        logger.info("Watching %s for document changes (%s)", self.directory, self.source.name)
+        pending: Set[str] = set()
+        rescan = False
+        first_event = last_event = 0.0
+        try:
+            while not self.stopping.is_set():
+                if pending or rescan:
+                    flush_at = min(last_event + self.debounce_seconds, first_event + self.max_delay_seconds)
+                    timeout = max(0.0, flush_at - time.monotonic())
+                else:
+                    timeout = self.poll_seconds
+                try:
+                    paths, overflow = self.source.read(timeout)
+                except OSError as e:
+                    # The directory went away or inotify failed; fall back to polling
+                    logger.warning("Document watcher error (%s), switching to polling", e)
+                    self.source.close()
+                    self.source = PollingSource(self.directory, self.stopping)
+                    paths, overflow = set(), True
+
+                paths = {path for path in paths if path.lower().endswith(self.extensions)}
+                now = time.monotonic()
+                if paths or overflow:
+                    if not pending and not rescan:
+                        first_event = now
+                    last_event = now
+                    pending |= paths
+                    rescan = rescan or overflow
+                due = now - last_event >= self.debounce_seconds or now - first_event >= self.max_delay_seconds
+                # A missing directory is not read as "every document was deleted"; wait for it to return
+                if rescan and due and not os.path.isdir(self.directory):
+                    first_event = last_event = now
+                elif (pending or rescan) and due:
+                    if rescan and self.use_inotify and isinstance(self.source, PollingSource):
+                        self.source.close()
+                        self.source = self._open_source()
+                    self._sync(pending, rescan)
+                    pending, rescan = set(), False
+        finally:
+            self.source.close()
+
+    def _sync(self, paths: Set[str], rescan: bool):
+        try:
+            if rescan:
+                report = self.doc_processor.sync_documents()
+            else:
+                logger.info("Syncing %d changed documents", len(paths))
+                report = self.doc_processor.sync_paths(sorted(paths))
+        except Exception:
+            logger.exception("Document sync failed")
+            return
+        logger.info("%s", report.message)
+        if self.on_sync is not None:
+            self.on_sync(report)
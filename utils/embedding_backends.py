@@ -0,0 +1,111 @@
+"""
+Embedding Backends - OpenAI or local hashed n-gram embeddings behind one interface
+"""
+
+import os
+import zlib
+from typing import Any, List, Optional, Tuple
+
+from langchain_core.embeddings import Embeddings
+
+from utils.lexical_index import TOKEN_PATTERN
+
+EMBEDDING_BACKENDS = ("openai", "hashing")
+
+
+def open_embeddings(backend: Optional[str] = None) -> Embeddings:
+    """Create the embeddings for a backend (DOCUMIND_EMBEDDINGS by default).
+
+    ``hashing`` runs locally with no network or model download; its size
+    comes from DOCUMIND_HASH_DIMENSION.
+    """
+    backend = backend or os.getenv("DOCUMIND_EMBEDDINGS", "openai")
+    if backend == "openai":
+        from langchain_openai import OpenAIEmbeddings
+        return OpenAIEmbeddings()
+    if backend == "hashing":
+        return HashingEmbeddings(dimension=int(os.getenv("DOCUMIND_HASH_DIMENSION", "1024")))
+    raise ValueError(f"Unknown embeddings backend '{backend}', expected one of {EMBEDDING_BACKENDS}")
+
+
+def embedding_signature(embeddings: Any) -> str:
+    """Identify the model behind an embeddings object; vectors from different models do not mix"""
+    return getattr(embeddings, "model", None) or type(embeddings).__name__
+
+
+class HashingEmbeddings(Embeddings):
+    """Local embeddings from hashed word and character n-gram counts.
+
+    Words and the character n-grams of the lowercased text are hashed into
+    ``dimension`` buckets with a sign taken from another hash bit, so
+    collisions tend to cancel rather than pile up. Counts are damped with
+    log1p and each vector is L2 normalized. Texts sharing words, identifiers
+    or word fragments end up close, with no model to download and no network
+    call. A batch is built with a few NumPy operations, and vectors do not
+    depend on the rest of the corpus, so nothing is re-embedded as it grows.
+    """
+
+    local = True
+
+    def __init__(self, dimension: int = 1024, ngram_range: Tuple[int, int] = (3, 5), word_weight: float = 2.0):
+        self.dimension = dimension
+        self.ngram_range = ngram_range
+        self.word_weight = word_weight
+
+    @property
+    def model(self) -> str:
+        low, high = self.ngram_range
+        return f"hashing-{self.dimension}-{low}{high}-w{self.word_weight:g}"
+
+    def _features(self, text: str):
+        """Return (hashes, weights) of a text's words and character n-grams"""
+        import numpy as np
+        words = TOKEN_PATTERN.findall(text.lower())
+        hashes = [np.fromiter((zlib.crc32(word.encode("utf-8")) for word in words), dtype=np.uint32,
+                              count=len(words))]
+        weights = [np.full(len(words), self.word_weight, dtype=np.float32)]
+
+        # Rolling polynomial hashes of every n-gram, with spaces marking word boundaries
+        data = np.frombuffer(f" {' '.join(words)} ".encode("utf-8"), dtype=np.uint8).astype(np.uint32)
+        low, high = self.ngram_range
+        for n in range(low, min(high, len(data)) + 1):
+            ngrams = data[:len(data) - n + 1].copy()
+            for offset in range(1, n):
+                ngrams *= np.uint32(31)
+                ngrams += data[offset:len(data) - n + 1 + offset]
+            ngrams ^= np.uint32(n * 0x9E3779B1 & 0xFFFFFFFF)
+            hashes.append(ngrams)
+            weights.append(np.ones(len(ngrams), dtype=np.float32))
+        hashes = np.concatenate(hashes)
+
+        # murmur3's finalizer spreads similar hashes across buckets
+        hashes ^= hashes >> np.uint32(16)
+        hashes *= np.uint32(0x85EBCA6B)
+        hashes ^= hashes >> np.uint32(13)
+        hashes *= np.uint32(0xC2B2AE35)
+        hashes ^= hashes >> np.uint32(16)
+        return hashes, np.concatenate(weights)
+
+    def embed_array(self, texts: List[str]):
+        """Embed a batch into a (len(texts), dimension) float32 array"""
+        import numpy as np
+        if not texts:
+            return np.zeros((0, self.dimension), dtype=np.float32)
+        features = [self._features(text) for text in texts]
+        rows = np.repeat(np.arange(len(texts), dtype=np.int64), [len(hashes) for hashes, _ in features])
+        hashes = np.concatenate([hashes for hashes, _ in features])
+        weights = np.concatenate([weights for _, weights in features])
+        signs = np.where(hashes & np.uint32(0x80000000), -1.0, 1.0).astype(np.float32)
+        buckets = rows * self.dimension + (hashes & np.uint32(0x7FFFFFFF)) % self.dimension
+        matrix = np.bincount(buckets, weights=signs * weights, minlength=len(texts) * self.dimension)
+        matrix = matrix.reshape(len(texts), self.dimension).astype(np.float32)
+        matrix = np.sign(matrix) * np.log1p(np.abs(matrix))
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return matrix / norms
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self.embed_array(texts).tolist()
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed_array([text])[0].tolist()
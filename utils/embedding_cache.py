@@ -0,0 +1,147 @@
+"""
+Embedding Cache - content-addressed, persistent cache for embedding vectors
+"""
+
+import hashlib
+import threading
+import time
+import unicodedata
+from array import array
+from typing import Any, Dict, List, Optional
+
+from utils.embedding_pipeline import EmbeddingsWrapper
+from utils.sqlite_db import open_sqlite
+from utils.telemetry import get_telemetry
+
+
+def normalize_text(text: str) -> str:
+    """Normalize text so trivially different copies share a cache entry"""
+    return " ".join(unicodedata.normalize("NFC", text).split())
+
+
+class CachedEmbeddings(EmbeddingsWrapper):
+    """Wrap an embeddings object with an LRU cache stored in SQLite.
+
+    Entries are keyed by (model name, hash of normalized text) and vectors are
+    stored as float32 blobs. When the cache grows beyond ``max_entries`` the
+    least recently used entries are evicted. Documents and queries share the
+    same cache.
+    """
+
+    def __init__(
+        self,
+        embeddings: Any,
+        cache_file: str,
+        model_name: Optional[str] = None,
+        max_entries: int = 50000,
+    ):
+        self.embeddings = embeddings
+        self.cache_file = cache_file
+        self.model_name = model_name or getattr(embeddings, "model", None) or type(embeddings).__name__
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+        self.conn = open_sqlite(cache_file)
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            "key TEXT PRIMARY KEY, vector BLOB NOT NULL, last_used REAL NOT NULL)"
+        )
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_last_used ON embeddings(last_used)")
+        self.conn.commit()
+
+    def _key(self, text: str) -> str:
+        payload = f"{self.model_name}\0{normalize_text(text)}"
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _lookup(self, keys: List[str]) -> Dict[str, List[float]]:
+        found = {}
+        unique = list(set(keys))
+        with self.lock:
+            for start in range(0, len(unique), 500):
+                batch = unique[start:start + 500]
+                placeholders = ",".join("?" * len(batch))
+                rows = self.conn.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({placeholders})", batch
+                ).fetchall()
+                for key, blob in rows:
+                    found[key] = array("f", blob).tolist()
+            if found:
+                now = time.time()
+                self.conn.executemany(
+                    "UPDATE embeddings SET last_used = ? WHERE key = ?",
+                    [(now, key) for key in found]
+                )
+                self.conn.commit()
+        return found
+
+    def _store(self, items: Dict[str, List[float]]):
+        now = time.time()
+        with self.lock:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (key, vector, last_used) VALUES (?, ?, ?)",
+                [(key, array("f", vector).tobytes(), now) for key, vector in items.items()]
+            )
+            count = self.conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+            if count > self.max_entries:
+                # Evict down to 90% so eviction is not triggered on every insert
+                excess = count - int(self.max_entries * 0.9)
+                self.conn.execute(
+                    "DELETE FROM embeddings WHERE key IN "
+                    "(SELECT key FROM embeddings ORDER BY last_used LIMIT ?)", (excess,)
+                )
+            self.conn.commit()
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        keys = [self._key(text) for text in texts]
+        cached = self._lookup(keys)
+
+        # Embed each distinct missing text once, even if it repeats in this call
+        missing = {}
+        for key, text in zip(keys, texts):
+            if key not in cached and key not in missing:
+                missing[key] = text
+        if missing:
+            vectors = self.embeddings.embed_documents(list(missing.values()))
+            new_items = dict(zip(missing.keys(), vectors))
+            self._store(new_items)
+            cached.update(new_items)
+
+        with self.lock:
+            self.misses += len(missing)
+            self.hits += len(texts) - len(missing)
+        get_telemetry().cache("embedding", hits=len(texts) - len(missing), misses=len(missing))
+        return [cached[key] for key in keys]
+
+    def embed_query(self, text: str) -> List[float]:
+        key = self._key(text)
+        cached = self._lookup([key])
+        if key in cached:
+            with self.lock:
+                self.hits += 1
+            get_telemetry().cache("embedding", hits=1)
+            return cached[key]
+
+        vector = self.embeddings.embed_query(text)
+        self._store({key: vector})
+        with self.lock:
+            self.misses += 1
+        get_telemetry().cache("embedding", misses=1)
+        return vector
+
+    def get_stats(self) -> dict:
+        """Return cache hit/miss counters merged with the wrapped embeddings' stats"""
+        stats = {}
+        if hasattr(self.embeddings, "get_stats"):
+            stats.update(self.embeddings.get_stats())
+        total = self.hits + self.misses
+        with self.lock:
+            entries = self.conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+        stats.update({
+            "cache_hits": self.hits,
+            "cache_misses": self.misses,
+            "cache_hit_rate": self.hits / total if total else 0.0,
+            "cache_entries": entries,
+        })
+        return stats
@@ -0,0 +1,209 @@
+"""
+Embedding Pipeline - token-budgeted, concurrent and rate-limit aware batching
+"""
+
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, List, Tuple
+
+from langchain_core.embeddings import Embeddings
+
+from utils.telemetry import get_telemetry
+
+
+def count_tokens(text: str) -> int:
+    """Count tokens with tiktoken, falling back to a characters/4 estimate"""
+    encoding = _get_encoding()
+    if encoding is None:
+        return max(1, len(text) // 4)
+    return len(encoding.encode(text, disallowed_special=()))
+
+
+def truncate_tokens(text: str, max_tokens: int) -> str:
+    """Cut text down to at most ``max_tokens`` tokens"""
+    if max_tokens <= 0:
+        return ""
+    encoding = _get_encoding()
+    if encoding is None:
+        return text[:max_tokens * 4]
+    tokens = encoding.encode(text, disallowed_special=())
+    return text if len(tokens) <= max_tokens else encoding.decode(tokens[:max_tokens])
+
+
+_ENCODING = None
+
+
+def _get_encoding():
+    global _ENCODING
+    if _ENCODING is None:
+        try:
+            import tiktoken
+            _ENCODING = tiktoken.get_encoding("cl100k_base")
+        except Exception:
+            _ENCODING = False
+    return _ENCODING or None
+
+
+def is_rate_limit_error(error: Exception) -> bool:
+    """Recognise HTTP 429 / rate limit errors from the OpenAI client and friends"""
+    if getattr(error, "status_code", None) == 429:
+        return True
+    name = type(error).__name__.lower()
+    return "ratelimit" in name or "429" in str(error) or "rate limit" in str(error).lower()
+
+
+class AdaptiveLimiter:
+    """Concurrency gate that halves on rate limits and grows back on success (AIMD)"""
+
+    def __init__(self, max_concurrency: int, base_delay: float = 1.0, max_delay: float = 60.0):
+        self.max_concurrency = max_concurrency
+        self.limit = max_concurrency
+        self.active = 0
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.delay = base_delay
+        self.paused_until = 0.0
+        self.condition = threading.Condition()
+
+    def acquire(self):
+        with self.condition:
+            while True:
+                wait = self.paused_until - time.monotonic()
+                if wait <= 0 and self.active < self.limit:
+                    self.active += 1
+                    return
+                self.condition.wait(timeout=wait if wait > 0 else None)
+
+    def release(self, rate_limited: bool = False):
+        with self.condition:
+            self.active -= 1
+            if rate_limited:
+                self.limit = max(1, self.limit // 2)
+                pause = self.delay * (1 + random.random())
+                self.paused_until = max(self.paused_until, time.monotonic() + pause)
+                self.delay = min(self.delay * 2, self.max_delay)
+            else:
+                self.limit = min(self.max_concurrency, self.limit + 1)
+                self.delay = self.base_delay
+            self.condition.notify_all()
+
+
+class EmbeddingsWrapper(Embeddings):
+    """Base for embeddings that wrap ``self.embeddings`` and expose its attributes, e.g. ``model``"""
+
+    embeddings: Any
+
+    def __getattr__(self, name):
+        # Only reached for attributes the wrapper lacks; ``embeddings`` is
+        # missing while unpickling, and looking it up here would recurse
+        if name == "embeddings":
+            raise AttributeError(name)
+        return getattr(self.embeddings, name)
+
+
+class BatchedEmbeddings(EmbeddingsWrapper):
+    """Wrap an embeddings object so large inputs are embedded in concurrent batches.
+
+    Texts are grouped into batches that stay under ``max_batch_tokens`` and
+    ``max_batch_size``, up to ``max_workers`` batches are in flight at once,
+    and rate limit errors shrink concurrency and back off before retrying.
+    """
+
+    def __init__(
+        self,
+        embeddings: Any,
+        max_batch_tokens: int = 8000,
+        max_batch_size: int = 256,
+        max_workers: int = 4,
+        max_retries: int = 6,
+        base_delay: float = 1.0,
+    ):
+        self.embeddings = embeddings
+        self.max_batch_tokens = max_batch_tokens
+        self.max_batch_size = max_batch_size
+        self.max_workers = max_workers
+        self.max_retries = max_retries
+        self.limiter = AdaptiveLimiter(max_workers, base_delay=base_delay)
+        self.stats_lock = threading.Lock()
+        self.reset_stats()
+
+    def reset_stats(self):
+        """Reset throughput counters"""
+        self.stats = {"chunks": 0, "tokens": 0, "batches": 0, "retries": 0, "rate_limits": 0, "seconds": 0.0}
+
+    def get_stats(self) -> dict:
+        """Return counters plus chunks/sec and tokens/sec over time spent embedding"""
+        stats = dict(self.stats)
+        seconds = stats["seconds"] or 1e-9
+        stats["chunks_per_sec"] = stats["chunks"] / seconds
+        stats["tokens_per_sec"] = stats["tokens"] / seconds
+        return stats
+
+    def make_batches(self, texts: List[str]) -> Tuple[List[List[int]], int]:
+        """Group text indexes into batches bounded by token budget and size.
+
+        Returns the batches and the total token count of ``texts``.
+        """
+        batches, current, current_tokens, total_tokens = [], [], 0, 0
+        for i, text in enumerate(texts):
+            tokens = count_tokens(text)
+            total_tokens += tokens
+            if current and (current_tokens + tokens > self.max_batch_tokens
+                            or len(current) >= self.max_batch_size):
+                batches.append(current)
+                current, current_tokens = [], 0
+            current.append(i)
+            current_tokens += tokens
+        if current:
+            batches.append(current)
+        return batches, total_tokens
+
+    def _call_with_backoff(self, func, *args):
+        for attempt in range(self.max_retries + 1):
+            self.limiter.acquire()
+            try:
+                result = func(*args)
+            except Exception as e:
+                rate_limited = is_rate_limit_error(e)
+                self.limiter.release(rate_limited=rate_limited)
+                if not rate_limited or attempt == self.max_retries:
+                    raise
+                with self.stats_lock:
+                    self.stats["retries"] += 1
+                    self.stats["rate_limits"] += 1
+                continue
+            self.limiter.release()
+            return result
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        if not texts:
+            return []
+        start = time.perf_counter()
+        batches, total_tokens = self.make_batches(texts)
+
+        def embed_batch(batch):
+            return self._call_with_backoff(self.embeddings.embed_documents, [texts[i] for i in batch])
+
+        vectors: List[Any] = [None] * len(texts)
+        with get_telemetry().span("embed.documents", texts=len(texts), tokens=total_tokens, batches=len(batches)):
+            if len(batches) == 1:
+                results = [embed_batch(batches[0])]
+            else:
+                with ThreadPoolExecutor(max_workers=min(self.max_workers, len(batches))) as pool:
+                    results = list(pool.map(embed_batch, batches))
+        for batch, batch_vectors in zip(batches, results):
+            for i, vector in zip(batch, batch_vectors):
+                vectors[i] = vector
+
+        with self.stats_lock:
+            self.stats["chunks"] += len(texts)
+            self.stats["tokens"] += total_tokens
+            self.stats["batches"] += len(batches)
+            self.stats["seconds"] += time.perf_counter() - start
+        return vectors
+
+    def embed_query(self, text: str) -> List[float]:
+        with get_telemetry().span("embed.query"):
+            return self._call_with_backoff(self.embeddings.embed_query, text)
@@ -0,0 +1,186 @@
+"""
+Hybrid Retriever - fuses BM25 and vector search with reciprocal rank fusion
+"""
+
+import contextvars
+import hashlib
+import logging
+import time
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from typing import Any, Callable, Dict, List, Optional
+
+from langchain_core.callbacks import CallbackManagerForRetrieverRun
+from langchain_core.documents import Document
+from langchain_core.retrievers import BaseRetriever
+
+from utils.lexical_index import TOKEN_PATTERN, identifier_tokens
+from utils.telemetry import get_telemetry
+from utils.thread_pools import shared_pool
+
+logger = logging.getLogger(__name__)
+
+
+def document_key(document: Document) -> str:
+    """Identify a chunk by its chunk id, falling back to a content hash"""
+    chunk_id = document.metadata.get("chunk_id")
+    if chunk_id:
+        return chunk_id
+    return hashlib.sha1(document.page_content.encode("utf-8")).hexdigest()
+
+
+def reciprocal_rank_fusion(rankings: List[List[str]], rrf_k: int = 60,
+                           weights: Optional[List[float]] = None) -> List[str]:
+    """Merge several ranked id lists; ids ranked well by any list rise to the top.
+
+    Each list's contribution is scaled by its weight (1.0 by default). Ties
+    keep the order in which ids were first seen.
+    """
+    scores: Dict[str, float] = {}
+    for ranking, weight in zip(rankings, weights or [1.0] * len(rankings)):
+        for rank, key in enumerate(ranking):
+            scores[key] = scores.get(key, 0.0) + weight / (rrf_k + rank + 1)
+    return sorted(scores, key=lambda key: scores[key], reverse=True)
+
+
+class HybridRetriever(BaseRetriever):
+    """Retrieve with BM25 and vector search in parallel and fuse the rankings.
+
+    Exact identifiers that embeddings blur together are caught by BM25, so a
+    small ``k`` still has good recall: BM25's ranking counts
+    ``lexical_weight`` times as much as the vector ranking, and when the
+    query contains identifier-like tokens (part numbers, error codes) the
+    BM25 hits containing one of them come first. Both searches run concurrently. The
+    vector search is always waited for; ``latency_budget_ms`` only bounds
+    BM25, which stops scoring early and is left out of the fusion if it
+    has not finished by then.
+
+    With a ``neighbor_lookup`` each of the top ``k`` chunks is stitched
+    together with up to ``neighbor_window`` adjacent chunks from the same
+    section, which stands in for overlap between stored chunks. With a
+    ``context_assembler`` the results are then deduplicated, overlap-trimmed
+    and cut to its token budget before they reach the LLM.
+    """
+
+    vectorstore: Any
+    lexical_index: Any
+    k: int = 3
+    fetch_k: int = 10
+    rrf_k: int = 60
+    lexical_weight: float = 2.0
+    latency_budget_ms: Optional[float] = None
+    context_assembler: Optional[Any] = None
+    neighbor_lookup: Optional[Callable[[str, int], List[Document]]] = None
+    neighbor_window: int = 0
+
+    class Config:
+        arbitrary_types_allowed = True
+
+    def _traced(self, name: str, search: Callable[..., List[Document]], *args, **kwargs) -> List[Document]:
+        with get_telemetry().span(name) as span:
+            results = search(*args, **kwargs)
+            span.set(results=len(results))
+            return results
+
+    def _lexical_search(self, query: str, deadline: Optional[float]) -> List[Document]:
+        results = []
+        for chunk_id, score in self.lexical_index.search(query, k=self.fetch_k, deadline=deadline):
+            entry = self.lexical_index.get(chunk_id)
+            if entry is not None:
+                text, metadata = entry
+                results.append(Document(page_content=text, metadata={**metadata, "chunk_id": chunk_id}))
+        return results
+
+    def _expand_neighbors(self, results: List[Document]) -> List[Document]:
+        """Stitch each hit together with the adjacent chunks of its section"""
+        expanded = []
+        included = set()
+        for document in results:
+            key = document_key(document)
+            if key in included:
+                continue
+            try:
+                neighbors = self.neighbor_lookup(key, self.neighbor_window)
+            except Exception as e:
+                logger.warning("Neighbour lookup failed for %s: %s", key, e)
+                neighbors = []
+            keys = [document_key(neighbor) for neighbor in neighbors]
+            if key not in keys:
+                included.add(key)
+                expanded.append(document)
+                continue
+
+            # Grow outwards from the hit while chunks stay in the same section
+            section = document.metadata.get("section")
+            first = last = keys.index(key)
+            while (first > 0 and keys[first - 1] not in included
+                   and neighbors[first - 1].metadata.get("section") == section):
+                first -= 1
+            while (last < len(neighbors) - 1 and keys[last + 1] not in included
+                   and neighbors[last + 1].metadata.get("section") == section):
+                last += 1
+            run = neighbors[first:last + 1]
+            included.update(keys[first:last + 1])
+            metadata = dict(document.metadata)
+            for field, source in (("page_start", run[0]), ("start_offset", run[0]),
+                                  ("page_end", run[-1]), ("end_offset", run[-1])):
+                if field in source.metadata:
+                    metadata[field] = source.metadata[field]
+            expanded.append(Document(
+                page_content="\n".join(neighbor.page_content for neighbor in run),
+                metadata=metadata
+            ))
+        return expanded
+
+    def _get_relevant_documents(
+        self, query: str, *, run_manager: CallbackManagerForRetrieverRun
+    ) -> List[Document]:
+        deadline = None
+        if self.latency_budget_ms is not None:
+            deadline = time.perf_counter() + self.latency_budget_ms / 1000.0
+
+        # Each search runs in a copy of this context so its span joins the retrieval trace
+        pool = shared_pool("hybrid-search", "DOCUMIND_SEARCH_WORKERS", 8)
+        vector_future = pool.submit(contextvars.copy_context().run, self._traced, "retrieval.vector",
+                                    self.vectorstore.similarity_search, query, k=self.fetch_k)
+        lexical_future = pool.submit(contextvars.copy_context().run, self._traced, "retrieval.bm25",
+                                     self._lexical_search, query, deadline)
+        # The vector search is the baseline and is always waited for; the budget only
+        # bounds BM25, which also stops scoring early once the deadline passes
+        rankings = []
+        weights = []
+        pinned = []
+        identifiers = set(identifier_tokens(query))
+        documents: Dict[str, Document] = {}
+        for future, bounded in ((vector_future, False), (lexical_future, True)):
+            timeout = None
+            if bounded and deadline is not None:
+                timeout = max(0.0, deadline - time.perf_counter())
+            try:
+                results = future.result(timeout=timeout)
+            except FutureTimeoutError:
+                logger.warning("BM25 search missed the %.0fms retrieval budget", self.latency_budget_ms)
+                continue
+            except Exception as e:
+                logger.warning("Hybrid search branch failed: %s", e)
+                continue
+            ranking = []
+            for document in results:
+                key = document_key(document)
+                documents.setdefault(key, document)
+                ranking.append(key)
+                # Exact identifier matches from BM25 are kept ahead of the fused ranking
+                if bounded and identifiers and identifiers & set(TOKEN_PATTERN.findall(document.page_content.lower())):
+                    pinned.append(key)
+            rankings.append(ranking)
+            weights.append(self.lexical_weight if bounded else 1.0)
+
+        with get_telemetry().span("retrieval.assemble", branches=len(rankings)) as span:
+            fused = reciprocal_rank_fusion(rankings, self.rrf_k, weights)
+            order = pinned + [key for key in fused if key not in pinned]
+            results = [documents[key] for key in order[:self.k]]
+            if self.neighbor_lookup is not None and self.neighbor_window > 0:
+                results = self._expand_neighbors(results)
+            if self.context_assembler is not None:
+                results = self.context_assembler.fit_documents(results)
+            span.set(documents=len(results), pinned=len(pinned))
+        return results
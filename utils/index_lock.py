@@ -0,0 +1,58 @@
+"""
+Index Lock - keeps one process at a time writing to an index directory
+"""
+
+import logging
+import os
+import threading
+from typing import Dict
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+LOCK_FILE = "index.lock"
+
+_held: Dict[str, int] = {}
+_held_lock = threading.Lock()
+
+
+class IndexLockedError(RuntimeError):
+    """Another process already has the index directory open"""
+
+
+def acquire_index_lock(index_path: str):
+    """Lock ``index_path`` for this process until it exits.
+
+    The vector store, lexical index and manifest are each loaded into memory
+    and written back whole, so a second process on the same directory would
+    serve stale results and overwrite the first one's writes. Every
+    DocumentProcessor in a process shares the lock; a processor in another
+    process gets IndexLockedError. The lock is an flock on ``index.lock``, so
+    the OS drops it when the holder exits, however it exits.
+    """
+    os.makedirs(index_path, exist_ok=True)
+    key = os.path.realpath(index_path)
+    with _held_lock:
+        if key in _held:
+            return
+        if fcntl is None:
+            logger.debug("File locking unavailable, not locking %s", index_path)
+            _held[key] = -1
+            return
+        fd = os.open(os.path.join(key, LOCK_FILE), os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            holder = os.read(fd, 32).decode(errors="replace").strip() or "unknown"
+            os.close(fd)
+            raise IndexLockedError(
+                f"Index at {index_path} is in use by process {holder}. Stop it first, or set "
+                f"DOCUMIND_WATCH_DOCUMENTS=true so that process watches the documents itself."
+            ) from None
+        os.ftruncate(fd, 0)
+        os.write(fd, str(os.getpid()).encode())
+        _held[key] = fd
@@ -0,0 +1,216 @@
+"""
+Ingestion Manifest - tracks which documents are already in the index
+"""
+
+import hashlib
+import json
+import logging
+import os
+from typing import Dict, List, Optional, Tuple, Union
+
+logger = logging.getLogger(__name__)
+
+
+class IngestionManifest:
+    """Persistent record of indexed files keyed by path, size, mtime and content hash"""
+
+    def __init__(self, manifest_file: str):
+        self.manifest_file = manifest_file
+        self.entries: Dict[str, dict] = {}
+        self.meta: Dict[str, str] = {}
+        self.load()
+
+    @staticmethod
+    def hash_file(file_path: str) -> str:
+        """Return the SHA-256 of a file's contents"""
+        return IngestionManifest.fingerprint(file_path)[0]
+
+    @staticmethod
+    def fingerprint(file_path: str) -> Tuple[str, int, float]:
+        """Return (sha256, size, mtime) of a file, all from the same open handle.
+
+        The stat is taken before reading, so a file that changes while it is
+        hashed or parsed is recorded with an mtime older than its new one and
+        counts as changed on the next scan.
+        """
+        digest = hashlib.sha256()
+        with open(file_path, "rb") as f:
+            stat = os.fstat(f.fileno())
+            for block in iter(lambda: f.read(1 << 20), b""):
+                digest.update(block)
+        return digest.hexdigest(), stat.st_size, stat.st_mtime
+
+    @staticmethod
+    def make_chunk_id(file_path: str, content_hash: str, index: Union[int, str]) -> str:
+        """Build a stable chunk id from the file path, content hash and chunk position"""
+        key = f"{os.path.normpath(file_path)}:{content_hash}:{index}"
+        return hashlib.sha1(key.encode("utf-8")).hexdigest()
+
+    def load(self):
+        """Load the manifest from disk"""
+        try:
+            if os.path.exists(self.manifest_file):
+                with open(self.manifest_file, "r") as f:
+                    state = json.load(f)
+                self.entries = state.get("files", {})
+                self.meta = state.get("meta", {})
+        except Exception as e:
+            logger.warning("Error loading ingestion manifest: %s", e)
+            self.entries = {}
+
+    def save(self):
+        """Write the manifest atomically so a crash never leaves a torn file"""
+        directory = os.path.dirname(self.manifest_file)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_file = f"{self.manifest_file}.tmp"
+        with open(tmp_file, "w") as f:
+            json.dump({"version": 1, "meta": self.meta, "files": self.entries}, f)
+        os.replace(tmp_file, self.manifest_file)
+
+    def reset(self):
+        """Forget every entry, e.g. when the index it describes is gone"""
+        self.entries = {}
+        self.save()
+
+    def scan(self, directory: str, extensions: Tuple[str, ...]) -> Tuple[List[str], List[str]]:
+        """Compare the directory against the manifest.
+
+        Returns (changed, removed): files that are new or whose content changed,
+        and manifest paths that no longer exist on disk. Size and mtime are
+        checked first so unchanged files are never re-hashed.
+        """
+        changed = []
+        seen = set()
+        if os.path.exists(directory):
+            for file in sorted(os.listdir(directory)):
+                if not file.lower().endswith(extensions):
+                    continue
+                file_path = os.path.normpath(os.path.join(directory, file))
+                seen.add(file_path)
+                if not self.is_current(file_path):
+                    changed.append(file_path)
+
+        removed = [path for path in self.entries
+                   if path not in seen and os.path.dirname(path) == os.path.normpath(directory)]
+        return changed, removed
+
+    def check(self, file_paths: List[str], extensions: Tuple[str, ...]) -> Tuple[List[str], List[str]]:
+        """Like ``scan``, but only for the given files, e.g. those a watcher saw change"""
+        changed = []
+        removed = []
+        for file_path in sorted({os.path.normpath(path) for path in file_paths}):
+            if not file_path.lower().endswith(extensions):
+                continue
+            if os.path.exists(file_path):
+                if not self.is_current(file_path):
+                    changed.append(file_path)
+            elif file_path in self.entries:
+                removed.append(file_path)
+        return changed, removed
+
+    def is_current(self, file_path: str) -> bool:
+        """Check whether the indexed copy of a file matches what is on disk"""
+        file_path = os.path.normpath(file_path)
+        entry = self.entries.get(file_path)
+        if entry is None or not entry.get("complete", True) or not os.path.exists(file_path):
+            return False
+        # Chunked with another profile: the file has to be split again
+        if entry.get("chunking") != self.meta.get("chunking"):
+            return False
+
+        stat = os.stat(file_path)
+        if entry["size"] == stat.st_size and entry["mtime"] == stat.st_mtime:
+            return True
+
+        # Touched but possibly identical content: confirm with the hash
+        if entry["size"] == stat.st_size:
+            content_hash, size, mtime = self.fingerprint(file_path)
+            if entry["sha256"] == content_hash and entry["size"] == size:
+                entry["mtime"] = mtime
+                self.save()
+                return True
+        return False
+
+    def record(self, file_path: str, content_hash: str, chunk_ids: List[str], size: int, mtime: float):
+        """Record that a file has been indexed with the given chunks.
+
+        ``size`` and ``mtime`` must come from the same ``fingerprint`` as
+        ``content_hash``. A stat taken now could describe a newer version of
+        the file than the one that was indexed.
+        """
+        self.record_many([(file_path, content_hash, chunk_ids, size, mtime)])
+
+    def record_many(self, records: List[Tuple[str, str, List[str], int, float]]):
+        """Record several indexed files as (file_path, content_hash, chunk_ids, size, mtime) with one save"""
+        for file_path, content_hash, chunk_ids, size, mtime in records:
+            self.entries[os.path.normpath(file_path)] = {
+                "size": size,
+                "mtime": mtime,
+                "sha256": content_hash,
+                "chunk_ids": chunk_ids,
+                "chunking": self.meta.get("chunking"),
+            }
+        self.save()
+
+    def record_progress(self, file_path: str, content_hash: str, chunk_ids: List[str], pages_done: int,
+                        size: int, mtime: float):
+        """Record a partially ingested file so a later run can resume after ``pages_done``"""
+        self.entries[os.path.normpath(file_path)] = {
+            "size": size,
+            "mtime": mtime,
+            "sha256": content_hash,
+            "chunk_ids": chunk_ids,
+            "chunking": self.meta.get("chunking"),
+            "complete": False,
+            "pages_done": pages_done,
+        }
+        self.save()
+
+    def get_resume_point(self, file_path: str, content_hash: str) -> int:
+        """Return the first page still to ingest for a partial entry of this exact content"""
+        entry = self.entries.get(os.path.normpath(file_path))
+        if (entry and not entry.get("complete", True) and entry["sha256"] == content_hash
+                and entry.get("chunking") == self.meta.get("chunking")):
+            return entry.get("pages_done", 0)
+        return 0
+
+    def remove(self, file_path: str) -> List[str]:
+        """Drop a file from the manifest and return the chunk ids it owned"""
+        return self.remove_many([file_path])
+
+    def remove_many(self, file_paths: List[str]) -> List[str]:
+        """Drop several files with one save and return the chunk ids they owned"""
+        chunk_ids = []
+        removed = False
+        for file_path in file_paths:
+            entry = self.entries.pop(os.path.normpath(file_path), None)
+            if entry is not None:
+                chunk_ids.extend(entry.get("chunk_ids", []))
+                removed = True
+        if removed:
+            self.save()
+        return chunk_ids
+
+    def get_chunk_ids(self, file_path: str) -> List[str]:
+        """Return the chunk ids currently indexed for a file"""
+        entry = self.entries.get(os.path.normpath(file_path))
+        return list(entry.get("chunk_ids", [])) if entry else []
+
+    def get_neighbor_ids(self, file_path: str, chunk_id: str, index: Optional[int] = None,
+                         window: int = 1) -> List[str]:
+        """Return the ids of a chunk and up to ``window`` chunks either side of it, in file order.
+
+        ``index`` is the chunk's recorded position; the id list is only
+        searched when it is missing or out of date.
+        """
+        entry = self.entries.get(os.path.normpath(file_path))
+        if not entry:
+            return []
+        chunk_ids = entry.get("chunk_ids", [])
+        if index is None or index >= len(chunk_ids) or chunk_ids[index] != chunk_id:
+            try:
+                index = chunk_ids.index(chunk_id)
+            except ValueError:
+                return []
+        return chunk_ids[max(0, index - window):index + window + 1]
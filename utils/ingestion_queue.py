@@ -0,0 +1,284 @@
+"""
+Ingestion Queue - persistent job queue and background worker for document ingestion
+"""
+
+import logging
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Any, List, Optional
+
+from utils.sqlite_db import open_sqlite
+
+logger = logging.getLogger(__name__)
+
+ACTIVE_STATUSES = ("queued", "running")
+
+_COLUMNS = ("id", "file_path", "status", "enqueued", "started", "finished", "pages_done",
+            "pages_total", "chunks_done", "chunks_total", "message", "owner", "heartbeat")
+
+
+class IngestionJobQueue:
+    """SQLite-backed queue with one job per file and its progress.
+
+    Jobs are claimed in one write transaction and stamped with the claiming
+    queue's ``owner`` id, so two queues on the same file never take the same
+    job. A running job's ``heartbeat`` is refreshed while it is worked on.
+    Jobs whose heartbeat is older than ``stale_seconds`` were left by a
+    crashed process, so they are queued again. Opening the queue, e.g. only
+    to show status, leaves live jobs alone. Enqueuing a file that already has
+    an active job returns the existing job instead of adding a duplicate.
+    """
+
+    def __init__(self, queue_file: str, stale_seconds: float = 60.0):
+        self.lock = threading.Lock()
+        self.stale_seconds = stale_seconds
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self.conn = open_sqlite(queue_file)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            "id INTEGER PRIMARY KEY AUTOINCREMENT, file_path TEXT NOT NULL, status TEXT NOT NULL, "
+            "enqueued REAL NOT NULL, started REAL, finished REAL, pages_done INTEGER DEFAULT 0, "
+            "pages_total INTEGER DEFAULT 0, chunks_done INTEGER DEFAULT 0, chunks_total INTEGER DEFAULT 0, "
+            "message TEXT DEFAULT '', owner TEXT, heartbeat REAL)"
+        )
+        # Queue files from before claims were owned get the new columns
+        columns = {row["name"] for row in self.conn.execute("PRAGMA table_info(jobs)")}
+        for column, kind in (("owner", "TEXT"), ("heartbeat", "REAL")):
+            if column not in columns:
+                self.conn.execute(f"ALTER TABLE jobs ADD COLUMN {column} {kind}")
+        self.conn.execute("CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, id)")
+        self.conn.commit()
+        with self.lock:
+            self._requeue_stale()
+            self.conn.commit()
+
+    def _requeue_stale(self) -> int:
+        """Queue running jobs whose owner stopped heartbeating; callers hold the lock"""
+        cursor = self.conn.execute(
+            "UPDATE jobs SET status = 'queued', started = NULL, owner = NULL, heartbeat = NULL "
+            "WHERE status = 'running' AND (heartbeat IS NULL OR heartbeat < ?)",
+            (time.time() - self.stale_seconds,)
+        )
+        if cursor.rowcount:
+            logger.warning("Requeued %d ingestion jobs abandoned by a stopped process", cursor.rowcount)
+        return cursor.rowcount
+
+    def enqueue(self, file_paths: List[str]) -> List[int]:
+        """Queue files for ingestion, returning one job id per file"""
+        job_ids = []
+        with self.lock:
+            for file_path in file_paths:
+                file_path = os.path.normpath(file_path)
+                row = self.conn.execute(
+                    "SELECT id FROM jobs WHERE file_path = ? AND status IN (?, ?)",
+                    (file_path, *ACTIVE_STATUSES)
+                ).fetchone()
+                if row is not None:
+                    job_ids.append(row["id"])
+                    continue
+                cursor = self.conn.execute(
+                    "INSERT INTO jobs (file_path, status, enqueued) VALUES (?, 'queued', ?)",
+                    (file_path, time.time())
+                )
+                job_ids.append(cursor.lastrowid)
+            self.conn.commit()
+        return job_ids
+
+    def claim_batch(self, limit: int) -> List[dict]:
+        """Mark up to ``limit`` of the oldest queued jobs as running by this queue and return them"""
+        with self.lock:
+            # BEGIN IMMEDIATE takes the write lock before reading, so no other
+            # process can claim the same rows between the SELECT and the UPDATE
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._requeue_stale()
+                now = time.time()
+                rows = self.conn.execute(
+                    "UPDATE jobs SET status = 'running', started = ?, owner = ?, heartbeat = ? "
+                    "WHERE id IN (SELECT id FROM jobs WHERE status = 'queued' ORDER BY id LIMIT ?) "
+                    "RETURNING id",
+                    (now, self.owner, now, limit)
+                ).fetchall()
+                self.conn.commit()
+            except BaseException:
+                self.conn.rollback()
+                raise
+        return [self.get(job_id) for job_id in sorted(row["id"] for row in rows)]
+
+    def heartbeat(self, job_ids: List[int]):
+        """Show that this queue is still working on ``job_ids``"""
+        with self.lock:
+            self.conn.executemany(
+                "UPDATE jobs SET heartbeat = ? WHERE id = ? AND owner = ? AND status = 'running'",
+                [(time.time(), job_id, self.owner) for job_id in job_ids]
+            )
+            self.conn.commit()
+
+    def update_progress(self, job_id: int, **progress: int):
+        """Record pages_done, pages_total, chunks_done and/or chunks_total for a job this queue owns"""
+        fields = {key: value for key, value in progress.items()
+                  if key in ("pages_done", "pages_total", "chunks_done", "chunks_total")}
+        if not fields:
+            return
+        assignments = ", ".join(f"{key} = ?" for key in fields)
+        with self.lock:
+            self.conn.execute(f"UPDATE jobs SET {assignments}, heartbeat = ? WHERE id = ? AND owner = ?",
+                              (*fields.values(), time.time(), job_id, self.owner))
+            self.conn.commit()
+
+    def finish(self, job_id: int, status: str, message: str = ""):
+        """Mark a job this queue owns done or failed"""
+        with self.lock:
+            cursor = self.conn.execute(
+                "UPDATE jobs SET status = ?, finished = ?, message = ? WHERE id = ? AND owner = ?",
+                (status, time.time(), message, job_id, self.owner)
+            )
+            self.conn.commit()
+        if not cursor.rowcount:
+            logger.warning("Ingestion job %d was requeued by another process before it finished here", job_id)
+
+    def get(self, job_id: int) -> Optional[dict]:
+        """Return a job with its progress and ETA"""
+        with self.lock:
+            row = self.conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return self._with_eta(dict(row)) if row is not None else None
+
+    def list_jobs(self, limit: int = 50, active_only: bool = False) -> List[dict]:
+        """Return the most recent jobs, newest first"""
+        query = "SELECT * FROM jobs"
+        params: tuple = ()
+        if active_only:
+            query += " WHERE status IN (?, ?)"
+            params = ACTIVE_STATUSES
+        with self.lock:
+            rows = self.conn.execute(f"{query} ORDER BY id DESC LIMIT ?", (*params, limit)).fetchall()
+        return [self._with_eta(dict(row)) for row in rows]
+
+    def has_active(self) -> bool:
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT 1 FROM jobs WHERE status IN (?, ?) LIMIT 1", ACTIVE_STATUSES
+            ).fetchone()
+        return row is not None
+
+    def clear_finished(self):
+        """Delete jobs that are no longer active"""
+        with self.lock:
+            self.conn.execute("DELETE FROM jobs WHERE status NOT IN (?, ?)", ACTIVE_STATUSES)
+            self.conn.commit()
+
+    @staticmethod
+    def _with_eta(job: dict) -> dict:
+        """Add a 0-1 ``progress`` and ``eta_seconds`` extrapolated from the rate so far"""
+        if job["status"] not in ACTIVE_STATUSES:
+            job["progress"], job["eta_seconds"] = 1.0, 0.0
+            return job
+        # Pages are the finer measure for PDFs; chunks are known only after splitting
+        if job["pages_total"]:
+            done, total = job["pages_done"], job["pages_total"]
+        else:
+            done, total = job["chunks_done"], job["chunks_total"]
+        job["progress"] = done / total if total else 0.0
+        job["eta_seconds"] = None
+        if job["status"] == "running" and done and total:
+            elapsed = time.time() - job["started"]
+            job["eta_seconds"] = elapsed / done * (total - done)
+        return job
+
+
+class IngestionWorker:
+    """Daemon thread that drains an IngestionJobQueue through a DocumentProcessor.
+
+    Queued jobs are claimed up to ``batch_size`` at a time and indexed as one
+    batch, so their files share the parsing pool and embedding batches;
+    progress is still recorded per job.
+    """
+
+    def __init__(self, doc_processor: Any, jobs: IngestionJobQueue, poll_seconds: float = 2.0,
+                 batch_size: int = 32):
+        self.doc_processor = doc_processor
+        self.jobs = jobs
+        self.poll_seconds = poll_seconds
+        self.batch_size = batch_size
+        self.wake = threading.Event()
+        self.stopping = threading.Event()
+        self.thread: Optional[threading.Thread] = None
+
+    def start(self):
+        """Start the worker thread if it is not already running"""
+        if self.thread is not None and self.thread.is_alive():
+            self.wake.set()
+            return
+        self.stopping.clear()
+        self.thread = threading.Thread(target=self._loop, name="ingestion-worker", daemon=True)
+        self.thread.start()
+
+    def stop(self, timeout: Optional[float] = None):
+        """Stop after the current batch finishes"""
+        self.stopping.set()
+        self.wake.set()
+        if self.thread is not None:
+            self.thread.join(timeout)
+
+    def notify(self):
+        """Wake the worker after jobs are enqueued"""
+        self.wake.set()
+
+    def wait_idle(self, timeout: Optional[float] = None) -> bool:
+        """Block until no jobs are queued or running; returns False on timeout"""
+        deadline = None if timeout is None else time.time() + timeout
+        while self.jobs.has_active():
+            if deadline is not None and time.time() >= deadline:
+                return False
+            time.sleep(0.05)
+        return True
+
+    def _loop(self):
+        while not self.stopping.is_set():
+            batch = self.jobs.claim_batch(self.batch_size)
+            if not batch:
+                self.wake.wait(self.poll_seconds)
+                self.wake.clear()
+                continue
+            self._run_batch(batch)
+
+    def _run_batch(self, batch: List[dict]):
+        job_ids = {os.path.normpath(job["file_path"]): job["id"] for job in batch}
+        logger.info("Ingestion jobs %s started: %d files", [job["id"] for job in batch], len(batch))
+
+        def progress(file_path: str, **counts: int):
+            job_id = job_ids.get(os.path.normpath(file_path))
+            if job_id is not None:
+                self.jobs.update_progress(job_id, **counts)
+
+        # A single large file can go a long time between progress updates
+        done = threading.Event()
+
+        def beat():
+            while not done.wait(self.jobs.stale_seconds / 4):
+                self.jobs.heartbeat(list(job_ids.values()))
+
+        beater = threading.Thread(target=beat, name="ingestion-heartbeat", daemon=True)
+        beater.start()
+        try:
+            reports = self.doc_processor.index_documents(list(job_ids), progress=progress)
+        except Exception as e:
+            logger.exception("Ingestion batch failed")
+            for job_id in job_ids.values():
+                self.jobs.finish(job_id, "failed", f"Error processing document: {str(e)}")
+            return
+        finally:
+            done.set()
+            beater.join()
+        for file_path, job_id in job_ids.items():
+            report = reports.get(file_path)
+            if report is None:
+                self.jobs.finish(job_id, "failed", "Document was not processed")
+                continue
+            self.jobs.finish(job_id, "failed" if report.failed else "done", report.message)
+            logger.info("Ingestion job %d finished: %s", job_id, file_path)
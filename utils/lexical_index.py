@@ -0,0 +1,186 @@
+"""
+Lexical Index - in-process BM25 inverted index over document chunks
+"""
+
+import json
+import logging
+import math
+import re
+import sqlite3
+import threading
+import time
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from utils.sqlite_db import open_sqlite
+
+logger = logging.getLogger(__name__)
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+(?:[-_./][a-z0-9]+)*")
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase word tokens that keep identifiers like 'xj-42' or 'e_1001' whole.
+
+    Compound identifiers also contribute their parts, so 'xj-42' matches a
+    query for 'xj 42' as well as the exact identifier.
+    """
+    tokens = []
+    for token in TOKEN_PATTERN.findall(text.lower()):
+        tokens.append(token)
+        parts = re.split(r"[-_./]", token)
+        if len(parts) > 1:
+            tokens.extend(part for part in parts if part)
+    return tokens
+
+
+def identifier_tokens(text: str, min_length: int = 3) -> List[str]:
+    """Tokens that look like identifiers (part numbers, error codes, versions): at least
+    ``min_length`` characters with a digit, e.g. 'xj-0001-03', 'e_1001' or '404'"""
+    return [token for token in TOKEN_PATTERN.findall(text.lower())
+            if len(token) >= min_length and any(char.isdigit() for char in token)]
+
+
+class BM25Index:
+    """BM25 inverted index keyed by chunk id, persisted in SQLite.
+
+    Chunks are added and removed incrementally as documents change. Each
+    change writes only the affected rows, and ``flush`` commits them, so
+    persisting costs the size of the change rather than of the index.
+    Postings and chunk lengths are held in memory for scoring; chunk text
+    and metadata stay in the database and are read by ``get``, so results
+    can be returned without a round trip to the vector store.
+    """
+
+    def __init__(self, index_file: Optional[str] = None, k1: float = 1.5, b: float = 0.75):
+        self.index_file = index_file
+        self.k1 = k1
+        self.b = b
+        self.postings: Dict[str, Dict[str, int]] = {}
+        self.doc_lengths: Dict[str, int] = {}
+        self.total_length = 0
+        self.dirty = False
+        self.lock = threading.RLock()
+        if index_file:
+            self.conn = open_sqlite(index_file)
+        else:
+            self.conn = sqlite3.connect(":memory:", check_same_thread=False)
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS chunks (chunk_id TEXT PRIMARY KEY, text TEXT NOT NULL, "
+            "metadata TEXT NOT NULL, length INTEGER NOT NULL)"
+        )
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS postings (chunk_id TEXT NOT NULL, term TEXT NOT NULL, "
+            "tf INTEGER NOT NULL, PRIMARY KEY (chunk_id, term)) WITHOUT ROWID"
+        )
+        self.conn.commit()
+        self.load()
+
+    def __len__(self):
+        return len(self.doc_lengths)
+
+    def load(self):
+        """Load postings and chunk lengths from the database"""
+        with self.lock:
+            try:
+                self.doc_lengths = dict(self.conn.execute("SELECT chunk_id, length FROM chunks"))
+                postings: Dict[str, Dict[str, int]] = {}
+                for chunk_id, term, tf in self.conn.execute("SELECT chunk_id, term, tf FROM postings"):
+                    postings.setdefault(term, {})[chunk_id] = tf
+                self.postings = postings
+            except sqlite3.Error as e:
+                logger.warning("Error loading lexical index: %s", e)
+                self.postings, self.doc_lengths = {}, {}
+            self.total_length = sum(self.doc_lengths.values())
+
+    def flush(self):
+        """Commit pending changes"""
+        if not self.dirty:
+            return
+        with self.lock:
+            self.conn.commit()
+            self.dirty = False
+
+    def reset(self):
+        """Remove every chunk"""
+        with self.lock:
+            self.conn.execute("DELETE FROM postings")
+            self.conn.execute("DELETE FROM chunks")
+            self.postings, self.doc_lengths = {}, {}
+            self.total_length = 0
+            self.dirty = True
+        self.flush()
+
+    def chunk_ids(self) -> set:
+        """Return the ids of every indexed chunk"""
+        return set(self.doc_lengths)
+
+    def add(self, chunk_ids: List[str], texts: List[str], metadatas: Optional[List[dict]] = None):
+        """Index chunks, replacing any existing chunk with the same id"""
+        metadatas = metadatas or [{} for _ in texts]
+        with self.lock:
+            self.remove([chunk_id for chunk_id in chunk_ids if chunk_id in self.doc_lengths])
+            chunk_rows = []
+            posting_rows = []
+            for chunk_id, text, metadata in zip(chunk_ids, texts, metadatas):
+                counts = Counter(tokenize(text))
+                for term, tf in counts.items():
+                    self.postings.setdefault(term, {})[chunk_id] = tf
+                    posting_rows.append((chunk_id, term, tf))
+                length = sum(counts.values())
+                self.doc_lengths[chunk_id] = length
+                self.total_length += length
+                chunk_rows.append((chunk_id, text, json.dumps(metadata or {}, default=str), length))
+            self.conn.executemany("INSERT OR REPLACE INTO chunks VALUES (?, ?, ?, ?)", chunk_rows)
+            self.conn.executemany("INSERT OR REPLACE INTO postings VALUES (?, ?, ?)", posting_rows)
+            self.dirty = True
+
+    def remove(self, chunk_ids: Iterable[str]):
+        """Remove chunks from the index"""
+        with self.lock:
+            for chunk_id in chunk_ids:
+                if chunk_id not in self.doc_lengths:
+                    continue
+                self.total_length -= self.doc_lengths.pop(chunk_id)
+                terms = self.conn.execute("SELECT term FROM postings WHERE chunk_id = ?", (chunk_id,))
+                for (term,) in terms.fetchall():
+                    posting = self.postings.get(term)
+                    if posting is not None:
+                        posting.pop(chunk_id, None)
+                        if not posting:
+                            del self.postings[term]
+                self.conn.execute("DELETE FROM postings WHERE chunk_id = ?", (chunk_id,))
+                self.conn.execute("DELETE FROM chunks WHERE chunk_id = ?", (chunk_id,))
+                self.dirty = True
+
+    def get(self, chunk_id: str) -> Optional[Tuple[str, dict]]:
+        """Return (text, metadata) for a chunk"""
+        with self.lock:
+            row = self.conn.execute("SELECT text, metadata FROM chunks WHERE chunk_id = ?", (chunk_id,)).fetchone()
+        return (row[0], json.loads(row[1])) if row is not None else None
+
+    def search(self, query: str, k: int = 10, deadline: Optional[float] = None) -> List[Tuple[str, float]]:
+        """Return the top ``k`` (chunk_id, score) pairs for a query.
+
+        Rarest terms are scored first; if ``deadline`` (a time.perf_counter()
+        value) passes, scoring stops and the best results so far are returned.
+        """
+        with self.lock:
+            num_docs = len(self.doc_lengths)
+            if not num_docs:
+                return []
+            avg_length = self.total_length / num_docs
+            terms = [term for term in set(tokenize(query)) if term in self.postings]
+            terms.sort(key=lambda term: len(self.postings[term]))
+
+            scores: Dict[str, float] = {}
+            for term in terms:
+                if deadline is not None and time.perf_counter() > deadline:
+                    break
+                posting = self.postings[term]
+                idf = math.log(1 + (num_docs - len(posting) + 0.5) / (len(posting) + 0.5))
+                for chunk_id, tf in posting.items():
+                    norm = self.k1 * (1 - self.b + self.b * self.doc_lengths[chunk_id] / avg_length)
+                    scores[chunk_id] = scores.get(chunk_id, 0.0) + idf * tf * (self.k1 + 1) / (tf + norm)
+
+        return sorted(scores.items(), key=lambda item: item[1], reverse=True)[:k]
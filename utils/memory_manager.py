@@ -2,58 +2,197 @@
 Memory Management Utilities
 """
 
-from langchain.memory import ConversationBufferWindowMemory
-from langchain_core.messages import BaseMessage
 import json
+import logging
 import os
+import threading
+import time
+from typing import List, Optional, Sequence, Tuple
+
+from langchain.memory import ConversationBufferWindowMemory
+from langchain_core.chat_history import BaseChatMessageHistory
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage, SystemMessage
+
+from utils.sqlite_db import open_sqlite
+
+logger = logging.getLogger(__name__)
+
+_MESSAGE_TYPES = {"human": HumanMessage, "ai": AIMessage, "system": SystemMessage}
+
+
+class ConversationStore:
+    """Append-only SQLite log of conversation messages for many sessions.
+
+    Each message is one row, so appending is a single insert regardless of
+    how long the conversation is, and reading the last ``n`` messages walks
+    the (session_id, id) index backwards instead of replaying the session.
+    WAL mode lets readers proceed while another session is being written.
+    """
+
+    def __init__(self, db_file: str):
+        self.db_file = db_file
+        self.lock = threading.Lock()
+        self.conn = open_sqlite(db_file)
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS messages ("
+            "id INTEGER PRIMARY KEY AUTOINCREMENT, session_id TEXT NOT NULL, "
+            "type TEXT NOT NULL, content TEXT NOT NULL, created REAL NOT NULL)"
+        )
+        self.conn.execute("CREATE INDEX IF NOT EXISTS messages_session ON messages (session_id, id)")
+        # Rolling summary of the first ``covered`` messages of each session
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS summaries ("
+            "session_id TEXT PRIMARY KEY, summary TEXT NOT NULL, covered INTEGER NOT NULL)"
+        )
+        self.conn.commit()
+
+    def append(self, session_id: str, messages: Sequence[Tuple[str, str]]):
+        """Append (type, content) pairs to a session in one transaction"""
+        now = time.time()
+        with self.lock:
+            self.conn.executemany(
+                "INSERT INTO messages (session_id, type, content, created) VALUES (?, ?, ?, ?)",
+                [(session_id, message_type, content, now) for message_type, content in messages]
+            )
+            self.conn.commit()
+
+    def tail(self, session_id: str, limit: Optional[int] = None) -> List[Tuple[str, str]]:
+        """Return the last ``limit`` (type, content) pairs of a session, oldest first"""
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT type, content FROM messages WHERE session_id = ? ORDER BY id DESC LIMIT ?",
+                (session_id, -1 if limit is None else limit)
+            ).fetchall()
+        return rows[::-1]
+
+    def range(self, session_id: str, offset: int, limit: int) -> List[Tuple[str, str]]:
+        """Return ``limit`` (type, content) pairs starting at message ``offset`` of a session"""
+        with self.lock:
+            return self.conn.execute(
+                "SELECT type, content FROM messages WHERE session_id = ? ORDER BY id LIMIT ? OFFSET ?",
+                (session_id, limit, offset)
+            ).fetchall()
+
+    def get_summary(self, session_id: str) -> Tuple[str, int]:
+        """Return (summary, number of leading messages it covers)"""
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT summary, covered FROM summaries WHERE session_id = ?", (session_id,)
+            ).fetchone()
+        return (row[0], row[1]) if row else ("", 0)
+
+    def set_summary(self, session_id: str, summary: str, covered: int):
+        with self.lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO summaries (session_id, summary, covered) VALUES (?, ?, ?)",
+                (session_id, summary, covered)
+            )
+            self.conn.commit()
+
+    def count(self, session_id: str) -> int:
+        with self.lock:
+            return self.conn.execute(
+                "SELECT COUNT(*) FROM messages WHERE session_id = ?", (session_id,)
+            ).fetchone()[0]
+
+    def clear(self, session_id: str):
+        """Delete every message of a session"""
+        with self.lock:
+            self.conn.execute("DELETE FROM messages WHERE session_id = ?", (session_id,))
+            self.conn.execute("DELETE FROM summaries WHERE session_id = ?", (session_id,))
+            self.conn.commit()
+
+    def sessions(self) -> List[str]:
+        """Return the ids of sessions with stored messages"""
+        with self.lock:
+            return [row[0] for row in self.conn.execute("SELECT DISTINCT session_id FROM messages")]
+
+
+def to_messages(rows: Sequence[Tuple[str, str]]) -> List[BaseMessage]:
+    """Turn stored (type, content) pairs back into langchain messages"""
+    return [_MESSAGE_TYPES.get(message_type, AIMessage)(content=content) for message_type, content in rows]
+
+
+class StoredChatMessageHistory(BaseChatMessageHistory):
+    """Chat history backed by a ConversationStore that only reads a recent window"""
+
+    def __init__(self, store: ConversationStore, session_id: str, window: Optional[int] = None):
+        self.store = store
+        self.session_id = session_id
+        self.window = window
+
+    @property
+    def messages(self) -> List[BaseMessage]:
+        return to_messages(self.store.tail(self.session_id, self.window))
+
+    def add_message(self, message: BaseMessage) -> None:
+        self.add_messages([message])
+
+    def add_messages(self, messages: Sequence[BaseMessage]) -> None:
+        self.store.append(self.session_id, [(message.type, message.content) for message in messages])
+
+    def clear(self) -> None:
+        self.store.clear(self.session_id)
+
 
 class MemoryManager:
-    def __init__(self, session_id: str = "default"):
+    """Windowed conversation memory for one session, persisted in a ConversationStore.
+
+    Messages are written as they are added, so there is nothing to save, and
+    only the last ``k`` exchanges are ever read back.
+    """
+
+    def __init__(self, session_id: str = "default", store: Optional[ConversationStore] = None, k: int = 20):
         self.session_id = session_id
+        self.store = store or ConversationStore(os.getenv("DOCUMIND_MEMORY_DB", "data/memory.sqlite"))
         self.memory_file = f"memory_{session_id}.json"
         self.memory = ConversationBufferWindowMemory(
-            k=20,
+            k=k,
             return_messages=True,
-            memory_key="chat_history"
+            memory_key="chat_history",
+            chat_memory=StoredChatMessageHistory(self.store, session_id, window=2 * k)
         )
         self.load_memory()
-    
+
     def save_memory(self):
-        """Save memory to file"""
-        try:
-            messages = []
-            for msg in self.memory.chat_memory.messages:
-                messages.append({
-                    "type": msg.type,
-                    "content": msg.content
-                })
-            
-            with open(self.memory_file, 'w') as f:
-                json.dump(messages, f, indent=2)
-        except Exception as e:
-            print(f"Error saving memory: {e}")
-    
+        """Messages are persisted as they are added; kept for compatibility"""
+
     def load_memory(self):
-        """Load memory from file"""
+        """Import a legacy memory_<session>.json file into the store once"""
         try:
-            if os.path.exists(self.memory_file):
+            if os.path.exists(self.memory_file) and not self.store.count(self.session_id):
                 with open(self.memory_file, 'r') as f:
                     messages = json.load(f)
-                
-                for msg in messages:
-                    if msg["type"] == "human":
-                        self.memory.chat_memory.add_user_message(msg["content"])
-                    else:
-                        self.memory.chat_memory.add_ai_message(msg["content"])
+                self.store.append(self.session_id, [
+                    ("human" if msg["type"] == "human" else "ai", msg["content"]) for msg in messages
+                ])
+                os.replace(self.memory_file, f"{self.memory_file}.imported")
+                logger.info("Imported %d messages from %s", len(messages), self.memory_file)
         except Exception as e:
-            print(f"Error loading memory: {e}")
-    
+            logger.warning("Error loading memory: %s", e)
+
+    def get_context(self, assembler) -> Tuple[List[BaseMessage], str]:
+        """Return the recent messages that fit the assembler's history budget and a summary.
+
+        Every message before them, including ones that have left the ``k``
+        window, is folded into the session's rolling summary exactly once.
+        """
+        messages = self.memory.chat_memory.messages
+        summary, covered = self.store.get_summary(self.session_id)
+        kept, _ = assembler.fit_history(messages, summary, record=False)
+        first_kept = self.store.count(self.session_id) - len(kept)
+        if first_kept > covered:
+            folded = to_messages(self.store.range(self.session_id, covered, first_kept - covered))
+            summary = assembler.summarize(summary, folded)
+            self.store.set_summary(self.session_id, summary, first_kept)
+        # Re-fit against the final summary so the total stays in budget
+        kept, _ = assembler.fit_history(kept, summary)
+        return kept, summary
+
     def clear_memory(self):
         """Clear all memory"""
         self.memory.clear()
-        if os.path.exists(self.memory_file):
-            os.remove(self.memory_file)
-    
+
     def get_memory(self):
         """Get current memory"""
-        return self.memory
\ No newline at end of file
+        return self.memory
@@ -0,0 +1,95 @@
+"""
+Retrieval Prefetch - speculative document retrieval that runs while the agent plans
+"""
+
+import contextvars
+import logging
+import threading
+from contextlib import contextmanager
+from typing import Callable, Iterator, List, Optional
+
+from langchain_core.documents import Document
+
+from utils.lexical_index import tokenize
+from utils.telemetry import get_telemetry
+from utils.thread_pools import shared_pool
+
+logger = logging.getLogger(__name__)
+
+# The prefetch for the agent run in progress; tool threads see it through a copied context
+_current_prefetch: contextvars.ContextVar = contextvars.ContextVar("documind_prefetch", default=None)
+
+
+class RetrievalPrefetch:
+    """Top-k retrieval for a question, started before the agent decides to use it.
+
+    ``retrieve`` runs on a background thread as soon as the prefetch is
+    created, overlapping the LLM's planning call. The document tool calls
+    ``take`` with its own query: if that query is mostly made of the
+    question's terms (``min_overlap``), it gets the prefetched documents
+    instead of retrieving again. A prefetch is used at most once; otherwise
+    it is discarded when the run ends.
+    """
+
+    def __init__(self, question: str, retrieve: Callable[[str], List[Document]], min_overlap: float = 0.6):
+        self.question = question
+        self.terms = set(tokenize(question))
+        self.min_overlap = min_overlap
+        self.lock = threading.Lock()
+        self.taken = False
+        pool = shared_pool("retrieval-prefetch", "DOCUMIND_PREFETCH_WORKERS", 8)
+        self.future = pool.submit(contextvars.copy_context().run, self._retrieve, retrieve)
+
+    def _retrieve(self, retrieve: Callable[[str], List[Document]]) -> List[Document]:
+        with get_telemetry().span("retrieval.prefetch") as span:
+            documents = retrieve(self.question)
+            span.set(documents=len(documents))
+            return documents
+
+    def matches(self, query: str) -> bool:
+        """Check whether the prefetched results suit a tool query derived from the question"""
+        terms = set(tokenize(query))
+        if not terms:
+            return False
+        return len(terms & self.terms) / len(terms) >= self.min_overlap
+
+    def take(self, query: str) -> Optional[List[Document]]:
+        """Return the prefetched documents for ``query``, or None if it needs its own retrieval"""
+        with self.lock:
+            if self.taken or not self.matches(query):
+                return None
+            self.taken = True
+        try:
+            documents = self.future.result()
+        except Exception as e:
+            logger.warning("Prefetched retrieval failed, retrieving again: %s", e)
+            get_telemetry().count("retrieval_prefetch_total", result="failed")
+            return None
+        get_telemetry().count("retrieval_prefetch_total", result="used")
+        return documents
+
+    def discard(self):
+        """Drop the prefetch if nothing used it; a search already running finishes in the background"""
+        with self.lock:
+            if self.taken:
+                return
+            self.taken = True
+        self.future.cancel()
+        get_telemetry().count("retrieval_prefetch_total", result="discarded")
+
+
+def current_prefetch() -> Optional[RetrievalPrefetch]:
+    """The prefetch started for the agent run this code belongs to, if any"""
+    return _current_prefetch.get()
+
+
+@contextmanager
+def prefetch_scope(prefetch: Optional[RetrievalPrefetch]) -> Iterator[Optional[RetrievalPrefetch]]:
+    """Make ``prefetch`` visible to tools run inside the block, and discard it afterwards"""
+    token = _current_prefetch.set(prefetch)
+    try:
+        yield prefetch
+    finally:
+        _current_prefetch.reset(token)
+        if prefetch is not None:
+            prefetch.discard()
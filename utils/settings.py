@@ -0,0 +1,27 @@
+"""
+Settings - helpers for reading DOCUMIND_* configuration from the environment
+"""
+
+import logging
+import os
+
+logger = logging.getLogger(__name__)
+
+_TRUE = ("1", "true", "yes", "on")
+_FALSE = ("0", "false", "no", "off")
+
+
+def env_flag(name: str, default: bool) -> bool:
+    """Read a boolean environment variable.
+
+    1/true/yes/on and 0/false/no/off are accepted in any case; an unset,
+    empty or unrecognised value gives ``default``.
+    """
+    value = os.getenv(name, "").strip().lower()
+    if value in _TRUE:
+        return True
+    if value in _FALSE:
+        return False
+    if value:
+        logger.warning("Ignoring %s=%r, expected true or false", name, value)
+    return default
@@ -0,0 +1,23 @@
+"""
+SQLite DB - connection setup shared by the SQLite-backed stores
+"""
+
+import os
+import sqlite3
+
+
+def open_sqlite(db_file: str) -> sqlite3.Connection:
+    """Open a SQLite database for use from several threads, creating its directory.
+
+    WAL mode lets readers proceed while another thread writes, and
+    synchronous=NORMAL skips the fsync on every commit; a crash can lose the
+    last commits but never corrupts the file. Callers serialize writes with
+    their own lock.
+    """
+    directory = os.path.dirname(db_file)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    conn = sqlite3.connect(db_file, check_same_thread=False)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    return conn
@@ -0,0 +1,314 @@
+"""
+Telemetry - spans, latency histograms and counters with Prometheus and JSONL export
+"""
+
+import contextvars
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from collections import deque
+from typing import Any, Dict, Optional, Tuple
+
+from utils.settings import env_flag
+
+logger = logging.getLogger(__name__)
+
+# Upper bounds in seconds, from a cache lookup to a long ingest
+DURATION_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 300.0)
+
+# Span attributes that are also added up into counters
+TOKEN_ATTRIBUTES = {"prompt_tokens": "prompt", "completion_tokens": "completion", "tokens": "total"}
+BYTE_ATTRIBUTES = {"input_bytes": "in", "output_bytes": "out"}
+
+_current_span: contextvars.ContextVar = contextvars.ContextVar("documind_span", default=None)
+
+
+class Span:
+    """One timed operation; attributes can be added with ``set`` until it ends"""
+
+    __slots__ = ("name", "attributes", "trace_id", "span_id", "parent_id", "started_at", "start",
+                 "duration", "error")
+
+    def __init__(self, name: str, attributes: dict, parent: Optional["Span"] = None):
+        self.name = name
+        self.attributes = attributes
+        self.span_id = uuid.uuid4().hex[:16]
+        self.trace_id = parent.trace_id if parent else uuid.uuid4().hex
+        self.parent_id = parent.span_id if parent else None
+        self.started_at = time.time()
+        self.start = time.perf_counter()
+        self.duration = None
+        self.error = None
+
+    def set(self, **attributes):
+        self.attributes.update(attributes)
+
+    def to_dict(self) -> dict:
+        return {
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "start": self.started_at,
+            "duration_ms": (self.duration or 0.0) * 1000,
+            "attributes": self.attributes,
+            "error": self.error,
+        }
+
+
+class _NoopSpan:
+    """Stands in for spans while telemetry is disabled"""
+
+    def set(self, **attributes):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+_NOOP_SPAN = _NoopSpan()
+
+
+class _SpanContext:
+    def __init__(self, telemetry: "Telemetry", name: str, attributes: dict):
+        self.telemetry = telemetry
+        self.name = name
+        self.attributes = attributes
+
+    def __enter__(self) -> Span:
+        self.span = self.telemetry.start_span(self.name, **self.attributes)
+        self.token = _current_span.set(self.span)
+        return self.span
+
+    def __exit__(self, exc_type, exc, tb):
+        _current_span.reset(self.token)
+        self.telemetry.end_span(self.span, error=None if exc is None else f"{exc_type.__name__}: {exc}")
+        return False
+
+
+class Telemetry:
+    """Collects spans into per-name latency histograms and counters.
+
+    Spans nest through a context variable, so a span opened inside another
+    joins its trace. Finished spans are kept in a small ring buffer and, with
+    ``trace_file``, appended to a JSONL file. When disabled every call is a
+    no-op.
+    """
+
+    def __init__(self, enabled: bool = True, trace_file: Optional[str] = None, max_spans: int = 1000):
+        self.enabled = enabled
+        self.trace_file = trace_file
+        self.lock = threading.Lock()
+        self.recent: deque = deque(maxlen=max_spans)
+        self.histograms: Dict[str, list] = {}
+        self.counters: Dict[Tuple[str, Tuple[Tuple[str, str], ...]], float] = {}
+        self.trace_handle = None
+
+    def span(self, name: str, **attributes):
+        """Context manager timing a block; yields the Span so attributes can be added"""
+        if not self.enabled:
+            return _NOOP_SPAN
+        return _SpanContext(self, name, attributes)
+
+    def start_span(self, name: str, parent: Optional[Span] = None, **attributes) -> Span:
+        """Start a span explicitly; by default its parent is the innermost open span"""
+        return Span(name, attributes, parent if parent is not None else _current_span.get())
+
+    def end_span(self, span: Span, error: Optional[str] = None):
+        if not self.enabled or span.duration is not None:
+            return
+        span.duration = time.perf_counter() - span.start
+        span.error = error
+        self._observe(span)
+
+    def record(self, name: str, seconds: float, **attributes):
+        """Record an operation timed elsewhere, e.g. in a worker process"""
+        if not self.enabled:
+            return
+        span = Span(name, attributes, _current_span.get())
+        span.started_at -= seconds
+        span.duration = seconds
+        self._observe(span)
+
+    def count(self, metric: str, value: float = 1, **labels):
+        """Add to a counter, e.g. count("cache_requests_total", cache="answer", result="hit")"""
+        if not self.enabled:
+            return
+        key = (metric, tuple(sorted((name, str(label)) for name, label in labels.items())))
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def cache(self, cache: str, hits: int = 0, misses: int = 0):
+        """Count cache hits and misses"""
+        if hits:
+            self.count("cache_requests_total", hits, cache=cache, result="hit")
+        if misses:
+            self.count("cache_requests_total", misses, cache=cache, result="miss")
+
+    def _observe(self, span: Span):
+        with self.lock:
+            histogram = self.histograms.get(span.name)
+            if histogram is None:
+                histogram = self.histograms[span.name] = [[0] * len(DURATION_BUCKETS), 0.0, 0]
+            for i, bound in enumerate(DURATION_BUCKETS):
+                if span.duration <= bound:
+                    histogram[0][i] += 1
+            histogram[1] += span.duration
+            histogram[2] += 1
+            self.recent.append(span)
+        for attribute, kind in TOKEN_ATTRIBUTES.items():
+            if span.attributes.get(attribute):
+                self.count("tokens_total", span.attributes[attribute], span=span.name, kind=kind)
+        for attribute, direction in BYTE_ATTRIBUTES.items():
+            if span.attributes.get(attribute):
+                self.count("payload_bytes_total", span.attributes[attribute], span=span.name, direction=direction)
+        if span.error:
+            self.count("span_errors_total", span=span.name)
+        if self.trace_file:
+            self._write_trace(span)
+
+    def _write_trace(self, span: Span):
+        line = json.dumps(span.to_dict(), default=str)
+        try:
+            with self.lock:
+                if self.trace_handle is None:
+                    directory = os.path.dirname(self.trace_file)
+                    if directory:
+                        os.makedirs(directory, exist_ok=True)
+                    self.trace_handle = open(self.trace_file, "a", buffering=1)
+                self.trace_handle.write(line + "\n")
+        except OSError as e:
+            logger.warning("Cannot write trace file %s: %s", self.trace_file, e)
+            self.trace_file = None
+
+    def recent_spans(self, limit: int = 100) -> list:
+        """Return the most recent finished spans as dicts, newest last"""
+        with self.lock:
+            return [span.to_dict() for span in list(self.recent)[-limit:]]
+
+    def export_jsonl(self, path: str) -> int:
+        """Write the buffered spans to a JSONL file and return how many were written"""
+        spans = self.recent_spans(self.recent.maxlen)
+        with open(path, "w") as f:
+            for span in spans:
+                f.write(json.dumps(span, default=str) + "\n")
+        return len(spans)
+
+    def prometheus_text(self) -> str:
+        """Render every metric in the Prometheus text exposition format"""
+        with self.lock:
+            histograms = {name: (list(buckets), total, count)
+                          for name, (buckets, total, count) in self.histograms.items()}
+            counters = dict(self.counters)
+
+        lines = [
+            "# HELP documind_span_duration_seconds Duration of traced operations",
+            "# TYPE documind_span_duration_seconds histogram",
+        ]
+        for name in sorted(histograms):
+            buckets, total, count = histograms[name]
+            label = _escape(name)
+            for bound, value in zip(DURATION_BUCKETS, buckets):
+                lines.append(f'documind_span_duration_seconds_bucket{{span="{label}",le="{bound}"}} {value}')
+            lines.append(f'documind_span_duration_seconds_bucket{{span="{label}",le="+Inf"}} {count}')
+            lines.append(f'documind_span_duration_seconds_sum{{span="{label}"}} {total:.6f}')
+            lines.append(f'documind_span_duration_seconds_count{{span="{label}"}} {count}')
+
+        for metric in sorted({metric for metric, _ in counters}):
+            lines.append(f"# TYPE documind_{metric} counter")
+            for (name, labels), value in sorted(counters.items()):
+                if name == metric:
+                    rendered = ",".join(f'{key}="{_escape(label)}"' for key, label in labels)
+                    lines.append(f"documind_{metric}{{{rendered}}} {value:g}")
+        return "\n".join(lines) + "\n"
+
+    def summary(self) -> Dict[str, dict]:
+        """Return count, total and mean seconds per span name"""
+        with self.lock:
+            return {
+                name: {"count": count, "total_seconds": total, "mean_ms": total / count * 1000 if count else 0.0}
+                for name, (_, total, count) in self.histograms.items()
+            }
+
+    def reset(self):
+        with self.lock:
+            self.recent.clear()
+            self.histograms.clear()
+            self.counters.clear()
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+_telemetry: Optional[Telemetry] = None
+_telemetry_lock = threading.Lock()
+
+
+def get_telemetry() -> Telemetry:
+    """Return the process-wide Telemetry.
+
+    DOCUMIND_TELEMETRY=false disables it, and DOCUMIND_TRACE_FILE appends
+    every finished span to a JSONL file.
+    """
+    global _telemetry
+    if _telemetry is None:
+        with _telemetry_lock:
+            if _telemetry is None:
+                _telemetry = Telemetry(
+                    enabled=env_flag("DOCUMIND_TELEMETRY", True),
+                    trace_file=os.getenv("DOCUMIND_TRACE_FILE") or None
+                )
+    return _telemetry
+
+
+def current_span() -> Optional[Span]:
+    """Return the innermost open span in this context"""
+    return _current_span.get()
+
+
+def set_current_span(span: Optional[Span]):
+    """Make ``span`` the parent of spans opened later in this context"""
+    _current_span.set(span)
+
+
+def configure_logging(level: Optional[str] = None):
+    """Send log records to stderr at ``level`` (DOCUMIND_LOG_LEVEL, default WARNING)"""
+    level = (level or os.getenv("DOCUMIND_LOG_LEVEL", "WARNING")).upper()
+    logging.basicConfig(level=level, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+
+
+def start_metrics_server(port: int, host: str = "127.0.0.1"):
+    """Serve /metrics in Prometheus format (and /traces as JSONL) on a daemon thread"""
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.startswith("/metrics"):
+                body, content_type = get_telemetry().prometheus_text(), "text/plain; version=0.0.4"
+            elif self.path.startswith("/traces"):
+                body = "".join(json.dumps(span, default=str) + "\n" for span in get_telemetry().recent_spans(1000))
+                content_type = "application/x-ndjson"
+            else:
+                self.send_error(404)
+                return
+            payload = body.encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def log_message(self, format: str, *args: Any):
+            logger.debug("metrics server: " + format, *args)
+
+    server = ThreadingHTTPServer((host, port), MetricsHandler)
+    threading.Thread(target=server.serve_forever, name="metrics-server", daemon=True).start()
+    logger.info("Serving metrics on http://%s:%d/metrics", host, port)
+    return server
@@ -0,0 +1,33 @@
+"""
+Thread Pools - named thread pools shared across the process
+"""
+
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict
+
+logger = logging.getLogger(__name__)
+
+_pools: Dict[str, ThreadPoolExecutor] = {}
+_pools_lock = threading.Lock()
+
+
+def shared_pool(name: str, env_var: str, default_workers: int) -> ThreadPoolExecutor:
+    """Return the process-wide thread pool called ``name``, creating it on first use.
+
+    Every agent, retriever and session submits to the same pool, so
+    concurrent requests queue for a fixed set of threads instead of each
+    spawning their own. The size comes from ``env_var`` when it is set,
+    otherwise ``default_workers``.
+    """
+    pool = _pools.get(name)
+    if pool is not None:
+        return pool
+    with _pools_lock:
+        if name not in _pools:
+            max_workers = max(1, int(os.getenv(env_var, str(default_workers))))
+            logger.debug("Starting %s thread pool with %d workers", name, max_workers)
+            _pools[name] = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=name)
+        return _pools[name]
@@ -0,0 +1,90 @@
+"""
+TTL Cache - in-memory LRU cache with expiry and an optional SQLite tier
+"""
+
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Optional
+
+from utils.sqlite_db import open_sqlite
+
+
+class TTLCache:
+    """LRU cache whose entries expire after ``ttl_seconds``.
+
+    Values must be JSON serializable when ``cache_file`` is set; the SQLite
+    tier then survives restarts and is shared by processes on the same box.
+    """
+
+    def __init__(self, ttl_seconds: float = 3600, max_entries: int = 1000, cache_file: Optional[str] = None):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.conn = None
+        if cache_file:
+            self.conn = open_sqlite(cache_file)
+            self.conn.execute(
+                "CREATE TABLE IF NOT EXISTS cache (key TEXT PRIMARY KEY, value TEXT NOT NULL, expires REAL NOT NULL)"
+            )
+            self.conn.commit()
+
+    def get(self, key: str) -> Optional[Any]:
+        """Return the cached value, or None if missing or expired"""
+        now = time.time()
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None and entry[1] > now:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return entry[0]
+            self.entries.pop(key, None)
+
+            if self.conn is not None:
+                row = self.conn.execute(
+                    "SELECT value, expires FROM cache WHERE key = ? AND expires > ?", (key, now)
+                ).fetchone()
+                if row is not None:
+                    value = json.loads(row[0])
+                    self._remember(key, value, row[1])
+                    self.hits += 1
+                    return value
+            self.misses += 1
+        return None
+
+    def set(self, key: str, value: Any):
+        """Store a value for ``ttl_seconds``"""
+        expires = time.time() + self.ttl_seconds
+        with self.lock:
+            self._remember(key, value, expires)
+            if self.conn is not None:
+                self.conn.execute("DELETE FROM cache WHERE expires <= ?", (time.time(),))
+                self.conn.execute(
+                    "INSERT OR REPLACE INTO cache (key, value, expires) VALUES (?, ?, ?)",
+                    (key, json.dumps(value), expires)
+                )
+                self.conn.commit()
+
+    def _remember(self, key: str, value: Any, expires: float):
+        self.entries[key] = (value, expires)
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+    def clear(self):
+        """Drop every entry from both tiers"""
+        with self.lock:
+            self.entries.clear()
+            if self.conn is not None:
+                self.conn.execute("DELETE FROM cache")
+                self.conn.commit()
+
+    def get_stats(self) -> dict:
+        """Return hit/miss counters"""
+        total = self.hits + self.misses
+        return {"hits": self.hits, "misses": self.misses, "hit_rate": self.hits / total if total else 0.0,
+                "entries": len(self.entries)}
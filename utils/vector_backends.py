@@ -0,0 +1,643 @@
+"""
+Vector Store Backends - Chroma or FAISS behind one interface
+"""
+
+import json
+import logging
+import math
+import os
+import pickle
+import shutil
+import sqlite3
+import sys
+import threading
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from langchain_core.vectorstores import VectorStore
+
+from utils.settings import env_flag
+from utils.sqlite_db import open_sqlite
+
+logger = logging.getLogger(__name__)
+
+VECTOR_BACKENDS = ("chroma", "faiss", "float16", "int8")
+
+
+def open_vector_store(backend: str, embeddings: Embeddings, persist_directory: str,
+                      collection_name: str = "documind"):
+    """Open (or create) the persistent vector store for the given backend.
+
+    ``float16`` and ``int8`` are QuantizedVectorStore; DOCUMIND_VECTOR_RESCORE=true
+    also keeps a float32 copy on disk to re-score candidates, which makes the
+    index larger than plain float32.
+    """
+    if backend == "chroma":
+        from langchain_community.vectorstores import Chroma
+        return Chroma(
+            collection_name=collection_name,
+            embedding_function=embeddings,
+            persist_directory=persist_directory
+        )
+    if backend == "faiss":
+        return FaissVectorStore(embeddings, persist_directory)
+    if backend in ("float16", "int8"):
+        return QuantizedVectorStore(
+            embeddings, persist_directory, dtype=backend,
+            rescore=env_flag("DOCUMIND_VECTOR_RESCORE", False)
+        )
+    raise ValueError(f"Unknown vector backend '{backend}', expected one of {VECTOR_BACKENDS}")
+
+
+class _LocalVectorStore(VectorStore):
+    """LangChain plumbing shared by the in-process stores.
+
+    Subclasses keep L2-normalized vectors and implement ``add_vectors``,
+    ``delete``, ``similarity_search_with_score_by_vector`` and ``_entries``;
+    text search, ``get`` and construction from texts are built on those.
+    """
+
+    def __init__(self, embedding: Embeddings, persist_directory: Optional[str] = None):
+        self.embedding = embedding
+        self.persist_directory = persist_directory
+        self.lock = threading.RLock()
+
+    @property
+    def embeddings(self) -> Embeddings:
+        return self.embedding
+
+    @staticmethod
+    def _normalize(vectors):
+        import numpy as np
+        vectors = np.asarray(vectors, dtype="float32")
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return vectors / norms
+
+    @staticmethod
+    def _document(chunk_id: str, text: str, metadata: dict) -> Document:
+        return Document(page_content=text, metadata={**metadata, "chunk_id": chunk_id})
+
+    def _entries(self, chunk_ids: List[str]) -> List[Tuple[str, str, dict]]:
+        """(chunk_id, text, metadata) of the stored chunks among ``chunk_ids``; called under the lock"""
+        raise NotImplementedError
+
+    def _all_ids(self) -> List[str]:
+        raise NotImplementedError
+
+    def add_vectors(self, vectors, texts: List[str], metadatas: List[dict], ids: List[str]) -> List[str]:
+        """Add precomputed vectors, replacing existing chunks with the same id"""
+        raise NotImplementedError
+
+    def add_texts(self, texts: Iterable[str], metadatas: Optional[List[dict]] = None,
+                  ids: Optional[List[str]] = None, **kwargs: Any) -> List[str]:
+        texts = list(texts)
+        if not texts:
+            return []
+        metadatas = metadatas or [{} for _ in texts]
+        if ids is None:
+            import uuid
+            ids = [str(uuid.uuid4()) for _ in texts]
+        vectors = self.embedding.embed_documents(texts)
+        return self.add_vectors(vectors, texts, metadatas, list(ids))
+
+    def get(self, ids: Optional[List[str]] = None, **kwargs: Any) -> dict:
+        """Return stored chunks in the same shape as Chroma.get"""
+        with self.lock:
+            found = self._entries(ids if ids is not None else self._all_ids())
+        return {
+            "ids": [entry[0] for entry in found],
+            "documents": [entry[1] for entry in found],
+            "metadatas": [entry[2] for entry in found],
+        }
+
+    def similarity_search_by_vector(self, embedding: List[float], k: int = 4, **kwargs: Any) -> List[Document]:
+        return [doc for doc, _ in self.similarity_search_with_score_by_vector(embedding, k)]
+
+    def similarity_search_with_score(self, query: str, k: int = 4, **kwargs: Any) -> List[Tuple[Document, float]]:
+        return self.similarity_search_with_score_by_vector(self.embedding.embed_query(query), k)
+
+    def similarity_search(self, query: str, k: int = 4, **kwargs: Any) -> List[Document]:
+        return [doc for doc, _ in self.similarity_search_with_score(query, k)]
+
+    def _select_relevance_score_fn(self):
+        # Cosine similarity is already in [-1, 1]; map to [0, 1]
+        return lambda score: (score + 1.0) / 2.0
+
+    @classmethod
+    def from_texts(cls, texts: List[str], embedding: Embeddings, metadatas: Optional[List[dict]] = None,
+                   ids: Optional[List[str]] = None, persist_directory: Optional[str] = None,
+                   **kwargs: Any) -> "_LocalVectorStore":
+        store = cls(embedding, persist_directory, **kwargs)
+        store.add_texts(texts, metadatas=metadatas, ids=ids)
+        store.persist()
+        return store
+
+
+class FaissVectorStore(_LocalVectorStore):
+    """FAISS vector store with add/delete by chunk id and on-disk save/load.
+
+    Small collections use an exact inner-product index. Once the collection
+    reaches ``ivf_threshold`` vectors it is retrained into an IVF index, which
+    searches only ``nprobe`` of its clusters. IVF is used rather than HNSW
+    because FAISS cannot remove vectors from an HNSW graph. Vectors are L2
+    normalized, so inner product is cosine similarity.
+    """
+
+    def __init__(self, embedding: Embeddings, persist_directory: Optional[str] = None,
+                 ivf_threshold: int = 50000, nprobe: int = 16):
+        super().__init__(embedding, persist_directory)
+        self.ivf_threshold = ivf_threshold
+        self.nprobe = nprobe
+        self.index = None
+        self.dimension: Optional[int] = None
+        self.id_map: Dict[str, int] = {}
+        self.docstore: Dict[int, Tuple[str, str, dict]] = {}
+        self.next_id = 0
+        self.load()
+
+    @property
+    def is_ivf(self) -> bool:
+        import faiss
+        return self.index is not None and isinstance(self.index, faiss.IndexIVF)
+
+    def _index_file(self):
+        return os.path.join(self.persist_directory, "index.faiss")
+
+    def _docstore_file(self):
+        return os.path.join(self.persist_directory, "docstore.pkl")
+
+    def load(self):
+        """Load a saved index if one exists"""
+        if not self.persist_directory or not os.path.exists(self._docstore_file()):
+            return
+        import faiss
+        with open(self._docstore_file(), "rb") as f:
+            state = pickle.load(f)
+        self.id_map = state["id_map"]
+        self.docstore = state["docstore"]
+        self.next_id = state["next_id"]
+        self.dimension = state["dimension"]
+        if os.path.exists(self._index_file()):
+            self.index = faiss.read_index(self._index_file())
+
+    def persist(self):
+        """Save the index and docstore atomically"""
+        if not self.persist_directory:
+            return
+        import faiss
+        with self.lock:
+            os.makedirs(self.persist_directory, exist_ok=True)
+            if self.index is not None:
+                faiss.write_index(self.index, self._index_file() + ".tmp")
+                os.replace(self._index_file() + ".tmp", self._index_file())
+            with open(self._docstore_file() + ".tmp", "wb") as f:
+                pickle.dump({
+                    "id_map": self.id_map,
+                    "docstore": self.docstore,
+                    "next_id": self.next_id,
+                    "dimension": self.dimension,
+                }, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(self._docstore_file() + ".tmp", self._docstore_file())
+
+    def delete_collection(self):
+        """Remove every vector and the files on disk"""
+        with self.lock:
+            self.index = None
+            self.id_map, self.docstore = {}, {}
+            self.next_id = 0
+            if self.persist_directory and os.path.exists(self.persist_directory):
+                shutil.rmtree(self.persist_directory)
+
+    def _new_flat_index(self, dimension: int):
+        import faiss
+        return faiss.IndexIDMap2(faiss.IndexFlatIP(dimension))
+
+    def _convert_to_ivf(self):
+        """Retrain the collection into an IVF index once it outgrows exact search"""
+        import faiss
+        import numpy as np
+        int_ids = np.array(sorted(self.docstore), dtype="int64")
+        vectors = np.vstack([self.index.reconstruct(int(i)) for i in int_ids]).astype("float32")
+        # FAISS wants ~39 training points per list
+        nlist = max(1, min(int(4 * math.sqrt(len(int_ids))), len(int_ids) // 39))
+        logger.info("Converting FAISS index to IVF with %d lists for %d vectors", nlist, len(int_ids))
+        quantizer = faiss.IndexFlatIP(self.dimension)
+        index = faiss.IndexIVFFlat(quantizer, self.dimension, nlist, faiss.METRIC_INNER_PRODUCT)
+        index.train(vectors)
+        index.add_with_ids(vectors, int_ids)
+        index.nprobe = self.nprobe
+        self.index = index
+
+    def add_vectors(self, vectors, texts: List[str], metadatas: List[dict], ids: List[str]) -> List[str]:
+        """Add precomputed vectors, replacing existing chunks with the same id"""
+        import numpy as np
+        vectors = self._normalize(vectors)
+        with self.lock:
+            self.delete([chunk_id for chunk_id in ids if chunk_id in self.id_map])
+            if self.index is None:
+                self.dimension = vectors.shape[1]
+                self.index = self._new_flat_index(self.dimension)
+            int_ids = np.arange(self.next_id, self.next_id + len(ids), dtype="int64")
+            self.next_id += len(ids)
+            self.index.add_with_ids(vectors, int_ids)
+            for int_id, chunk_id, text, metadata in zip(int_ids, ids, texts, metadatas):
+                self.id_map[chunk_id] = int(int_id)
+                self.docstore[int(int_id)] = (chunk_id, text, dict(metadata or {}))
+            if not self.is_ivf and len(self.docstore) >= self.ivf_threshold:
+                self._convert_to_ivf()
+        return ids
+
+    def delete(self, ids: Optional[List[str]] = None, **kwargs: Any) -> Optional[bool]:
+        import numpy as np
+        if not ids:
+            return False
+        with self.lock:
+            int_ids = [self.id_map.pop(chunk_id) for chunk_id in ids if chunk_id in self.id_map]
+            if not int_ids or self.index is None:
+                return False
+            self.index.remove_ids(np.array(int_ids, dtype="int64"))
+            for int_id in int_ids:
+                self.docstore.pop(int_id, None)
+        return True
+
+    def _all_ids(self) -> List[str]:
+        return list(self.id_map)
+
+    def _entries(self, chunk_ids: List[str]) -> List[Tuple[str, str, dict]]:
+        return [self.docstore[self.id_map[chunk_id]] for chunk_id in chunk_ids if chunk_id in self.id_map]
+
+    def similarity_search_with_score_by_vector(self, embedding: List[float], k: int = 4,
+                                               **kwargs: Any) -> List[Tuple[Document, float]]:
+        if self.index is None or not self.docstore:
+            return []
+        query = self._normalize([embedding])
+        with self.lock:
+            scores, int_ids = self.index.search(query, min(k, len(self.docstore)))
+            results = []
+            for score, int_id in zip(scores[0], int_ids[0]):
+                entry = self.docstore.get(int(int_id))
+                if entry is None:
+                    continue
+                results.append((self._document(*entry), float(score)))
+        return results
+
+
+class _ChunkTable:
+    """Chunk ids, texts, metadata and int8 scales by row, in SQLite next to a QuantizedVectorStore's vectors.
+
+    Only the id to row map is kept in memory. Rows are written as chunks are
+    added or deleted and become durable on ``commit``, together with the
+    store's settings, so persisting costs the size of the change.
+    """
+
+    def __init__(self, db_file: Optional[str] = None):
+        if db_file:
+            self.conn = open_sqlite(db_file)
+        else:
+            self.conn = sqlite3.connect(":memory:", check_same_thread=False)
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS chunks (slot INTEGER PRIMARY KEY, chunk_id TEXT NOT NULL UNIQUE, "
+            "text TEXT NOT NULL, metadata TEXT NOT NULL, scale REAL NOT NULL)"
+        )
+        self.conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+        self.conn.commit()
+        self.rows: Dict[str, int] = {}
+        # Freed rows are only reused after the next commit (see QuantizedVectorStore)
+        self.free: List[int] = []
+        self.released: List[int] = []
+
+    def __setstate__(self, state):
+        # Only reached for table.pkl files from before the SQLite table; the store imports ``legacy``
+        self.legacy = state
+
+    def meta(self) -> dict:
+        return {key: json.loads(value) for key, value in self.conn.execute("SELECT key, value FROM meta")}
+
+    def load_rows(self) -> List[Tuple[int, float]]:
+        """Read the id to row map and return (row, scale) for every stored chunk"""
+        rows = self.conn.execute("SELECT slot, chunk_id, scale FROM chunks").fetchall()
+        self.rows = {chunk_id: slot for slot, chunk_id, _ in rows}
+        return [(slot, scale) for slot, _, scale in rows]
+
+    def put(self, rows: List[int], ids: List[str], texts: List[str], metadatas: List[dict], scales):
+        self.conn.executemany(
+            "INSERT OR REPLACE INTO chunks (slot, chunk_id, text, metadata, scale) VALUES (?, ?, ?, ?, ?)",
+            [(row, chunk_id, text, json.dumps(metadata or {}, default=str), float(scale))
+             for row, chunk_id, text, metadata, scale in zip(rows, ids, texts, metadatas, scales)]
+        )
+        self.rows.update(zip(ids, rows))
+
+    def remove(self, ids: List[str]) -> List[int]:
+        """Free the rows of ``ids``, returning them"""
+        rows = [self.rows.pop(chunk_id) for chunk_id in ids if chunk_id in self.rows]
+        self.conn.executemany("DELETE FROM chunks WHERE slot = ?", [(row,) for row in rows])
+        self.released.extend(rows)
+        return rows
+
+    def entries(self, rows: List[int]) -> Dict[int, Tuple[str, str, dict]]:
+        """Return (chunk_id, text, metadata) of the stored chunks among ``rows``, by row"""
+        found = {}
+        rows = [int(row) for row in rows]
+        for start in range(0, len(rows), 500):
+            batch = rows[start:start + 500]
+            placeholders = ", ".join("?" * len(batch))
+            for slot, chunk_id, text, metadata in self.conn.execute(
+                f"SELECT slot, chunk_id, text, metadata FROM chunks WHERE slot IN ({placeholders})", batch
+            ):
+                found[slot] = (chunk_id, text, json.loads(metadata))
+        return found
+
+    def commit(self, meta: dict):
+        """Make every change so far durable, along with the store's settings"""
+        self.conn.executemany("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)",
+                              [(key, json.dumps(value)) for key, value in meta.items()])
+        self.conn.commit()
+        # Rows deleted before this commit are free in the saved table, so they can be overwritten now
+        self.free.extend(self.released)
+        self.released = []
+
+    def close(self):
+        self.conn.close()
+
+    def resident_bytes(self) -> int:
+        """Approximate memory held by the id to row map and free lists"""
+        return (sys.getsizeof(self.rows) + sum(sys.getsizeof(chunk_id) + 28 for chunk_id in self.rows)
+                + sys.getsizeof(self.free) + sys.getsizeof(self.released))
+
+
+class QuantizedVectorStore(_LocalVectorStore):
+    """Exact-search vector store keeping float16 or int8 vectors in a memory-mapped array.
+
+    ``int8`` quantizes each vector symmetrically with its own float32 scale,
+    a quarter of float32's size; ``float16`` halves it. A query is scored
+    against every row with blockwise NumPy products and the best rows are
+    picked with ``argpartition``. With ``rescore`` a float32 copy is kept in
+    a second memory-mapped file that is only read for the ``rescore_factor *
+    k`` best candidates, which recovers most of the recall lost to
+    quantization but makes the files on disk larger than float32 alone.
+    Chunk texts and metadata live in a SQLite table (see _ChunkTable), not in
+    memory. Rows freed by deletes are reused only after the next persist, so
+    a crash never leaves persisted rows overwritten.
+    """
+
+    BLOCK_ROWS = 4096
+
+    def __init__(self, embedding: Embeddings, persist_directory: Optional[str] = None, dtype: str = "int8",
+                 rescore: bool = False, rescore_factor: int = 4):
+        import numpy as np
+        if dtype not in ("float16", "int8"):
+            raise ValueError(f"Unsupported dtype '{dtype}', expected float16 or int8")
+        super().__init__(embedding, persist_directory)
+        self.dtype = np.dtype(dtype)
+        self.rescore = rescore
+        self.rescore_factor = rescore_factor
+        self.dimension: Optional[int] = None
+        self.capacity = 0
+        self.count = 0
+        self.vectors = None
+        self.float32 = None
+        self.scales = np.zeros(0, dtype="float32")
+        self.live = np.zeros(0, dtype=bool)
+        self.table = self._open_table()
+        self.load()
+
+    def _open_table(self) -> _ChunkTable:
+        if not self.persist_directory:
+            return _ChunkTable()
+        os.makedirs(self.persist_directory, exist_ok=True)
+        return _ChunkTable(self._file("chunks.sqlite"))
+
+    def _meta(self) -> dict:
+        return {"dtype": self.dtype.name, "rescore": self.rescore, "dimension": self.dimension,
+                "capacity": self.capacity, "count": self.count}
+
+    def _file(self, name: str) -> str:
+        return os.path.join(self.persist_directory, name)
+
+    def _open_array(self, name: str, dtype, capacity: int, previous=None):
+        """Map (or allocate) a capacity x dimension array, keeping the rows of ``previous``"""
+        import numpy as np
+        if not self.persist_directory:
+            array = np.zeros((capacity, self.dimension), dtype=dtype)
+            if previous is not None:
+                array[:len(previous)] = previous
+            return array
+        # Growing the file keeps existing rows in place, so nothing is copied
+        os.makedirs(self.persist_directory, exist_ok=True)
+        with open(self._file(name), "ab") as f:
+            f.truncate(capacity * self.dimension * np.dtype(dtype).itemsize)
+        return np.memmap(self._file(name), dtype=dtype, mode="r+", shape=(capacity, self.dimension))
+
+    def load(self):
+        """Load a saved store if one exists"""
+        import numpy as np
+        if not self.persist_directory:
+            return
+        if os.path.exists(self._file("table.pkl")):
+            self._import_legacy_table()
+        state = self.table.meta()
+        if not state:
+            return
+        if state["dtype"] != self.dtype.name or state["rescore"] != self.rescore:
+            logger.warning("Vector store at %s was built as %s (rescore=%s); rebuild the index to change it",
+                           self.persist_directory, state["dtype"], state["rescore"])
+        self.dtype = np.dtype(state["dtype"])
+        self.rescore = state["rescore"]
+        self.dimension = state["dimension"]
+        self.capacity = state["capacity"]
+        self.count = state["count"]
+        self.scales = np.ones(self.capacity, dtype="float32")
+        self.live = np.zeros(self.capacity, dtype=bool)
+        for row, scale in self.table.load_rows():
+            self.scales[row] = scale
+            self.live[row] = True
+        self.table.free = [int(row) for row in np.flatnonzero(~self.live[:self.count])]
+        if self.capacity:
+            self.vectors = self._open_array(f"vectors.{self.dtype.name}", self.dtype, self.capacity)
+            if self.rescore:
+                self.float32 = self._open_array("vectors.float32", "float32", self.capacity)
+
+    def _import_legacy_table(self):
+        """Move a table.pkl written before chunks were kept in SQLite into the chunk table"""
+        with open(self._file("table.pkl"), "rb") as f:
+            state = pickle.load(f)
+        legacy = state["table"].legacy
+        rows = [row for row, chunk_id in enumerate(legacy["ids"]) if chunk_id is not None]
+        self.table.put(rows, [legacy["ids"][row] for row in rows], [legacy["texts"][row] for row in rows],
+                       [legacy["metadatas"][row] for row in rows], [state["scales"][row] for row in rows])
+        self.table.commit({key: state[key] for key in ("dtype", "rescore", "dimension", "capacity", "count")})
+        os.remove(self._file("table.pkl"))
+        logger.info("Moved %d chunks of %s into its SQLite chunk table", len(rows), self.persist_directory)
+
+    def persist(self):
+        """Flush the vector files, then commit the chunk table"""
+        if not self.persist_directory:
+            return
+        with self.lock:
+            for array in (self.vectors, self.float32):
+                if array is not None:
+                    array.flush()
+            self.table.commit(self._meta())
+
+    def delete_collection(self):
+        """Remove every vector and the files on disk"""
+        import numpy as np
+        with self.lock:
+            self.vectors = self.float32 = None
+            self.dimension = None
+            self.capacity = self.count = 0
+            self.scales = np.zeros(0, dtype="float32")
+            self.live = np.zeros(0, dtype=bool)
+            self.table.close()
+            if self.persist_directory and os.path.exists(self.persist_directory):
+                shutil.rmtree(self.persist_directory)
+            self.table = self._open_table()
+
+    def _quantize(self, vectors):
+        """Return (codes, scales) for unit float32 vectors"""
+        import numpy as np
+        if self.dtype == np.int8:
+            scales = np.abs(vectors).max(axis=1) / 127.0
+            scales[scales == 0] = 1.0
+            codes = np.clip(np.rint(vectors / scales[:, None]), -127, 127).astype(np.int8)
+            return codes, scales.astype("float32")
+        return vectors.astype(self.dtype), np.ones(len(vectors), dtype="float32")
+
+    def _reserve_rows(self, count: int) -> List[int]:
+        """Pick rows for new vectors, reusing free rows before growing the arrays"""
+        import numpy as np
+        rows = [self.table.free.pop() for _ in range(min(count, len(self.table.free)))]
+        extra = count - len(rows)
+        if self.count + extra > self.capacity:
+            capacity = max(self.count + extra, 2 * self.capacity, 1024)
+            self.vectors = self._open_array(f"vectors.{self.dtype.name}", self.dtype, capacity, self.vectors)
+            if self.rescore:
+                self.float32 = self._open_array("vectors.float32", "float32", capacity, self.float32)
+            scales = np.ones(capacity, dtype="float32")
+            scales[:self.capacity] = self.scales
+            live = np.zeros(capacity, dtype=bool)
+            live[:self.capacity] = self.live
+            self.scales, self.live = scales, live
+            self.capacity = capacity
+        rows.extend(range(self.count, self.count + extra))
+        self.count += extra
+        return rows
+
+    def add_vectors(self, vectors, texts: List[str], metadatas: List[dict], ids: List[str]) -> List[str]:
+        """Add precomputed vectors, replacing existing chunks with the same id"""
+        import numpy as np
+        vectors = self._normalize(vectors)
+        with self.lock:
+            self.delete([chunk_id for chunk_id in ids if chunk_id in self.table.rows])
+            if self.dimension is None:
+                self.dimension = vectors.shape[1]
+            codes, scales = self._quantize(vectors)
+            rows = self._reserve_rows(len(ids))
+            index = np.array(rows, dtype="int64")
+            self.vectors[index] = codes
+            self.scales[index] = scales
+            self.live[index] = True
+            if self.rescore:
+                self.float32[index] = vectors
+            self.table.put(rows, ids, texts, metadatas, scales)
+        return ids
+
+    def delete(self, ids: Optional[List[str]] = None, **kwargs: Any) -> Optional[bool]:
+        if not ids:
+            return False
+        with self.lock:
+            rows = self.table.remove(ids)
+            self.live[rows] = False
+        return bool(rows)
+
+    def _all_ids(self) -> List[str]:
+        return list(self.table.rows)
+
+    def _entries(self, chunk_ids: List[str]) -> List[Tuple[str, str, dict]]:
+        rows = [self.table.rows[chunk_id] for chunk_id in chunk_ids if chunk_id in self.table.rows]
+        found = self.table.entries(rows)
+        return [found[row] for row in rows if row in found]
+
+    def _score(self, query) -> Tuple[Any, Any]:
+        """Return (rows, scores) of the quantized scores of every live row"""
+        import numpy as np
+        with self.lock:
+            count, vectors, scales = self.count, self.vectors, self.scales
+            rows = np.flatnonzero(self.live[:count])
+        scores = np.empty(count, dtype="float32")
+        # Dequantize a block at a time so the float32 copy stays small
+        for start in range(0, count, self.BLOCK_ROWS):
+            block = np.asarray(vectors[start:min(start + self.BLOCK_ROWS, count)], dtype="float32")
+            scores[start:start + len(block)] = block @ query
+        if self.dtype == np.int8:
+            scores *= scales[:count]
+        return rows, scores[rows]
+
+    def similarity_search_with_score_by_vector(self, embedding: List[float], k: int = 4,
+                                               **kwargs: Any) -> List[Tuple[Document, float]]:
+        import numpy as np
+        if self.vectors is None or not self.table.rows:
+            return []
+        query = self._normalize([embedding])[0]
+        rows, scores = self._score(query)
+        k = min(k, len(rows))
+        if k == 0:
+            return []
+        float32 = self.float32 if self.rescore else None
+        candidates = min(len(rows), k * self.rescore_factor) if float32 is not None else k
+        top = np.argpartition(-scores, candidates - 1)[:candidates]
+        rows, scores = rows[top], scores[top]
+        if float32 is not None:
+            # Only the candidates' pages of the float32 file are read
+            order = np.argsort(rows)
+            rows = rows[order]
+            scores = np.asarray(float32[rows], dtype="float32") @ query
+        best = np.argsort(-scores)[:k]
+
+        with self.lock:
+            found = self.table.entries(rows[best])
+        # Rows deleted since scoring are skipped
+        return [(self._document(*found[row]), float(score))
+                for row, score in zip(rows[best].tolist(), scores[best]) if row in found]
+
+    def get_stats(self) -> dict:
+        """Index size against float32, counting every stored copy of the vectors.
+
+        ``scan_bytes`` is what each query reads (codes and scales);
+        ``index_bytes`` adds the float32 copy kept for rescoring, and
+        ``disk_bytes`` is the actual size of every file in the store's directory.
+        ``resident_bytes`` is what the store holds in process memory: the
+        scales, the live mask, the id to row map and, without a
+        ``persist_directory``, the vector arrays. Pages of the memory-mapped
+        files and of SQLite are left to the OS page cache and not counted.
+        """
+        import numpy as np
+        with self.lock:
+            live = len(self.table.rows)
+            dimension = self.dimension or 0
+            resident_bytes = self.scales.nbytes + self.live.nbytes + self.table.resident_bytes() + sum(
+                array.nbytes for array in (self.vectors, self.float32)
+                if array is not None and not isinstance(array, np.memmap)
+            )
+        scan_bytes_per_vector = dimension * self.dtype.itemsize + (4 if self.dtype == np.int8 else 0)
+        bytes_per_vector = scan_bytes_per_vector + (dimension * 4 if self.rescore else 0)
+        float32_bytes = live * dimension * 4
+        stats = {
+            "vectors": live,
+            "dtype": self.dtype.name,
+            "dimension": dimension,
+            "rescore": self.rescore,
+            "bytes_per_vector": bytes_per_vector,
+            "scan_bytes": live * scan_bytes_per_vector,
+            "index_bytes": live * bytes_per_vector,
+            "float32_bytes": float32_bytes,
+            "size_ratio": live * bytes_per_vector / float32_bytes if float32_bytes else 0.0,
+            "resident_bytes": resident_bytes,
+        }
+        stats["memory_saved"] = 1 - stats["size_ratio"] if float32_bytes else 0.0
+        if self.persist_directory and os.path.isdir(self.persist_directory):
+            stats["disk_bytes"] = sum(entry.stat().st_size for entry in os.scandir(self.persist_directory)
+                                      if entry.is_file())
+        return stats
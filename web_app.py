@@ -3,6 +3,8 @@ Streamlit Web Interface for DocuMindAI
 """
 
 import os
+import time
+import uuid
 from dotenv import load_dotenv
 
 # Load environment variables from .env file
@@ -10,6 +12,10 @@ load_dotenv()
 
 import streamlit as st
 from agents.research_agent import ResearchAgent
+from utils.ingestion_queue import IngestionJobQueue
+from utils.telemetry import configure_logging, start_metrics_server
+
+configure_logging()
 
 # Page config
 st.set_page_config(
@@ -18,15 +24,65 @@ st.set_page_config(
     layout="wide"
 )
 
-# Initialize agent
+# Initialize agent; it is shared, conversation memory is kept per session id
 @st.cache_resource
 def get_agent():
-    return ResearchAgent()
+    agent = ResearchAgent()
+    # Streamlit reruns this script per interaction; the cache keeps one metrics server per process
+    if os.getenv("DOCUMIND_METRICS_PORT"):
+        start_metrics_server(int(os.environ["DOCUMIND_METRICS_PORT"]))
+    # Load the LLM client, tools and index in the background while the page renders
+    agent.start_warm_up()
+    return agent
+
+# Job status is read straight from the queue file, so rendering the sidebar never
+# builds the DocumentProcessor (and opens the index) before the warm-up does
+@st.cache_resource
+def get_job_queue():
+    return IngestionJobQueue(os.path.join(os.getenv("DOCUMIND_INDEX_DIR", "data/index"), "jobs.sqlite"))
+
+def format_eta(seconds) -> str:
+    if seconds is None:
+        return "estimating..."
+    return f"~{int(seconds // 60)}m {int(seconds % 60)}s left" if seconds >= 60 else f"~{int(seconds)}s left"
+
+def render_ingestion_status(job_queue) -> bool:
+    """Show recent ingestion jobs; returns True while any are still active"""
+    jobs = job_queue.list_jobs(limit=10)
+    if not jobs:
+        return False
+    st.header("⏳ Ingestion")
+    active = False
+    for job in jobs:
+        name = os.path.basename(job["file_path"])
+        if job["status"] == "queued":
+            active = True
+            st.caption(f"{name}: queued")
+        elif job["status"] == "running":
+            active = True
+            detail = (f"page {job['pages_done']}/{job['pages_total']}, " if job["pages_total"] else "")
+            st.progress(job["progress"], text=f"{name}: {detail}{job['chunks_done']} chunks, "
+                                              f"{format_eta(job['eta_seconds'])}")
+        elif job["status"] == "failed":
+            st.caption(f"❌ {name}: {job['message']}")
+        else:
+            st.caption(f"✅ {name}")
+    return active
 
 def main():
     st.title("🧠 DocuMindAI")
     st.markdown("*Document Intelligence & Research Platform*")
     
+    # Initialize session state
+    if 'agent' not in st.session_state:
+        st.session_state.agent = get_agent()
+    
+    if 'session_id' not in st.session_state:
+        st.session_state.session_id = uuid.uuid4().hex
+    
+    if 'messages' not in st.session_state:
+        st.session_state.messages = []
+    
     # Sidebar
     with st.sidebar:
         st.header("Features")
@@ -50,29 +106,28 @@ def main():
             os.makedirs("data/documents", exist_ok=True)
             
             # Save uploaded files
+            file_paths = []
             for uploaded_file in uploaded_files:
                 file_path = os.path.join("data/documents", uploaded_file.name)
                 with open(file_path, "wb") as f:
                     f.write(uploaded_file.getbuffer())
+                file_paths.append(file_path)
             
-            # Process the uploaded documents
-            with st.spinner("Processing documents..."):
-                # Create a query to process the documents
-                query = "Process all documents in the data/documents directory"
-                response = st.session_state.agent.process_query(query)
-                st.success(f"✅ Documents processed successfully!")
+            # Queue them for the background worker and return immediately
+            st.session_state.agent.doc_processor.enqueue_documents(file_paths)
+            st.success(f"✅ Queued {len(file_paths)} documents for processing")
+        
+        ingesting = render_ingestion_status(get_job_queue())
+        
+        if st.button("Rebuild Index"):
+            with st.spinner("Rebuilding document index..."):
+                result = st.session_state.agent.router.rebuild(session_id=st.session_state.session_id)
+            st.success(result.message)
         
         if st.button("Clear Memory"):
-            st.session_state.agent.clear_memory()
+            st.session_state.agent.clear_memory(session_id=st.session_state.session_id)
             st.success("Memory cleared!")
     
-    # Initialize session state
-    if 'agent' not in st.session_state:
-        st.session_state.agent = get_agent()
-    
-    if 'messages' not in st.session_state:
-        st.session_state.messages = []
-    
     # Chat interface
     for message in st.session_state.messages:
         with st.chat_message(message["role"]):
@@ -85,14 +140,33 @@ def main():
         with st.chat_message("user"):
             st.markdown(prompt)
         
-        # Get assistant response
+        # Stream the assistant response as tokens arrive
         with st.chat_message("assistant"):
-            with st.spinner("Thinking..."):
-                response = st.session_state.agent.process_query(prompt)
-                st.markdown(response)
+            status = st.empty()
+            placeholder = st.empty()
+            status.caption("Thinking...")
+            response = ""
+            for event in st.session_state.agent.router.stream(prompt, session_id=st.session_state.session_id):
+                if event["type"] == "tool_start":
+                    status.caption(f"🔧 Using {event['tool']}...")
+                elif event["type"] == "tool_end":
+                    status.caption("Thinking...")
+                elif event["type"] == "token":
+                    response += event["content"]
+                    placeholder.markdown(response + "▌")
+                else:
+                    # The final answer (or error) is authoritative
+                    response = event["content"]
+            status.empty()
+            placeholder.markdown(response)
         
         # Add assistant message
         st.session_state.messages.append({"role": "assistant", "content": response})
+    
+    # Poll for progress while documents are being ingested
+    if ingesting:
+        time.sleep(1.0)
+        st.rerun()
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()